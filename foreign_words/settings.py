@@ -39,6 +39,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
     'web'
 ]
 
@@ -135,4 +136,53 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 LOGIN_URL = '/login/'
 
-MEDIA_ROOT = os.path.join(BASE_DIR, 'foreign_words', 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'foreign_words', 'media')
+
+# Repetition ML models
+
+# Сколько моделей пользователей держать в памяти процесса (LRU)
+ML_MODEL_CACHE_SIZE = 128
+
+# Сколько недавно обновленных слов (строк Word_Stats) всех пользователей брать для обучения общей модели
+ML_POPULATION_MAX_ROWS = 100_000
+
+# Каталог версионированного хранилища моделей (см. web/services/ml_store.py)
+ML_MODELS_DIR = os.path.join(BASE_DIR, 'ml_models')
+
+# Сколько последних версий модели хранить на диске
+ML_MODELS_KEEP_VERSIONS = 3
+
+# Как часто (в секундах) процесс проверяет, не появилась ли новая версия модели
+ML_MODEL_REFRESH_INTERVAL = 60
+
+# Очередь обучения моделей (см. web/services/ml_training.py и manage.py ml_worker)
+ML_TRAIN_DEBOUNCE = 60
+ML_TRAIN_BACKOFF = 60
+ML_TRAIN_MAX_ATTEMPTS = 3
+ML_POPULATION_TRAIN_INTERVAL = 3600
+
+# Очередь загрузки слов из файлов новых категорий (см. web/services/ingestion_jobs.py и manage.py ingest_worker)
+INGEST_MAX_ATTEMPTS = 3
+INGEST_STALE_AFTER = 3600
+
+# Тип модели: 'forest' - RandomForest, переобучается целиком;
+# 'online' - SGD-модель, дообучается только на новых попытках
+ML_MODEL_KIND = 'forest'
+
+# Страховочное полное переобучение онлайн-модели
+ML_ONLINE_REFIT_EVERY = 1000
+ML_ONLINE_REFIT_MAX_AGE = 86400
+
+# Движок расписания повторений: 'ml', 'sm2' или 'fsrs'
+REPETITION_SCHEDULER = 'ml'
+# Теневой движок: считает интервалы параллельно с основным и пишет их в лог
+REPETITION_SCHEDULER_SHADOW = None
+
+# Поиск по публичным словам через индекс в памяти процесса
+SEARCH_INDEX_ENABLED = True
+# Как часто (в секундах) проверять, не изменился ли каталог в другом процессе
+SEARCH_INDEX_CHECK_INTERVAL = 5
+
+# Список слов категории: размер страницы и время жизни общего списка в кеше (секунды)
+WORDLIST_PAGE_SIZE = 500
+WORDLIST_CACHE_TIMEOUT = 24 * 60 * 60
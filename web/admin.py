@@ -8,6 +8,15 @@ admin.site.register(Word)
 admin.site.register(Learning_Session)
 admin.site.register(Answer_Attempt)
 admin.site.register(Word_Repetition)
+admin.site.register(Word_Stats)
+admin.site.register(User_Stats)
+admin.site.register(Session_Hour_Stats)
+admin.site.register(Daily_Activity)
 admin.site.register(Learning_Category)
 admin.site.register(Learned_Word)
 admin.site.register(Feedback)
+admin.site.register(Training_Job)
+admin.site.register(Catalog_Version)
+admin.site.register(Wordlist_Source)
+admin.site.register(Wordlist_Line)
+admin.site.register(Ingestion_Job)
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from web.models import User
+from web.services.user_stats import rebuild_daily_activity
+
+
+class Command(BaseCommand):
+    help = 'Rebuild daily activity rollups (Daily_Activity) from answer and session history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_name',
+            type=str,
+            help='Rebuild only for this user',
+            required=False,
+            default=None
+        )
+
+
+    def handle(self, *args, **options):
+        verbosity = options.get('verbosity', 1)
+        users = User.objects.all()
+
+        if options['user_name']:
+            users = users.filter(username=options['user_name'])
+            if not users.exists():
+                self.stderr.write(f"User not found: {options['user_name']}")
+                return
+
+        rebuilt_users = rebuilt_days = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            rebuilt_days += rebuild_daily_activity(user_id)
+            rebuilt_users += 1
+
+        if verbosity > 0:
+            self.stdout.write(self.style.SUCCESS(
+                f"Done! Rebuilt {rebuilt_days} days of activity for {rebuilt_users} users."
+            ))
@@ -0,0 +1,177 @@
+import random
+import tempfile
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+
+from web.models import Answer_Attempt, Category, Learning_Session, User, Word
+from web.services.feature_store import rebuild_word_stats
+from web.services.ml_repetition import FEATURE_NAMES, RepetitionMLService
+from web.services.ml_store import ModelStore
+
+
+class QueryCounter:
+    """Считает запросы к БД без ограничения на размер лога запросов."""
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = 'Benchmark repetition ML service on synthetic data (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'target',
+            choices=['features', 'predict'],
+            help='What to benchmark'
+        )
+        parser.add_argument(
+            '--attempts',
+            type=int,
+            default=2000,
+            help='Number of synthetic answer attempts'
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=200,
+            help='Number of synthetic words'
+        )
+        parser.add_argument(
+            '--sample',
+            type=int,
+            default=500,
+            help='Number of words predicted one by one (result is extrapolated to all words)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed'
+        )
+
+
+    def handle(self, *args, **options):
+        random.seed(options['seed'])
+
+        with transaction.atomic():
+            user, words = self.create_dataset(options['words'], options['attempts'])
+            getattr(self, f"bench_{options['target']}")(user, words, options)
+            transaction.set_rollback(True)
+
+    def create_dataset(self, words_count, attempts_count):
+        user = User.objects.create_user(username=f'bench_ml_{time.time_ns()}')
+        category = Category.objects.create(name=user.username, owner=user)
+
+        words = Word.objects.bulk_create(
+            Word(word=f'w{i}' * random.randint(1, 4), translation=f't{i}', transcription=f'tr{i}')
+            for i in range(words_count)
+        )
+        category.words.add(*words)
+
+        session = Learning_Session.objects.create(user=user, method=Learning_Session.Method.REPEAT)
+        attempts = Answer_Attempt.objects.bulk_create(
+            Answer_Attempt(user=user, word=random.choice(words), session=session, is_correct=random.random() < 0.7)
+            for _ in range(attempts_count)
+        )
+
+        # auto_now_add не дает задать время при создании, раскидываем его отдельно
+        now = timezone.now()
+        for attempt in attempts:
+            attempt.timestamp = now - timedelta(seconds=random.randint(0, 30 * 86400))
+        Answer_Attempt.objects.bulk_update(attempts, ['timestamp'], batch_size=1000)
+        rebuild_word_stats(user)
+
+        return user, words
+
+    def bench_features(self, user, words, options):
+        service = RepetitionMLService()
+        now = timezone.now()
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            attempts = Answer_Attempt.objects.filter(user=user).select_related('word').order_by('word_id', '-timestamp', '-id')
+            X_rows = np.array([list(service._get_features(user, a.word, now=now).values()) for a in attempts], dtype=np.float64)
+            rows_time = time.perf_counter() - start
+        rows_queries = counter.count
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            _, X_scan, _ = service._attempt_features(Answer_Attempt.objects.filter(user=user), now=now)
+            scan_time = time.perf_counter() - start
+        scan_queries = counter.count
+
+        counter = QueryCounter()
+        with connection.execute_wrapper(counter):
+            start = time.perf_counter()
+            X_store, _, weights = service._build_training_set(user, now=now)
+            store_time = time.perf_counter() - start
+        store_queries = counter.count
+
+        self.stdout.write(f"Attempts: {len(X_scan)}, words: {len(words)}")
+        self.stdout.write(f"Per-row: {rows_time:.3f}s, {rows_queries} queries")
+        self.stdout.write(f"History scan: {scan_time:.3f}s, {scan_queries} queries (x{rows_time / scan_time:.1f})")
+        self.stdout.write(
+            f"Feature store: {store_time:.3f}s, {store_queries} queries, {len(X_store)} weighted rows "
+            f"(x{rows_time / store_time:.1f})"
+        )
+
+        same_store = (
+            weights.sum() == len(X_scan) and
+            np.allclose(np.unique(X_store, axis=0), np.unique(X_scan, axis=0))
+        )
+        if not np.allclose(X_rows, X_scan) or not same_store:
+            self.stderr.write("Features differ between paths!")
+        else:
+            self.stdout.write(self.style.SUCCESS("Features match"))
+
+    def bench_predict(self, user, words, options):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            service = RepetitionMLService(store=ModelStore(root=tmp_dir, features=FEATURE_NAMES))
+            if not service.train_for_user(user):
+                self.stderr.write("Not enough attempts to train a model")
+                return
+
+            counts = [random.randint(0, 5) for _ in words]
+            sample = words[:options['sample']]
+
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                single = [service.predict_next_interval(user, w, c) for w, c in zip(sample, counts)]
+                single_time = time.perf_counter() - start
+            single_queries = counter.count
+
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                bulk = service.predict_next_intervals(user, words, counts)
+                bulk_time = time.perf_counter() - start
+            bulk_queries = counter.count
+
+        per_word = single_time / len(sample)
+        self.stdout.write(f"Words: {len(words)}, attempts: {options['attempts']}")
+        self.stdout.write(
+            f"One by one: {per_word * 1000:.3f}ms/word, {single_queries / len(sample):.1f} queries/word "
+            f"(~{per_word * len(words):.2f}s for all words)"
+        )
+        self.stdout.write(
+            f"Bulk: {bulk_time:.3f}s for all words, {bulk_queries} queries, "
+            f"{len(words) / bulk_time:.0f} words/s"
+        )
+        self.stdout.write(f"Speedup: x{per_word * len(words) / bulk_time:.1f}")
+
+        if not np.allclose(single, bulk[:len(sample)]):
+            self.stderr.write("Intervals differ between single and bulk paths!")
+        else:
+            self.stdout.write(self.style.SUCCESS("Intervals match"))
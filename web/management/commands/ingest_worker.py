@@ -0,0 +1,67 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from web.services.ingestion_jobs import claim_next_job, cleanup_finished_jobs, requeue_stale_jobs, run_job
+
+
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run a background worker that loads uploaded category files from the ingestion queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all pending jobs and exit'
+        )
+
+
+    def handle(self, *args, **options):
+        poll = options['poll']
+        once = options['once']
+        next_maintenance = time.monotonic()
+        processed = 0
+
+        try:
+            while True:
+                close_old_connections()
+                now = time.monotonic()
+
+                if now >= next_maintenance:
+                    requeue_stale_jobs()
+                    cleanup_finished_jobs()
+                    next_maintenance = now + MAINTENANCE_INTERVAL
+
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+
+                start = time.perf_counter()
+                ok = run_job(job)
+                processed += 1
+                if ok:
+                    self.stdout.write(
+                        f"category {job.category_id}: added {job.words_added} words, "
+                        f"linked {job.words_linked}, skipped {job.lines_skipped} lines "
+                        f"in {time.perf_counter() - start:.3f}s"
+                    )
+                else:
+                    self.stderr.write(f"category {job.category_id}: failed ({job.error})")
+        except KeyboardInterrupt:
+            pass
+
+        if once:
+            self.stdout.write(self.style.SUCCESS(f"Done! Processed {processed} jobs."))
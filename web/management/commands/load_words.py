@@ -1,8 +1,14 @@
+import multiprocessing
 import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from itertools import islice
 
 from django.core.management.base import BaseCommand
 from django.db import transaction
-from web.models import Category, Word, User
+from web.models import Category, User, Wordlist_Source
+from web.services.word_ingest import chunks, sync_batches, sync_file
+from web.services.wordlist_reader import DEFAULT_BATCH_SIZE, file_hash, parse_file
 
 
 class Command(BaseCommand):
@@ -22,71 +28,171 @@ class Command(BaseCommand):
             required=False,
             default=None
         )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            help='Parse files in this many processes (writing stays in this process)',
+            required=False,
+            default=1
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='Reload files even if they did not change since the last load'
+        )
 
 
     def handle(self, *args, **options):
         verbosity = options.get('verbosity', 1)
         dir_path = options['dir_path']
         user_name = options['user_name']
+        jobs = max(options['jobs'], 1)
+        force = options['force']
 
         if not os.path.isdir(dir_path):
             self.stderr.write(f"Directory not found: {dir_path}")
             return
-        
+
+        if jobs > 1 and multiprocessing.current_process().daemon:
+            # Демон-процессы (воркеры пулов) не могут запускать свои процессы
+            self.stderr.write("Cannot start worker processes from a daemon process, using --jobs 1")
+            jobs = 1
+
+        owner = User.objects.filter(username=user_name).first() if user_name else None
+        paths = [
+            os.path.join(dir_path, filename)
+            for filename in sorted(os.listdir(dir_path))
+            if filename.endswith('.txt')
+        ]
+
         processed_files = 0
+        failed_files = 0
+        total_rows = 0
         total_words = 0
-
-        with transaction.atomic():
-            for filename in os.listdir(dir_path):
-                if not filename.endswith('.txt'):
-                    continue
-                
-                category_name = os.path.splitext(filename)[0]
-                file_path = os.path.join(dir_path, filename)
-
-                try:
-                    owner = User.objects.get(username=user_name)
-                except:
-                    owner = None
-
-                category, _ = Category.objects.get_or_create(
-                    name=category_name,
-                    owner=owner
+        total_links = 0
+        total_unlinked = 0
+        started = time.perf_counter()
+
+        changed = self.changed_files(paths, owner, force)
+        unchanged_files = len(paths) - len(changed)
+
+        # Каждый файл загружается в своей транзакции: ошибка в одном не откатывает остальные
+        for path, load in self.loaders(list(changed), jobs):
+            filename = os.path.basename(path)
+            size, mtime_ns, content_hash = changed[path]
+            try:
+                with transaction.atomic():
+                    category, _ = Category.objects.get_or_create(
+                        name=os.path.splitext(filename)[0],
+                        owner=owner
+                    )
+                    # Источник обновляется в той же транзакции: при ошибке файл загрузится заново
+                    source, _ = Wordlist_Source.objects.update_or_create(category=category, defaults={
+                        'file_name': filename,
+                        'size': size,
+                        'mtime_ns': mtime_ns,
+                        'content_hash': content_hash,
+                    })
+                    rows, result, errors = load(category, source, force)
+            except Exception as e:
+                failed_files += 1
+                self.stderr.write(f"{filename}: failed: {e}")
+                continue
+
+            for error in errors:
+                self.stderr.write(f"{filename}:{error.line_number}: {error.reason}: {error.text}")
+
+            processed_files += 1
+            total_rows += rows
+            total_words += result.added
+            total_links += result.linked
+            total_unlinked += result.unlinked
+            if verbosity > 1:
+                self.stdout.write(
+                    f"{filename}: added {result.added} words, linked {result.linked}, "
+                    f"unlinked {result.unlinked} ({result.modified} modified), skipped {len(errors)} lines"
                 )
 
-                words_added = self.process_file(file_path, category)
-                total_words += words_added
-                processed_files += 1
-
+        elapsed = time.perf_counter() - started
         if verbosity > 0:
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Done! Processed {processed_files} files. "
-                    f"Added {total_words} words total."
+                    f"Done! Processed {processed_files} files, {unchanged_files} unchanged. "
+                    f"Added {total_words} words total, linked {total_links} words to categories, "
+                    f"unlinked {total_unlinked}."
                 )
             )
+            if failed_files:
+                self.stdout.write(self.style.ERROR(f"Failed {failed_files} files."))
+            self.stdout.write(
+                f"Read {total_rows} lines in {elapsed:.2f}s ({total_rows / max(elapsed, 1e-9):.0f} words/sec)."
+            )
 
-    def process_file(self, file_path, category):
-        before_count = Word.objects.count()
-
-        with open(file_path, 'r', encoding='utf-8') as f:
-            for line in f:
-                line = line.strip()
-
-                if not line:
-                    continue
-
-                try:
-                    original, translation, transcription = line.split(';')
-                except:
-                    continue
-
-                word, _ = Word.objects.get_or_create(
-                    word=original, 
-                    translation=translation,
-                    transcription=transcription)
-                word.category.add(category)
-                
-        after_count = Word.objects.count()
+    def changed_files(self, paths, owner, force):
+        """
+        {путь: (размер, время изменения, хеш)} файлов, которые нужно загрузить.
+
+        Файл с теми же размером и временем изменения, что при прошлой загрузке,
+        пропускается без чтения, с тем же хешем - без разбора.
+        """
+        names = [os.path.splitext(os.path.basename(path))[0] for path in paths]
+        sources = {
+            source.category.name: source
+            for source in Wordlist_Source.objects.filter(category__owner=owner, category__name__in=names)
+            .select_related('category')
+        }
+
+        changed = {}
+        for path, name in zip(paths, names):
+            stat = os.stat(path)
+            source = None if force else sources.get(name)
+            if source is not None and (source.size, source.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+                continue
+
+            content_hash = file_hash(path)
+            if source is not None and source.content_hash == content_hash:
+                Wordlist_Source.objects.filter(pk=source.pk).update(size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+                continue
+            changed[path] = (stat.st_size, stat.st_mtime_ns, content_hash)
+        return changed
+
+    def loaders(self, paths, jobs):
+        """
+        Пары (путь, загрузка): загрузка принимает категорию, ее Wordlist_Source
+        и флаг --force и возвращает (строк, SyncResult, ошибки разбора).
+        """
+        if jobs == 1:
+            # Один процесс: файл читается потоково, память не зависит от его размера
+            for path in paths:
+                yield path, lambda category, source, relink, path=path: sync_file(
+                    path, category, source, relink=relink
+                )
+            return
 
-        return after_count - before_count
\ No newline at end of file
+        for path, future in self.parse_parallel(paths, jobs):
+            def load(category, source, relink, future=future):
+                rows, count, errors = future.result()
+                result = sync_batches(category, chunks(rows, DEFAULT_BATCH_SIZE), source, relink=relink)
+                return count, result, errors
+            yield path, load
+
+    def parse_parallel(self, paths, jobs):
+        """
+        Разбирает файлы в пуле процессов, отдавая результаты по мере готовности.
+
+        В работе не больше 2 * jobs файлов, чтобы разобранные, но еще не
+        записанные файлы не копились в памяти. Процессы запускаются через
+        spawn и не наследуют соединение с БД.
+        """
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(max_workers=jobs, mp_context=context) as pool:
+            paths = iter(paths)
+            pending = {pool.submit(parse_file, path): path for path in islice(paths, jobs * 2)}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    path = pending.pop(future)
+                    next_path = next(paths, None)
+                    if next_path is not None:
+                        pending[pool.submit(parse_file, next_path)] = next_path
+                    yield path, future
@@ -0,0 +1,112 @@
+import multiprocessing
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections, connections
+
+from web.services.ml_repetition import ml_service
+from web.services.ml_training import (
+    claim_next_job, cleanup_finished_jobs, queue_stats, requeue_stale_jobs, run_job
+)
+
+
+DEFAULT_POPULATION_INTERVAL = 3600  # Секунды между переобучениями общей модели
+MAINTENANCE_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = 'Run background workers that train repetition models from the training queue'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=1,
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--poll',
+            type=float,
+            default=1.0,
+            help='Seconds to wait when the queue is empty'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process all ready jobs and exit'
+        )
+        parser.add_argument(
+            '--stats',
+            action='store_true',
+            help='Print queue metrics and exit'
+        )
+
+
+    def handle(self, *args, **options):
+        if options['stats']:
+            for name, value in queue_stats().items():
+                self.stdout.write(f"{name}: {value}")
+            return
+
+        processes = max(1, options['processes'])
+        if processes == 1 or options['once']:
+            self.work(0, options['poll'], options['once'])
+            return
+
+        # Дочерние процессы не должны наследовать открытые соединения с БД
+        connections.close_all()
+        workers = [
+            multiprocessing.Process(target=self.work, args=(i, options['poll'], False), daemon=True)
+            for i in range(processes)
+        ]
+        for worker in workers:
+            worker.start()
+        try:
+            for worker in workers:
+                worker.join()
+        except KeyboardInterrupt:
+            for worker in workers:
+                worker.terminate()
+
+    def work(self, index, poll, once):
+        population_interval = getattr(settings, 'ML_POPULATION_TRAIN_INTERVAL', DEFAULT_POPULATION_INTERVAL)
+        # Общую модель и обслуживание очереди делает только первый процесс
+        next_population = time.monotonic() if index == 0 else float('inf')
+        next_maintenance = time.monotonic() if index == 0 else float('inf')
+        processed = 0
+
+        try:
+            while True:
+                close_old_connections()
+                now = time.monotonic()
+
+                if now >= next_maintenance:
+                    requeue_stale_jobs()
+                    cleanup_finished_jobs()
+                    next_maintenance = now + MAINTENANCE_INTERVAL
+
+                if now >= next_population:
+                    start = time.perf_counter()
+                    if ml_service.train_population():
+                        self.stdout.write(f"[{index}] population model trained in {time.perf_counter() - start:.3f}s")
+                    next_population = now + population_interval
+
+                job = claim_next_job()
+                if job is None:
+                    if once:
+                        break
+                    time.sleep(poll)
+                    continue
+
+                ok = run_job(job, ml_service)
+                processed += 1
+                if ok:
+                    self.stdout.write(f"[{index}] user {job.user_id}: fit in {job.fit_seconds:.3f}s")
+                else:
+                    self.stderr.write(f"[{index}] user {job.user_id}: failed ({job.error})")
+        except KeyboardInterrupt:
+            pass
+
+        if once:
+            self.stdout.write(self.style.SUCCESS(f"Done! Processed {processed} jobs."))
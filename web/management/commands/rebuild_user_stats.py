@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from web.models import User
+from web.services.user_stats import rebuild_session_hours, rebuild_user_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-user statistics (User_Stats, Session_Hour_Stats) from learning history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_name',
+            type=str,
+            help='Rebuild only for this user',
+            required=False,
+            default=None
+        )
+
+
+    def handle(self, *args, **options):
+        verbosity = options.get('verbosity', 1)
+        users = User.objects.all()
+
+        if options['user_name']:
+            users = users.filter(username=options['user_name'])
+            if not users.exists():
+                self.stderr.write(f"User not found: {options['user_name']}")
+                return
+
+        rebuilt = 0
+        for user_id in users.values_list('id', flat=True).iterator():
+            with transaction.atomic():
+                rebuild_user_stats(user_id)
+                rebuild_session_hours(user_id)
+            rebuilt += 1
+
+        if verbosity > 0:
+            self.stdout.write(self.style.SUCCESS(f"Done! Rebuilt stats for {rebuilt} users."))
@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from web.models import User
+from web.services.feature_store import rebuild_word_stats
+
+
+class Command(BaseCommand):
+    help = 'Rebuild per-word answer statistics (Word_Stats) from answer history'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_name',
+            type=str,
+            help='Rebuild only for this user',
+            required=False,
+            default=None
+        )
+
+
+    def handle(self, *args, **options):
+        verbosity = options.get('verbosity', 1)
+        user = None
+
+        if options['user_name']:
+            try:
+                user = User.objects.get(username=options['user_name'])
+            except User.DoesNotExist:
+                self.stderr.write(f"User not found: {options['user_name']}")
+                return
+
+        rebuilt = rebuild_word_stats(user)
+
+        if verbosity > 0:
+            self.stdout.write(self.style.SUCCESS(f"Done! Rebuilt stats for {rebuilt} words."))
@@ -0,0 +1,74 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from web.models import User, Word_Repetition
+from web.services.schedulers import get_scheduler
+
+
+class Command(BaseCommand):
+    help = 'Recompute next review time of all repetitions with the current models'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user_name',
+            type=str,
+            help='Reschedule only this user',
+            required=False,
+            default=None
+        )
+        parser.add_argument(
+            '--batch_size',
+            type=int,
+            help='Number of repetitions predicted in one call',
+            default=10000
+        )
+
+
+    def handle(self, *args, **options):
+        verbosity = options.get('verbosity', 1)
+        batch_size = options['batch_size']
+        now = timezone.now()
+
+        scheduler = get_scheduler()
+        if not scheduler.reschedules:
+            # SM-2 и FSRS считают интервал только при ответе, пересчитывать нечего
+            if verbosity > 0:
+                self.stdout.write(f"Scheduler '{scheduler.name}' does not reschedule reviews, nothing to do.")
+            return
+
+        users = User.objects.filter(id__in=Word_Repetition.objects.values('user_id'))
+        if options['user_name']:
+            users = users.filter(username=options['user_name'])
+
+        start = time.perf_counter()
+        processed = 0
+        changed = 0
+
+        for user in users.iterator():
+            repetitions = (Word_Repetition.objects
+                           .filter(user=user)
+                           .select_related('word')
+                           .order_by('id'))
+            last_id = 0
+            while True:
+                batch = list(repetitions.filter(id__gt=last_id)[:batch_size])
+                if not batch:
+                    break
+                last_id = batch[-1].id
+
+                updated = scheduler.reschedule(user, batch, now)
+                with transaction.atomic():
+                    Word_Repetition.objects.bulk_update(updated, ['next_review'], batch_size=1000)
+                processed += len(batch)
+                changed += len(updated)
+
+        if verbosity > 0:
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f"Done! Processed {processed} repetitions, rescheduled {changed} "
+                    f"in {time.perf_counter() - start:.2f}s."
+                )
+            )
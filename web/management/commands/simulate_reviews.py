@@ -0,0 +1,275 @@
+import json
+import math
+import random
+import tempfile
+import time
+from datetime import timedelta
+from unittest import mock
+
+import numpy as np
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from web.management.commands.bench_ml import QueryCounter
+from web.models import Category, Learned_Word, Learning_Session, User, Word, Word_Repetition
+from web.services.schedulers import SCHEDULERS
+
+
+class VirtualClock:
+    """Время симуляции, подменяет django.utils.timezone.now."""
+    def __init__(self, start):
+        self.now = start
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, **kwargs):
+        self.now += timedelta(**kwargs)
+
+
+class Memory:
+    """
+    Синтетическая кривая забывания одного слова.
+
+    stability - через сколько дней вероятность вспомнить падает до 90%.
+    """
+    def __init__(self, stability, learned_at):
+        self.stability = stability
+        self.last_seen = learned_at
+
+    def recall_probability(self, now):
+        days = (now - self.last_seen).total_seconds() / 86400
+        return 0.9 ** (days / self.stability)
+
+    def review(self, now, recalled, growth):
+        if recalled:
+            # Вспомнить почти забытое слово полезнее, чем только что выученное
+            self.stability *= 1 + growth * (1 - self.recall_probability(now) + 0.1)
+        else:
+            self.stability = max(0.02, self.stability * 0.4)
+        self.last_seen = now
+
+
+class Command(BaseCommand):
+    help = 'Replay synthetic review sessions through get_word_repeat/send_repeat_result (changes are rolled back)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=5,
+            help='Number of synthetic users'
+        )
+        parser.add_argument(
+            '--words',
+            type=int,
+            default=100,
+            help='Number of words each user is learning'
+        )
+        parser.add_argument(
+            '--days',
+            type=int,
+            default=14,
+            help='Number of simulated days'
+        )
+        parser.add_argument(
+            '--sessions',
+            type=int,
+            default=2,
+            help='Review sessions per user per day'
+        )
+        parser.add_argument(
+            '--max_reviews',
+            type=int,
+            default=50,
+            help='Maximum answers per session'
+        )
+        parser.add_argument(
+            '--batch',
+            type=int,
+            default=0,
+            help='Fetch cards N at a time from get_words_repeat and send answers to send_results_batch'
+        )
+        parser.add_argument(
+            '--scheduler',
+            choices=sorted(SCHEDULERS),
+            help='Override REPETITION_SCHEDULER'
+        )
+        parser.add_argument(
+            '--train',
+            action='store_true',
+            help='Run queued training jobs at the end of every simulated day (ml scheduler)'
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed'
+        )
+
+    def handle(self, *args, **options):
+        self.random = random.Random(options['seed'])
+        scheduler = options['scheduler'] or getattr(settings, 'REPETITION_SCHEDULER', 'ml')
+
+        with tempfile.TemporaryDirectory() as models_dir, override_settings(
+            REPETITION_SCHEDULER=scheduler,
+            ML_MODELS_DIR=models_dir,
+            ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+        ):
+            clock = VirtualClock(timezone.now().replace(hour=8, minute=0, second=0, microsecond=0))
+            with mock.patch('django.utils.timezone.now', clock), transaction.atomic():
+                self.reset_models()
+                users = self.create_dataset(options, clock)
+                stats = self.simulate(users, options, clock)
+                stats['learned'] = Learned_Word.objects.filter(user__in=[u for u, _ in users]).count()
+                stats['retention'] = np.mean([
+                    memory.recall_probability(clock.now)
+                    for _, memories in users for memory in memories.values()
+                ])
+                transaction.set_rollback(True)
+            self.reset_models()
+
+        self.report(scheduler, stats, options)
+
+    def reset_models(self):
+        """Модели симуляции не должны смешиваться с закешированными настоящими."""
+        from web.services.ml_repetition import ml_service
+        ml_service.registry.clear()
+
+    def create_dataset(self, options, clock):
+        users = []
+        for i in range(options['users']):
+            user = User.objects.create_user(username=f'simulate_{time.time_ns()}_{i}')
+            category = Category.objects.create(name=user.username, owner=user)
+            words = Word.objects.bulk_create(
+                Word(word=f'w{i}_{j}', translation=f't{j}', transcription=f'tr{j}')
+                for j in range(options['words'])
+            )
+            category.words.add(*words)
+            Word_Repetition.objects.bulk_create(
+                Word_Repetition(user=user, word=word, next_review=clock.now) for word in words
+            )
+
+            # Способности пользователя и сложность слов разные
+            skill = self.random.lognormvariate(0, 0.3)
+            memories = {
+                word.id: Memory(0.3 * skill * self.random.lognormvariate(0, 0.5), clock.now)
+                for word in words
+            }
+            users.append((user, memories))
+        return users
+
+    def simulate(self, users, options, clock):
+        client = Client()
+        if options['batch']:
+            get_url, send_url = reverse('get_words_repeat'), reverse('send_results_batch')
+        else:
+            get_url, send_url = reverse('get_word_repeat'), reverse('send_repeat_result')
+        latency = {get_url: [], send_url: []}
+        queries = {get_url: [], send_url: []}
+        stats = {'reviews': 0, 'correct': 0, 'seconds': 0.0}
+
+        def request(url, params=None, **kwargs):
+            counter = QueryCounter()
+            with connection.execute_wrapper(counter):
+                start = time.perf_counter()
+                response = client.post(url, **kwargs) if kwargs else client.get(url, params)
+                elapsed = time.perf_counter() - start
+            latency[url].append(elapsed)
+            queries[url].append(counter.count)
+            stats['seconds'] += elapsed
+            return response.json()
+
+        day_start = clock.now
+        for day in range(options['days']):
+            for session_index in range(options['sessions']):
+                clock.now = day_start + timedelta(days=day, hours=12 * session_index / options['sessions'])
+                for user, memories in users:
+                    client.force_login(user)
+                    session = Learning_Session.objects.create(user=user, method=Learning_Session.Method.REPEAT)
+
+                    queue, answers = [], []
+
+                    def flush():
+                        if answers:
+                            request(send_url, data=json.dumps({
+                                'session_id': session.id, 'results': answers
+                            }), content_type='application/json')
+                            answers.clear()
+
+                    for _ in range(options['max_reviews']):
+                        if options['batch']:
+                            if not queue:
+                                flush()
+                                data = request(get_url, {'count': options['batch']})
+                                queue = data.get('words', [])
+                            if not queue:
+                                break
+                            data = queue.pop(0)
+                        else:
+                            data = request(get_url)
+                            if data['status'] != 'success':
+                                break
+
+                        memory = memories[data['id']]
+                        recalled = self.random.random() < memory.recall_probability(clock.now)
+                        memory.review(clock.now, recalled, growth=2.0)
+
+                        if options['batch']:
+                            answers.append({'word_id': data['id'], 'is_known': recalled})
+                        else:
+                            request(send_url, data=json.dumps({
+                                'word_id': data['id'],
+                                'session_id': session.id,
+                                'is_known': recalled,
+                            }), content_type='application/json')
+                        stats['reviews'] += 1
+                        stats['correct'] += recalled
+                        clock.advance(seconds=self.random.randint(3, 15))
+                    flush()
+
+            if options['train']:
+                self.run_training(clock)
+
+        stats['latency'] = latency
+        stats['queries'] = queries
+        return stats
+
+    def run_training(self, clock):
+        from web.services.ml_repetition import ml_service
+        from web.services.ml_training import claim_next_job, run_job
+
+        clock.advance(hours=1)
+        while (job := claim_next_job(clock.now)) is not None:
+            run_job(job, ml_service)
+
+    def report(self, scheduler, stats, options):
+        requests = sum(len(v) for v in stats['latency'].values())
+        self.stdout.write(
+            f"Scheduler: {scheduler}, users: {options['users']}, words/user: {options['words']}, "
+            f"days: {options['days']}"
+        )
+        if not requests:
+            self.stderr.write("No requests were made")
+            return
+
+        self.stdout.write(f"Requests: {requests}, {requests / stats['seconds']:.0f} req/s")
+        if stats['reviews']:
+            queries = sum(sum(v) for v in stats['queries'].values())
+            self.stdout.write(f"Queries per reviewed card: {queries / stats['reviews']:.1f}")
+        for url, values in stats['latency'].items():
+            ms = np.array(values) * 1000
+            self.stdout.write(
+                f"  {url}: {len(values)} requests, {np.mean(stats['queries'][url]):.1f} queries/request, "
+                f"p50 {np.percentile(ms, 50):.2f}ms, p99 {np.percentile(ms, 99):.2f}ms"
+            )
+
+        reviews = stats['reviews']
+        recall = stats['correct'] / reviews if reviews else math.nan
+        self.stdout.write(f"Reviews: {reviews}, recalled at review: {recall:.1%}")
+        self.stdout.write(f"Learned words: {stats['learned']}")
+        self.stdout.write(f"Expected retention at the end: {stats['retention']:.1%}")
@@ -6,6 +6,8 @@ from deep_translator import GoogleTranslator
 import eng_to_ipa as ipa
 from tqdm import tqdm
 
+from web.services.wordlist_reader import format_row, open_wordlist, read_words
+
 
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))
 dirout_default = os.path.join(BASE_DIR, '..', '..', '..', 'wordlists', 'translated')
@@ -53,11 +55,13 @@ class Command(BaseCommand):
 
 
     def process_words(self, input_file, output_file):
-        with open(input_file) as fin, open(output_file, 'w') as fout:
-            words = fin.readlines()
+        # Файл читается построчно дважды (подсчет строк и перевод), в памяти одна строка
+        with open_wordlist(input_file) as fin:
+            total = sum(1 for _ in fin)
 
-            for word in tqdm(words, desc='Preparing the dictionary', colour='green'):
-                word = word.strip()
+        # Слово - вся строка: ";" и кавычки не разбираются, а экранируются при записи
+        with open_wordlist(input_file) as fin, open(output_file, 'w', encoding='utf-8') as fout:
+            for word in tqdm(read_words(fin), total=total, desc='Preparing the dictionary', colour='green'):
                 trans_word = self.translate_word(word)
                 transcription = self.get_transcription(word)
-                fout.write(f'{word};{trans_word};{transcription}\n')
\ No newline at end of file
+                fout.write(format_row((word, trans_word, transcription)))
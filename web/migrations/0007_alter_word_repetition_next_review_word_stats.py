@@ -0,0 +1,38 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:43
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0006_alter_word_repetition_next_review_training_job'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 13, 50, 426204, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.CreateModel(
+            name='Word_Stats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_total', models.PositiveIntegerField(default=0)),
+                ('correct_total', models.PositiveIntegerField(default=0)),
+                ('last_correct', models.BooleanField(default=False)),
+                ('success_ema', models.FloatField(default=0)),
+                ('last_attempt_at', models.DateTimeField(blank=True, null=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='web.word')),
+            ],
+            options={
+                'unique_together': {('user', 'word')},
+            },
+        ),
+    ]
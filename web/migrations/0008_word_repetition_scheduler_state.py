@@ -0,0 +1,44 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:47
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0007_alter_word_repetition_next_review_word_stats'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word_repetition',
+            name='difficulty',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='word_repetition',
+            name='ease_factor',
+            field=models.FloatField(default=2.5),
+        ),
+        migrations.AddField(
+            model_name='word_repetition',
+            name='interval',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='word_repetition',
+            name='last_review',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='word_repetition',
+            name='stability',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 17, 9, 963263, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
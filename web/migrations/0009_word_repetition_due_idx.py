@@ -0,0 +1,25 @@
+# Generated by Django 5.2.1 on 2026-10-17 00:56
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0008_word_repetition_scheduler_state'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 26, 14, 737572, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddIndex(
+            model_name='word_repetition',
+            index=models.Index(fields=['user', 'next_review', 'word'], name='word_repetition_due_idx'),
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+TRIGRAM_INDEXES = {
+    'web_word_word_trgm_idx': 'word',
+    'web_word_translation_trgm_idx': 'translation',
+}
+
+
+def create_trigram_indexes(apps, schema_editor):
+    # pg_trgm есть только в PostgreSQL, на других базах поиск работает без индексов
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, column in TRIGRAM_INDEXES.items():
+        # Выражение совпадает с тем, как Django строит icontains: UPPER(поле)
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {name} ON web_word USING gin (UPPER({column}) gin_trgm_ops)'
+        )
+
+
+def drop_trigram_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name in TRIGRAM_INDEXES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {name}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0009_word_repetition_due_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_trigram_indexes, drop_trigram_indexes),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:01
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0010_word_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Catalog_Version',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('version', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 31, 42, 446931, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
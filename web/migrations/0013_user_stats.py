@@ -0,0 +1,50 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:08
+
+import datetime
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0012_catalog_version_owner'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 38, 26, 307958, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.CreateModel(
+            name='User_Stats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('learned_words', models.IntegerField(default=0)),
+                ('in_progress_words', models.IntegerField(default=0)),
+                ('answers_total', models.PositiveIntegerField(default=0)),
+                ('answers_correct', models.PositiveIntegerField(default=0)),
+                ('test_sessions', models.PositiveIntegerField(default=0)),
+                ('test_seconds', models.PositiveBigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Session_Hour_Stats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('method', models.CharField(choices=[('new_words', 'New Words'), ('repeat', 'Repeat'), ('test', 'Test')], max_length=20)),
+                ('date', models.DateField()),
+                ('hour', models.PositiveSmallIntegerField()),
+                ('sessions', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'method', 'date', 'hour')},
+            },
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:24
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0015_ingestion_job'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 1, 54, 19, 323984, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.CreateModel(
+            name='Wordlist_Source',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('file_name', models.CharField(max_length=255)),
+                ('size', models.PositiveBigIntegerField(default=0)),
+                ('mtime_ns', models.BigIntegerField(default=0)),
+                ('content_hash', models.CharField(max_length=64)),
+                ('lines', models.JSONField(default=dict)),
+                ('loaded_at', models.DateTimeField(auto_now=True)),
+                ('category', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='source', to='web.category')),
+            ],
+        ),
+    ]
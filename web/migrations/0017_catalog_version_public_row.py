@@ -0,0 +1,65 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:38
+
+import datetime
+import django.db.models.deletion
+import django.db.models.functions.comparison
+from django.conf import settings
+from django.core.management.color import no_style
+from django.db import migrations, models
+
+
+def fix_public_row(apps, schema_editor):
+    """
+    Раньше общим каталогом считалась строка pk=1, даже если у нее был владелец.
+    Удаляем строки удаленных пользователей (ограничения FK не было) и оставляем
+    одну строку без владельца с версией больше прежней версии общего каталога:
+    иначе версия пойдет заново и ETag могут повториться.
+    """
+    Catalog_Version = apps.get_model('web', 'Catalog_Version')
+    User = apps.get_model(*settings.AUTH_USER_MODEL.split('.'))
+    Catalog_Version.objects.filter(owner__isnull=False).exclude(
+        owner_id__in=User.objects.values('pk')
+    ).delete()
+
+    # Явная вставка pk=1 не сдвигала последовательность id в PostgreSQL
+    connection = schema_editor.connection
+    with connection.cursor() as cursor:
+        for sql in connection.ops.sequence_reset_sql(no_style(), [Catalog_Version]):
+            cursor.execute(sql)
+
+    versions = [row.version for row in Catalog_Version.objects.filter(pk=1)]
+    public = list(Catalog_Version.objects.filter(owner__isnull=True).order_by('-version'))
+    versions += [row.version for row in public]
+    if not versions:
+        return
+    if public:
+        Catalog_Version.objects.filter(owner__isnull=True).exclude(pk=public[0].pk).delete()
+        Catalog_Version.objects.filter(pk=public[0].pk).update(version=max(versions) + 1)
+    else:
+        Catalog_Version.objects.create(owner=None, version=max(versions) + 1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0016_wordlist_source'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.RunPython(fix_public_row, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='catalog_version',
+            name='owner',
+            field=models.OneToOneField(blank=True, default=None, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 2, 8, 39, 734806, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.AddConstraint(
+            model_name='catalog_version',
+            constraint=models.UniqueConstraint(django.db.models.functions.comparison.Coalesce('owner', models.Value(0)), name='unique_catalog_version_owner'),
+        ),
+    ]
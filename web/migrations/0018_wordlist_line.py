@@ -0,0 +1,62 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:46
+
+import datetime
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def copy_lines(apps, schema_editor):
+    """Переносит отпечатки строк из JSON-поля lines в Wordlist_Line (hex -> знаковое 64-битное целое)."""
+    Wordlist_Source = apps.get_model('web', 'Wordlist_Source')
+    Wordlist_Line = apps.get_model('web', 'Wordlist_Line')
+    Word = apps.get_model('web', 'Word')
+    # values_list: в этом состоянии lines - и JSON-поле, и обратная связь Wordlist_Line
+    for source_id, lines in Wordlist_Source.objects.values_list('id', 'lines'):
+        lines = lines or {}
+        word_ids = set(Word.objects.filter(id__in=set(lines.values())).values_list('id', flat=True))
+        Wordlist_Line.objects.bulk_create([
+            Wordlist_Line(
+                source_id=source_id,
+                fingerprint=int.from_bytes(bytes.fromhex(line), 'big', signed=True),
+                word_id=word_id
+            )
+            for line, word_id in lines.items() if word_id in word_ids
+        ], batch_size=1000)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0017_catalog_version_public_row'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='wordlist_source',
+            name='generation',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 2, 16, 41, 655696, tzinfo=datetime.timezone.utc)),
+        ),
+        migrations.CreateModel(
+            name='Wordlist_Line',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fingerprint', models.BigIntegerField()),
+                ('generation', models.PositiveIntegerField(default=0)),
+                ('source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lines', to='web.wordlist_source')),
+                ('word', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='web.word')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['source', 'generation'], name='web_wordlis_source__126877_idx')],
+                'unique_together': {('source', 'fingerprint')},
+            },
+        ),
+        migrations.RunPython(copy_lines, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='wordlist_source',
+            name='lines',
+        ),
+    ]
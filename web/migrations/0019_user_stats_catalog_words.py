@@ -0,0 +1,29 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:58
+
+import datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0018_wordlist_line'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user_stats',
+            name='catalog_words',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='user_stats',
+            name='catalog_words_key',
+            field=models.CharField(blank=True, default='', max_length=40),
+        ),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 2, 28, 3, 256548, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.1 on 2026-10-17 01:59
+
+import datetime
+from django.db import migrations, models
+from django.db.models import F
+
+
+def copy_interval(apps, schema_editor):
+    """Раньше SM-2 хранил свой интервал в interval: берем его как начальное состояние."""
+    Word_Repetition = apps.get_model('web', 'Word_Repetition')
+    Word_Repetition.objects.update(sm2_interval=F('interval'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('web', '0019_user_stats_catalog_words'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='word_repetition',
+            name='sm2_interval',
+            field=models.FloatField(default=0),
+        ),
+        migrations.RunPython(copy_interval, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='word_repetition',
+            name='next_review',
+            field=models.DateTimeField(default=datetime.datetime(2026, 10, 17, 2, 29, 5, 117025, tzinfo=datetime.timezone.utc)),
+        ),
+    ]
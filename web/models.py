@@ -1,8 +1,10 @@
 from datetime import timedelta
 
 from django.contrib.auth import get_user_model
-from django.db import models
-from django.db.models.signals import pre_delete, m2m_changed
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 from django.utils import timezone
 
@@ -63,9 +65,86 @@ class Word_Repetition(models.Model):
     word = models.ForeignKey(Word, on_delete=models.CASCADE)
     next_review = models.DateTimeField(default=timezone.now() + timedelta(minutes=30))
     repetition_count = models.PositiveIntegerField(default=0)
+    # Состояние движков расписания (web/services/schedulers.py)
+    interval = models.FloatField(default=0)
+    last_review = models.DateTimeField(null=True, blank=True)
+    ease_factor = models.FloatField(default=2.5)
+    sm2_interval = models.FloatField(default=0)
+    stability = models.FloatField(default=0)
+    difficulty = models.FloatField(default=0)
 
     class Meta:
         unique_together = ['user', 'word']
+        indexes = [
+            # Очередь повторения: слова пользователя, которые пора повторять,
+            # читаются из индекса без обращения к таблице
+            models.Index(fields=['user', 'next_review', 'word'], name='word_repetition_due_idx'),
+        ]
+
+
+class Word_Stats(models.Model):
+    """Признаки слова для пользователя, обновляются при каждом ответе."""
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    word = models.ForeignKey(Word, on_delete=models.CASCADE)
+    attempts_total = models.PositiveIntegerField(default=0)
+    correct_total = models.PositiveIntegerField(default=0)
+    last_correct = models.BooleanField(default=False)
+    success_ema = models.FloatField(default=0)
+    last_attempt_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        unique_together = ['user', 'word']
+
+
+class User_Stats(models.Model):
+    """
+    Сводная статистика пользователя для страницы статистики (web/services/user_stats.py).
+
+    learned_words и in_progress_words - текущее состояние и уменьшаются при сбросе
+    прогресса или удалении слов; ответы и тесты - история и только растут.
+    catalog_words - число слов в изучаемых категориях, посчитанное при версиях
+    каталогов catalog_words_key (см. user_stats.catalog_word_count).
+    """
+    user = models.OneToOneField('auth.User', on_delete=models.CASCADE)
+    learned_words = models.IntegerField(default=0)
+    in_progress_words = models.IntegerField(default=0)
+    answers_total = models.PositiveIntegerField(default=0)
+    answers_correct = models.PositiveIntegerField(default=0)
+    test_sessions = models.PositiveIntegerField(default=0)
+    test_seconds = models.PositiveBigIntegerField(default=0)
+    catalog_words = models.PositiveIntegerField(default=0)
+    catalog_words_key = models.CharField(max_length=40, blank=True, default='')
+    updated_at = models.DateTimeField(auto_now=True)
+
+
+class Session_Hour_Stats(models.Model):
+    """Число начатых сессий пользователя по дате и часу (местное время) - данные тепловой карты."""
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    method = models.CharField(max_length=20, choices=Learning_Session.Method.choices)
+    date = models.DateField()
+    hour = models.PositiveSmallIntegerField()
+    sessions = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'method', 'date', 'hour']
+
+
+class Daily_Activity(models.Model):
+    """
+    Активность пользователя за день (местное время): выученные слова, ответы и время в сессиях.
+
+    Только растет вместе с историей; уникальный индекс (user, date) обслуживает
+    выборку последних дней для страницы статистики.
+    """
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    date = models.DateField()
+    words_learned = models.PositiveIntegerField(default=0)
+    answers = models.PositiveIntegerField(default=0)
+    correct = models.PositiveIntegerField(default=0)
+    session_seconds = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['user', 'date']
 
 
 class Learning_Category(models.Model):
@@ -84,6 +163,99 @@ class Learned_Word(models.Model):
         unique_together = ['user', 'word']
 
 
+class Training_Job(models.Model):
+    class State(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    state = models.CharField(max_length=20, choices=State.choices, default=State.PENDING)
+    run_after = models.DateTimeField(default=timezone.now)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    fit_seconds = models.FloatField(null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            # Не больше одной ожидающей задачи на пользователя
+            models.UniqueConstraint(
+                fields=['user'],
+                condition=models.Q(state='pending'),
+                name='unique_pending_training_job'
+            )
+        ]
+        indexes = [
+            models.Index(fields=['state', 'run_after'])
+        ]
+
+
+class Wordlist_Source(models.Model):
+    """
+    Файл, из которого load_words загрузил категорию. По размеру, времени
+    изменения и хешу неизмененный файл пропускается, по отпечаткам строк
+    у измененного применяется только разница.
+    """
+    category = models.OneToOneField(Category, on_delete=models.CASCADE, related_name='source')
+    file_name = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField(default=0)
+    mtime_ns = models.BigIntegerField(default=0)
+    content_hash = models.CharField(max_length=64)  # sha256 содержимого
+    generation = models.PositiveIntegerField(default=0)  # Номер последней загрузки
+    loaded_at = models.DateTimeField(auto_now=True)
+
+
+class Wordlist_Line(models.Model):
+    """
+    Строка файла Wordlist_Source: отпечаток и слово, загруженное из нее.
+
+    generation - номер загрузки, в которой строка последний раз встретилась:
+    строки с меньшим номером из файла удалены.
+    """
+    source = models.ForeignKey(Wordlist_Source, on_delete=models.CASCADE, related_name='lines')
+    fingerprint = models.BigIntegerField()
+    word = models.ForeignKey(Word, on_delete=models.CASCADE)
+    generation = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ['source', 'fingerprint']
+        indexes = [
+            models.Index(fields=['source', 'generation'])
+        ]
+
+
+class Ingestion_Job(models.Model):
+    """Загрузка слов из файла, присланного при создании категории (см. manage.py ingest_worker)."""
+    class State(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    user = models.ForeignKey('auth.User', on_delete=models.CASCADE)
+    category = models.ForeignKey(Category, on_delete=models.CASCADE)
+    file_name = models.CharField(max_length=255)  # Путь в default_storage
+    state = models.CharField(max_length=20, choices=State.choices, default=State.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    rows = models.PositiveIntegerField(default=0)
+    words_added = models.PositiveIntegerField(default=0)
+    words_linked = models.PositiveIntegerField(default=0)
+    lines_skipped = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['state', 'created_at'])
+        ]
+
+
 class Feedback(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True)
     name = models.CharField(max_length=100)
@@ -97,6 +269,61 @@ class Feedback(models.Model):
     class Meta:
         ordering = ['-created_at']  # Сортировка по умолчанию - сначала новые
 
+class Catalog_Version(models.Model):
+    """
+    Версия каталога слов. Строка без владельца - общий каталог (публичные
+    категории и их слова), строки с владельцем - личные категории пользователя.
+    """
+    owner = models.OneToOneField(User, on_delete=models.CASCADE, null=True, blank=True, default=None)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # Строка общего каталога (owner IS NULL) только одна
+            models.UniqueConstraint(
+                Coalesce('owner', Value(0)),
+                name='unique_catalog_version_owner'
+            )
+        ]
+
+    @classmethod
+    def _rows(cls, owner_id):
+        return cls.objects.filter(owner_id=owner_id) if owner_id is not None else cls.objects.filter(owner__isnull=True)
+
+    @classmethod
+    def current(cls, owner_id=None):
+        return cls._rows(owner_id).values_list('version', flat=True).first() or 0
+
+    @classmethod
+    def bump(cls, owner_id=None):
+        """Отмечает изменение каталога: кеши в других процессах перестроятся при следующей проверке."""
+        updated = cls._rows(owner_id).update(version=F('version') + 1, updated_at=timezone.now())
+        # Владелец может быть уже удален: сигналы каскадного удаления его категорий
+        if not updated and (owner_id is None or User.objects.filter(pk=owner_id).exists()):
+            try:
+                with transaction.atomic():
+                    cls.objects.create(owner_id=owner_id, version=1)
+            except IntegrityError:
+                # Строку успел создать параллельный запрос
+                cls._rows(owner_id).update(version=F('version') + 1, updated_at=timezone.now())
+
+        if owner_id is not None:
+            return
+
+        # Кеш этого процесса сбрасывается сразу и еще раз после коммита, чтобы
+        # не остался индекс, построенный по незакоммиченным данным
+        from web.services.search_index import public_index
+        public_index.invalidate()
+        transaction.on_commit(public_index.invalidate)
+
+
+def bump_catalog_versions(owner_ids):
+    """Поднимает версии каталогов владельцев категорий (None - общий каталог)."""
+    for owner_id in set(owner_ids):
+        Catalog_Version.bump(owner_id)
+
+
 @receiver(m2m_changed, sender=Word.category.through)
 def delete_words_without_categories(sender, instance, action, **kwargs):
     if action in ['post_remove', 'post_clear']:
@@ -109,4 +336,58 @@ def on_category_delete(sender, instance, **kwargs):
     words = Word.objects.filter(category=instance)
     for word in words:
         if word.category.count() == 1 and instance in word.category.all():
-            word.delete()
\ No newline at end of file
+            word.delete()
+
+@receiver(m2m_changed, sender=Word.category.through)
+def on_word_categories_change(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'pre_clear'):
+        return
+    if reverse:
+        # instance - категория
+        owner_ids = [instance.owner_id]
+    elif action == 'pre_clear':
+        owner_ids = instance.category.values_list('owner_id', flat=True)
+    else:
+        owner_ids = Category.objects.filter(pk__in=pk_set).values_list('owner_id', flat=True)
+    bump_catalog_versions(owner_ids)
+
+
+@receiver(post_save, sender=Word)
+def on_word_save(sender, instance, created, **kwargs):
+    # Новое слово попадает в каталог только при добавлении в категорию
+    if not created:
+        bump_catalog_versions(instance.category.values_list('owner_id', flat=True))
+
+
+@receiver(pre_delete, sender=Word)
+def on_word_delete_user_stats(sender, instance, **kwargs):
+    # Learned_Word и Word_Repetition удаляются каскадом без сигналов в вызывающем коде
+    from web.services.user_stats import forget_word
+    forget_word(instance.id)
+
+
+@receiver(pre_delete, sender=Word)
+def on_word_pre_delete(sender, instance, **kwargs):
+    # После удаления связей с категориями уже не будет, владельцев запоминаем заранее
+    instance._catalog_owner_ids = list(instance.category.values_list('owner_id', flat=True))
+
+
+@receiver(post_delete, sender=Word)
+def on_word_delete(sender, instance, **kwargs):
+    owner_ids = getattr(instance, '_catalog_owner_ids', None)
+    # Без pre_delete (например, raw-удаление) владельцев не знаем - сбрасываем общий каталог
+    bump_catalog_versions(owner_ids if owner_ids is not None else [None])
+
+
+@receiver(post_save, sender=Category)
+@receiver(post_delete, sender=Category)
+def on_category_change(sender, instance, created=False, **kwargs):
+    if not created:
+        Catalog_Version.bump(instance.owner_id)
+
+
+@receiver(post_delete, sender=User)
+def on_user_delete(sender, instance, **kwargs):
+    # Сигналы каскадного удаления категорий могли заново создать строку
+    # версии удаляемого владельца до удаления самого пользователя
+    Catalog_Version.objects.filter(owner_id=instance.pk).delete()
@@ -0,0 +1,186 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+import numpy as np
+from django.db import IntegrityError, transaction
+
+from web.models import Answer_Attempt, Word_Stats
+
+
+EMA_ALPHA = 1 / 3  # Вес нового ответа в экспоненциально сглаженной доле верных ответов
+
+EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def to_microseconds(dt):
+    """Переводит datetime в целое число микросекунд от эпохи."""
+    delta = dt - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 10**6 + delta.microseconds
+
+
+def from_microseconds(us):
+    return EPOCH + timedelta(microseconds=int(us))
+
+
+def update_stats(stats, is_correct, timestamp):
+    """Учитывает один ответ в строке признаков (без сохранения)."""
+    x = 1.0 if is_correct else 0.0
+    if stats.attempts_total:
+        stats.success_ema = (1 - EMA_ALPHA) * stats.success_ema + EMA_ALPHA * x
+    else:
+        stats.success_ema = x
+    stats.attempts_total += 1
+    stats.correct_total += int(bool(is_correct))
+    stats.last_correct = bool(is_correct)
+    stats.last_attempt_at = timestamp
+    return stats
+
+
+def record_attempt(attempt):
+    """
+    Обновляет признаки слова после записи Answer_Attempt.
+
+    Вызывается в той же транзакции, что и создание попытки. Возвращает
+    актуальную строку Word_Stats, чтобы прогноз интервала не делал запросов.
+    """
+    with transaction.atomic():
+        try:
+            with transaction.atomic():
+                stats, _ = Word_Stats.objects.select_for_update().get_or_create(
+                    user_id=attempt.user_id,
+                    word_id=attempt.word_id
+                )
+        except IntegrityError:
+            # Строку успел создать параллельный запрос
+            stats = Word_Stats.objects.select_for_update().get(
+                user_id=attempt.user_id,
+                word_id=attempt.word_id
+            )
+
+        update_stats(stats, attempt.is_correct, attempt.timestamp)
+        stats.save(update_fields=[
+            'attempts_total', 'correct_total', 'last_correct', 'success_ema', 'last_attempt_at'
+        ])
+    return stats
+
+
+def record_attempts(attempts):
+    """
+    Пакетный record_attempt для уже сохраненных попыток.
+
+    Блокирует, при необходимости создает и обновляет строки Word_Stats
+    постоянным числом запросов. Попытки учитываются в порядке списка.
+    Возвращает словарь {(user_id, word_id): Word_Stats}.
+    """
+    keys = {(attempt.user_id, attempt.word_id) for attempt in attempts}
+    if not keys:
+        return {}
+
+    def fetch():
+        rows = Word_Stats.objects.select_for_update().filter(
+            user_id__in={user_id for user_id, _ in keys},
+            word_id__in={word_id for _, word_id in keys}
+        )
+        return {(row.user_id, row.word_id): row for row in rows if (row.user_id, row.word_id) in keys}
+
+    with transaction.atomic():
+        stats = fetch()
+        missing = keys - stats.keys()
+        if missing:
+            # Строки, которые успел создать параллельный запрос, пропускаются
+            Word_Stats.objects.bulk_create(
+                [Word_Stats(user_id=user_id, word_id=word_id) for user_id, word_id in missing],
+                ignore_conflicts=True
+            )
+            stats = fetch()
+
+        for attempt in attempts:
+            update_stats(stats[(attempt.user_id, attempt.word_id)], attempt.is_correct, attempt.timestamp)
+        Word_Stats.objects.bulk_update(stats.values(), [
+            'attempts_total', 'correct_total', 'last_correct', 'success_ema', 'last_attempt_at'
+        ])
+    return stats
+
+
+def group_attempts(word_ids, is_correct, timestamps_us, user_ids=None):
+    """
+    Сворачивает попытки в признаки по группам (слово или пара пользователь-слово).
+
+    Массивы должны быть отсортированы по ([user_id,] word_id, timestamp по убыванию).
+    Возвращает (starts, group, totals, correct_totals, ema): индексы первых (самых
+    свежих) строк групп, номер группы для каждой строки и агрегаты по группам,
+    совпадающие с тем, что накопил бы record_attempt.
+    """
+    n = len(word_ids)
+    is_start = np.empty(n, dtype=bool)
+    is_start[0] = True
+    np.not_equal(word_ids[1:], word_ids[:-1], out=is_start[1:])
+    if user_ids is not None:
+        is_start[1:] |= user_ids[1:] != user_ids[:-1]
+    starts = np.flatnonzero(is_start)
+    group = np.cumsum(is_start) - 1
+
+    rank = np.arange(n) - starts[group]  # 0 - самая свежая попытка
+    totals = np.diff(np.append(starts, n))
+    correct_totals = np.add.reduceat(is_correct, starts)
+
+    # s = sum(a * (1-a)^rank * x) по всем, кроме самой старой попытки, у которой вес (1-a)^rank
+    is_oldest = rank == totals[group] - 1
+    weights = np.where(is_oldest, 1.0, EMA_ALPHA) * (1 - EMA_ALPHA) ** rank
+    ema = np.add.reduceat(weights * is_correct, starts)
+
+    return starts, group, totals, correct_totals, ema
+
+
+def rebuild_word_stats(user=None, word_ids=None, batch_size=10000):
+    """
+    Пересчитывает Word_Stats по истории ответов (для заполнения и сверки).
+
+    Если передан word_ids, пересчитываются только эти слова.
+    """
+    users = [user.id] if user is not None else list(
+        Answer_Attempt.objects.values_list('user_id', flat=True).distinct().order_by('user_id')
+    )
+    rebuilt = 0
+
+    for user_id in users:
+        attempts = Answer_Attempt.objects.filter(user_id=user_id)
+        stats = Word_Stats.objects.filter(user_id=user_id)
+        if word_ids is not None:
+            attempts = attempts.filter(word_id__in=word_ids)
+            stats = stats.filter(word_id__in=word_ids)
+
+        rows = list(
+            attempts
+            .order_by('word_id', '-timestamp', '-id')
+            .values_list('word_id', 'is_correct', 'timestamp')
+        )
+
+        with transaction.atomic():
+            stats.delete()
+            if not rows:
+                continue
+
+            row_word_ids, is_correct, timestamps = zip(*rows)
+            row_word_ids = np.fromiter(row_word_ids, dtype=np.int64, count=len(rows))
+            is_correct = np.fromiter(is_correct, dtype=np.int64, count=len(rows))
+            starts, _, totals, correct_totals, ema = group_attempts(
+                row_word_ids,
+                is_correct,
+                np.fromiter((to_microseconds(t) for t in timestamps), dtype=np.int64, count=len(rows)),
+            )
+
+            Word_Stats.objects.bulk_create(
+                (Word_Stats(
+                    user_id=user_id,
+                    word_id=int(row_word_ids[start]),
+                    attempts_total=int(total),
+                    correct_total=int(correct_total),
+                    last_correct=bool(is_correct[start]),
+                    success_ema=float(success),
+                    last_attempt_at=timestamps[start],
+                ) for start, total, correct_total, success in zip(starts, totals, correct_totals, ema)),
+                batch_size=batch_size
+            )
+            rebuilt += len(starts)
+
+    return rebuilt
@@ -0,0 +1,149 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from web.models import Ingestion_Job
+from web.services.word_ingest import ingest_file
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_STALE_AFTER = 3600  # Через сколько секунд задача в RUNNING считается брошенной
+DEFAULT_KEEP_FINISHED = 86400  # Сколько секунд хранить завершенные задачи для страницы статуса
+MAX_ERROR_LINES = 20  # Сколько пропущенных строк перечислять в ошибке задачи
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_upload(user, category, word_file):
+    """
+    Сохраняет загруженный файл и ставит его загрузку в очередь.
+
+    Файл кладется под уникальным именем в tmp/<user_id>, задача знает
+    только свой файл - воркер не перечитывает прошлые загрузки пользователя.
+    """
+    upload_path = os.path.join('tmp', str(user.id), f'{category.name}.txt')
+    file_name = default_storage.save(upload_path, word_file)
+    return Ingestion_Job.objects.create(user=user, category=category, file_name=file_name)
+
+
+def discard_uploads(category):
+    """
+    Удаляет файлы загрузок категории перед ее удалением.
+
+    Задачи удалятся каскадом вместе с категорией, а их файлы, в том числе
+    сохраненные default_storage под измененным именем, остались бы в хранилище.
+    """
+    for file_name in Ingestion_Job.objects.filter(category=category).values_list('file_name', flat=True):
+        if default_storage.exists(file_name):
+            default_storage.delete(file_name)
+
+
+def claim_next_job(now=None):
+    """Забирает самую старую ожидающую задачу или возвращает None."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        job = (Ingestion_Job.objects
+               .select_for_update(skip_locked=True)
+               .filter(state=Ingestion_Job.State.PENDING)
+               .order_by('created_at', 'id')
+               .first())
+        if job is None:
+            return None
+
+        job.state = Ingestion_Job.State.RUNNING
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['state', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job):
+    """
+    Загружает слова из файла задачи в ее категорию.
+
+    Ошибка в файле не исправится повтором, поэтому задача сразу помечается
+    упавшей. Файл удаляется после завершения задачи в любом случае.
+    """
+    try:
+        result = ingest_file(default_storage.path(job.file_name), job.category)
+    except Exception as e:
+        logger.exception("Ingestion job %s for category %s failed", job.id, job.category_id)
+        job.state = Ingestion_Job.State.FAILED
+        job.error = str(e)
+    else:
+        job.state = Ingestion_Job.State.DONE
+        job.rows = result.rows
+        job.words_added = result.added
+        job.words_linked = result.linked
+        job.lines_skipped = len(result.errors)
+        job.error = '\n'.join(
+            f"{error.line_number}: {error.reason}" for error in result.errors[:MAX_ERROR_LINES]
+        )
+
+    job.finished_at = timezone.now()
+    # Обновление через queryset: пока шла загрузка, категорию с задачей могли удалить
+    Ingestion_Job.objects.filter(pk=job.pk).update(**{
+        field: getattr(job, field)
+        for field in ('state', 'finished_at', 'rows', 'words_added', 'words_linked', 'lines_skipped', 'error')
+    })
+    if default_storage.exists(job.file_name):
+        default_storage.delete(job.file_name)
+    return job.state == Ingestion_Job.State.DONE
+
+
+def requeue_stale_jobs(now=None):
+    """
+    Возвращает в очередь задачи, брошенные упавшим воркером.
+
+    Повторная загрузка того же файла безопасна: существующие слова и связи
+    не дублируются. После INGEST_MAX_ATTEMPTS попыток задача считается упавшей.
+    """
+    now = now or timezone.now()
+    stale = Ingestion_Job.objects.filter(
+        state=Ingestion_Job.State.RUNNING,
+        started_at__lt=now - timedelta(seconds=_setting('INGEST_STALE_AFTER', DEFAULT_STALE_AFTER))
+    )
+    requeued = 0
+    for job in stale:
+        if job.attempts < _setting('INGEST_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+            job.state = Ingestion_Job.State.PENDING
+            requeued += 1
+        else:
+            job.state = Ingestion_Job.State.FAILED
+            job.finished_at = now
+        job.error = 'Worker did not finish the job'
+        job.save(update_fields=['state', 'finished_at', 'error'])
+    return requeued
+
+
+def cleanup_finished_jobs(now=None):
+    now = now or timezone.now()
+    deleted, _ = Ingestion_Job.objects.filter(
+        state__in=[Ingestion_Job.State.DONE, Ingestion_Job.State.FAILED],
+        finished_at__lt=now - timedelta(seconds=_setting('INGEST_KEEP_FINISHED', DEFAULT_KEEP_FINISHED))
+    ).delete()
+    return deleted
+
+
+def job_status(job):
+    """Состояние задачи для страницы, которая ждет окончания загрузки."""
+    return {
+        'id': job.id,
+        'category_id': job.category_id,
+        'category_name': job.category.name,
+        'state': job.state,
+        'finished': job.state in (Ingestion_Job.State.DONE, Ingestion_Job.State.FAILED),
+        'rows': job.rows,
+        'words_added': job.words_added,
+        'words_linked': job.words_linked,
+        'lines_skipped': job.lines_skipped,
+    }
@@ -0,0 +1,58 @@
+import time
+
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+from sklearn.preprocessing import StandardScaler
+
+
+CLASSES = np.array([0, 1])
+TIME_FEATURE = 4  # Индекс time_since_last в FEATURE_NAMES
+
+
+class OnlineRepetitionModel:
+    """
+    Инкрементальная модель: логистическая регрессия на SGD с partial_fit.
+
+    Дообучается только на новых попытках (last_attempt_id - последняя
+    учтенная попытка), поэтому стоимость обновления не растет с историей.
+    Полное переобучение (fit) остается страховкой от дрейфа.
+    """
+    def __init__(self):
+        self.scaler = StandardScaler()
+        self.classifier = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+        self.last_attempt_id = 0
+        self.updates_since_refit = 0
+        self.refitted_at = None
+
+    def _transform(self, X):
+        X = np.array(X, dtype=np.float64)
+        # Время с последней попытки имеет тяжелый хвост, сжимаем его
+        X[:, TIME_FEATURE] = np.log1p(np.maximum(X[:, TIME_FEATURE], 0))
+        return X
+
+    def fit(self, X, y, sample_weight=None):
+        X = self._transform(X)
+        self.scaler = StandardScaler().fit(X, sample_weight=sample_weight)
+        self.classifier = SGDClassifier(loss='log_loss', alpha=1e-4, random_state=0)
+        self.classifier.partial_fit(self.scaler.transform(X), y, classes=CLASSES, sample_weight=sample_weight)
+        # Несколько проходов по истории, дальше модель живет на partial_fit
+        for _ in range(4):
+            self.classifier.partial_fit(self.scaler.transform(X), y, sample_weight=sample_weight)
+        self.updates_since_refit = 0
+        self.refitted_at = time.time()
+        return self
+
+    def partial_fit(self, X, y, sample_weight=None):
+        X = self._transform(X)
+        self.scaler.partial_fit(X, sample_weight=sample_weight)
+        self.classifier.partial_fit(self.scaler.transform(X), y, classes=CLASSES, sample_weight=sample_weight)
+        self.updates_since_refit += len(y)
+        return self
+
+    def predict_proba(self, X):
+        return self.classifier.predict_proba(self.scaler.transform(self._transform(X)))
+
+    def needs_refit(self, max_updates, max_age):
+        if self.refitted_at is None:
+            return True
+        return self.updates_since_refit >= max_updates or time.time() - self.refitted_at >= max_age
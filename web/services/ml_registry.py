@@ -0,0 +1,95 @@
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.conf import settings
+
+
+POPULATION_KEY = 'population'  # Общая модель для пользователей без своей
+DEFAULT_CACHE_SIZE = 128
+DEFAULT_REFRESH_INTERVAL = 60  # Секунды между проверками новой версии в хранилище
+
+
+class ModelRegistry:
+    """
+    Реестр обученных моделей по пользователям.
+
+    Держит в памяти ограниченный LRU-кэш моделей. При промахе модель лениво
+    подгружается из source (см. ModelStore), а раз в refresh_interval секунд
+    проверяется, не появилась ли в source более новая версия (ее мог обучить
+    другой процесс). Если у пользователя модели нет, используется общая
+    модель POPULATION_KEY.
+    """
+    def __init__(self, source=None, max_size=None, refresh_interval=None):
+        self.source = source
+        self.max_size = max_size
+        self.refresh_interval = refresh_interval
+        self._models = OrderedDict()  # key -> (model, version, checked_at)
+        self._lock = Lock()
+
+    def _get_max_size(self):
+        if self.max_size is not None:
+            return self.max_size
+        return getattr(settings, 'ML_MODEL_CACHE_SIZE', DEFAULT_CACHE_SIZE)
+
+    def _get_refresh_interval(self):
+        if self.refresh_interval is not None:
+            return self.refresh_interval
+        return getattr(settings, 'ML_MODEL_REFRESH_INTERVAL', DEFAULT_REFRESH_INTERVAL)
+
+    def _remember(self, key, model, version):
+        self._models[key] = (model, version, time.monotonic())
+        self._models.move_to_end(key)
+        while len(self._models) > max(1, self._get_max_size()):
+            self._models.popitem(last=False)
+
+    def get(self, key):
+        """Возвращает модель по ключу или None, загружая ее при первом обращении."""
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                model, version, checked_at = entry
+                if self.source is None or time.monotonic() - checked_at < self._get_refresh_interval():
+                    return model
+
+        if self.source is None:
+            return None
+
+        current_version = self.source.current_version(key)
+        if entry is not None and entry[1] == current_version:
+            with self._lock:
+                self._remember(key, entry[0], current_version)
+            return entry[0]
+
+        model = self.source.load(key, current_version) if current_version else None
+        with self._lock:
+            # Отсутствие модели тоже кэшируем, чтобы не ходить в source на каждый запрос
+            self._remember(key, model, current_version)
+        return model
+
+    def get_for_user(self, user_id):
+        """Модель пользователя, а если ее нет - общая модель."""
+        model = self.get(user_id)
+        if model is None:
+            model = self.get(POPULATION_KEY)
+        return model
+
+    def put(self, key, model, version=None):
+        with self._lock:
+            self._remember(key, model, version)
+
+    def discard(self, key):
+        with self._lock:
+            self._models.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+    def __len__(self):
+        return len(self._models)
+
+    def __contains__(self, key):
+        entry = self._models.get(key)
+        return entry is not None and entry[0] is not None
@@ -1,75 +1,405 @@
-from random import random
-from threading import Thread
+from datetime import timedelta
 
-from django.db import close_old_connections
+from django.conf import settings
+from django.db.models import Max
 from django.utils import timezone
 import numpy as np
 from sklearn.ensemble import RandomForestClassifier
 
-from web.models import Answer_Attempt, Word_Repetition
+from web.models import Answer_Attempt, Word_Stats
+from web.services.feature_store import from_microseconds, group_attempts, to_microseconds
+from web.services.ml_online import OnlineRepetitionModel
+from web.services.ml_registry import POPULATION_KEY, ModelRegistry
+from web.services.ml_store import ModelStore
+from web.services.ml_training import enqueue_training
+from web.services.schedulers import DEFAULT_INTERVALS
 
 
-DEFAULT_INTERVALS = [30, 120, 360, 1440, 4320]  # 30мин, 2ч, 6ч, 1д, 3д
+
+FEATURE_NAMES = ('attempts_count', 'last_correct', 'success_rate', 'word_len', 'time_since_last')
+FEATURE_VERSION = 2  # 2 - success_rate считается экспоненциальным сглаживанием (Word_Stats)
+FEATURE_WINDOW = 5  # Потолок attempts_count
+MIN_TRAINING_ATTEMPTS = 20
+POPULATION_MAX_ROWS = 100_000  # Сколько недавно обновленных строк Word_Stats берется для общей модели
+
+MODEL_KINDS = ('forest', 'online')
+ONLINE_REFIT_EVERY = 1000  # Полное переобучение онлайн-модели после стольких инкрементальных обновлений
+ONLINE_REFIT_MAX_AGE = 86400  # ...или если полного переобучения не было столько секунд
+
+
+def features_from_stats(attempts_total, last_correct, success_ema, word_len, last_attempt_us, now_us):
+    """
+    Матрица признаков (в порядке FEATURE_NAMES) из агрегатов по словам.
+
+    Все аргументы - массивы одной длины (кроме now_us). Для слов без попыток
+    attempts_total должен быть 0, остальные значения при этом игнорируются.
+    """
+    attempts_total = np.asarray(attempts_total, dtype=np.int64)
+    has_attempts = attempts_total > 0
+    return np.column_stack([
+        np.minimum(attempts_total, FEATURE_WINDOW),
+        np.where(has_attempts, last_correct, 0),
+        np.where(has_attempts, success_ema, 0),
+        word_len,
+        np.where(has_attempts, (now_us - np.asarray(last_attempt_us, dtype=np.int64)) / 10**6, 0),
+    ]).astype(np.float64)
+
+
+def compute_features_batch(word_ids, word_lens, is_correct, timestamps_us, now_us, user_ids=None):
+    """
+    Считает признаки для всех попыток разом прямо по истории ответов.
+
+    Входные массивы должны быть отсортированы по ([user_id,] word_id, timestamp по убыванию).
+    Если передан user_ids, группы считаются по парам (пользователь, слово).
+    Возвращает матрицу признаков (по строке на попытку) в порядке FEATURE_NAMES,
+    совпадающую с тем, что дают признаки из Word_Stats для слова попытки.
+    """
+    if len(word_ids) == 0:
+        return np.empty((0, len(FEATURE_NAMES)))
+
+    starts, group, totals, _, ema = group_attempts(word_ids, is_correct, timestamps_us, user_ids)
+    per_word = features_from_stats(
+        totals, is_correct[starts], ema, word_lens[starts], timestamps_us[starts], now_us
+    )
+    return per_word[group]
+
+
+def get_model_kind():
+    kind = getattr(settings, 'ML_MODEL_KIND', 'forest')
+    if kind not in MODEL_KINDS:
+        raise ValueError(f"Unknown ML_MODEL_KIND: {kind}")
+    return kind
+
+
+def create_model():
+    if get_model_kind() == 'online':
+        return OnlineRepetitionModel()
+    return RandomForestClassifier(n_estimators=30)
+
 
 class RepetitionMLService:
-    def __init__(self):
-        self.model = RandomForestClassifier(n_estimators=30)
-        self.is_trained = False
-        self.training_lock = False
+    def __init__(self, registry=None, store=None):
+        self.store = store or ModelStore(features=(FEATURE_VERSION,) + FEATURE_NAMES)
+        self.registry = registry or ModelRegistry(source=self.store)
+
+    def get_model(self, user):
+        """Модель для пользователя: своя, общая или None, если обучить еще не успели."""
+        return self.registry.get_for_user(user.id)
+
+    def is_trained(self, user):
+        return self.get_model(user) is not None
 
     def get_initial_interval(self):
         return DEFAULT_INTERVALS[0]
-    
-    def _get_features(self, user, word):
-        attempts = Answer_Attempt.objects.filter(
-            user=user, 
-            word=word
-        ).order_by('-timestamp')[:5]
-        
+
+    def _get_features(self, user, word, now=None, stats=None):
+        """
+        Признаки слова из Word_Stats.
+
+        Если строка признаков уже есть (например, ее вернул record_attempt),
+        запросов к базе не делается.
+        """
+        if stats is None:
+            stats = Word_Stats.objects.filter(user=user, word=word).first()
+        now = now or timezone.now()
+
+        if stats is None or not stats.attempts_total:
+            return {
+                'attempts_count': 0,
+                'last_correct': 0,
+                'success_rate': 0,
+                'word_len': len(word.word),
+                'time_since_last': 0,
+            }
+
         return {
-            'attempts_count': attempts.count(),
-            'last_correct': int(attempts[0].is_correct) if attempts else 0,
-            'success_rate': sum(a.is_correct for a in attempts)/len(attempts) if attempts else 0,
+            'attempts_count': min(stats.attempts_total, FEATURE_WINDOW),
+            'last_correct': int(stats.last_correct),
+            'success_rate': stats.success_ema,
             'word_len': len(word.word),
-            'time_since_last': (timezone.now() - attempts[0].timestamp).total_seconds() if attempts else 0,
+            'time_since_last': (now - stats.last_attempt_at).total_seconds(),
         }
-    
-    def _train_thread(self, user):
-        try:
-            self.training_lock = True
-            close_old_connections()
-            
-            attempts = Answer_Attempt.objects.filter(user=user)
-            if len(attempts) < 20:
-                return
-            
-            X, y = [], []
-            for attempt in attempts:
-                features = self._get_features(user, attempt.word)
-                X.append(list(features.values()))
-                y.append(int(attempt.is_correct))
-            
-            self.model.fit(X, y)
-            self.is_trained = True
-        finally:
-            self.training_lock = False
-    
+
+    def _stats_features(self, rows, now=None):
+        """Признаки из строк (attempts_total, last_correct, success_ema, word, last_attempt_at)."""
+        if not rows:
+            return np.empty((0, len(FEATURE_NAMES)))
+
+        attempts_total, last_correct, success_ema, words, last_attempt_at = zip(*rows)
+        return features_from_stats(
+            attempts_total,
+            np.array(last_correct, dtype=np.float64),
+            np.array(success_ema, dtype=np.float64),
+            [len(w) for w in words],
+            [to_microseconds(t) if t else 0 for t in last_attempt_at],
+            to_microseconds(now or timezone.now()),
+        )
+
+    def _attempt_features(self, attempts, now=None, by_user=False):
+        """
+        Признаки для queryset попыток, посчитанные по самой истории ответов.
+
+        Используется для сверки с Word_Stats и в бенчмарке. Возвращает (ids, X, y).
+        При by_user=True группы считаются по парам (пользователь, слово).
+        """
+        rows = list(
+            attempts
+            .order_by('user_id', 'word_id', '-timestamp', '-id')
+            .values_list('id', 'user_id', 'word_id', 'word__word', 'is_correct', 'timestamp')
+        )
+        now = now or timezone.now()
+
+        if not rows:
+            return (
+                np.empty(0, dtype=np.int64),
+                np.empty((0, len(FEATURE_NAMES))),
+                np.empty(0, dtype=np.int64)
+            )
+
+        ids, user_ids, word_ids, words, is_correct, timestamps = zip(*rows)
+        is_correct = np.fromiter(is_correct, dtype=np.int64, count=len(rows))
+        X = compute_features_batch(
+            np.fromiter(word_ids, dtype=np.int64, count=len(rows)),
+            np.fromiter((len(w) for w in words), dtype=np.int64, count=len(rows)),
+            is_correct,
+            np.fromiter((to_microseconds(t) for t in timestamps), dtype=np.int64, count=len(rows)),
+            to_microseconds(now),
+            user_ids=np.fromiter(user_ids, dtype=np.int64, count=len(rows)) if by_user else None,
+        )
+        return np.fromiter(ids, dtype=np.int64, count=len(rows)), X, is_correct
+
+    def _build_training_set(self, user=None, now=None, max_rows=None):
+        """
+        Строит обучающую выборку по Word_Stats одним запросом.
+
+        У всех попыток одного слова одинаковые признаки, поэтому вместо строки на
+        попытку каждое слово дает две взвешенные строки: верные ответы (y=1) с весом
+        correct_total и неверные (y=0) с весом attempts_total - correct_total.
+        Для user=None берутся max_rows недавно обновленных слов всех пользователей.
+        Возвращает (X, y, sample_weight).
+        """
+        stats = Word_Stats.objects.filter(attempts_total__gt=0)
+        if user is not None:
+            stats = stats.filter(user=user)
+        else:
+            stats = stats.order_by('-last_attempt_at')
+            if max_rows:
+                stats = stats[:max_rows]
+
+        rows = list(stats.values_list(
+            'attempts_total', 'last_correct', 'success_ema', 'word__word', 'last_attempt_at', 'correct_total'
+        ))
+        X = self._stats_features([row[:5] for row in rows], now=now)
+        attempts_total = np.array([row[0] for row in rows], dtype=np.float64)
+        correct_total = np.array([row[5] for row in rows], dtype=np.float64)
+
+        X = np.vstack([X, X])
+        y = np.concatenate([np.ones(len(rows), dtype=np.int64), np.zeros(len(rows), dtype=np.int64)])
+        weights = np.concatenate([correct_total, attempts_total - correct_total])
+
+        keep = weights > 0
+        return X[keep], y[keep], weights[keep]
+
+    def _build_incremental_set(self, user, since_id, now=None):
+        """
+        Выборка только по попыткам новее since_id: строка на попытку
+        с текущими признаками слова из Word_Stats. Возвращает (ids, X, y).
+        """
+        attempts = list(
+            Answer_Attempt.objects
+            .filter(user=user, id__gt=since_id)
+            .order_by('id')
+            .values_list('id', 'word_id', 'is_correct')
+        )
+        if not attempts:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(FEATURE_NAMES))), np.empty(0, dtype=np.int64)
+
+        ids, word_ids, is_correct = zip(*attempts)
+        stats = {
+            row[0]: row[1:]
+            for row in Word_Stats.objects
+            .filter(user=user, word_id__in=set(word_ids))
+            .values_list('word_id', 'attempts_total', 'last_correct', 'success_ema', 'word__word', 'last_attempt_at')
+        }
+        # Слово могли удалить после ответа - такие попытки пропускаем
+        mask = np.array([w in stats for w in word_ids], dtype=bool)
+        X = self._stats_features([stats[w] for w in word_ids if w in stats], now=now)
+        return (
+            np.array(ids, dtype=np.int64)[mask],
+            X,
+            np.array(is_correct, dtype=np.int64)[mask]
+        )
+
+    def _publish(self, key, model, **meta):
+        """Сохраняет модель на диск и сразу делает ее доступной в этом процессе."""
+        version = self.store.save(key, model, **meta)
+        self.registry.put(key, model, version)
+
+    def _fit(self, X, y, sample_weight=None):
+        model = create_model()
+        model.fit(X, y, sample_weight=sample_weight)
+        return model
+
+    def _enough_history(self, y, sample_weight):
+        return sample_weight.sum() >= MIN_TRAINING_ATTEMPTS and len(set(y)) >= 2
+
+    def train_for_user(self, user):
+        """Обучает модель пользователя. Возвращает False, если истории мало."""
+        if get_model_kind() == 'online':
+            return self._update_online(user)
+
+        X, y, weights = self._build_training_set(user)
+        if not self._enough_history(y, weights):
+            return False
+
+        self._publish(user.id, self._fit(X, y, weights), n_samples=int(weights.sum()))
+        return True
+
+    def _update_online(self, user):
+        """Дообучает онлайн-модель на новых попытках, изредка переобучая ее целиком."""
+        model = self.store.load(user.id, mmap=False)
+        refit = (
+            not isinstance(model, OnlineRepetitionModel) or
+            model.needs_refit(
+                getattr(settings, 'ML_ONLINE_REFIT_EVERY', ONLINE_REFIT_EVERY),
+                getattr(settings, 'ML_ONLINE_REFIT_MAX_AGE', ONLINE_REFIT_MAX_AGE)
+            )
+        )
+
+        if refit:
+            last_attempt_id = Answer_Attempt.objects.filter(user=user).aggregate(last=Max('id'))['last']
+            X, y, weights = self._build_training_set(user)
+            if not self._enough_history(y, weights):
+                return False
+            model = OnlineRepetitionModel().fit(X, y, sample_weight=weights)
+            n_samples = int(weights.sum())
+        else:
+            ids, X, y = self._build_incremental_set(user, model.last_attempt_id)
+            if not len(ids):
+                return True
+            model.partial_fit(X, y)
+            last_attempt_id = int(ids.max())
+            n_samples = len(y)
+
+        model.last_attempt_id = last_attempt_id
+        self._publish(user.id, model, n_samples=n_samples, refit=refit)
+        return True
+
+    def train_population(self):
+        """Обучает общую модель по недавно обновленным признакам всех пользователей."""
+        max_rows = getattr(settings, 'ML_POPULATION_MAX_ROWS', POPULATION_MAX_ROWS)
+        X, y, weights = self._build_training_set(max_rows=max_rows)
+        if not self._enough_history(y, weights):
+            return False
+
+        self._publish(POPULATION_KEY, self._fit(X, y, weights), n_samples=int(weights.sum()))
+        return True
+
     def train_for_user_async(self, user):
-        if not self.training_lock and random.random() < 0.3:
-            thread = Thread(target=self._train_thread, args=(user,))
-            thread.daemon = True
-            thread.start()
-    
-    def predict_next_interval(self, user, word, current_repetition):
+        """Ставит обучение в очередь; само обучение выполняет `manage.py ml_worker`."""
+        return enqueue_training(user)
+
+    def _word_features(self, user, words, now=None):
+        """
+        Признаки для списка слов пользователя одним запросом к Word_Stats.
+
+        Возвращает (X, last_attempt_us): матрицу признаков по строке на слово
+        и время последней попытки в микросекундах (0, если попыток не было).
+        """
+        stats = {
+            row[0]: row[1:]
+            for row in Word_Stats.objects
+            .filter(user=user, word_id__in=[word.id for word in words])
+            .values_list('word_id', 'attempts_total', 'last_correct', 'success_ema', 'last_attempt_at')
+        } if words else {}
+
+        rows = []
+        for word in words:
+            attempts_total, last_correct, success_ema, last_attempt_at = stats.get(word.id, (0, False, 0, None))
+            rows.append((attempts_total, last_correct, success_ema, word.word, last_attempt_at))
+
+        X = self._stats_features(rows, now=now)
+        last_attempt_us = np.array(
+            [to_microseconds(row[4]) if row[0] else 0 for row in rows], dtype=np.int64
+        )
+        return X, last_attempt_us
+
+    def _intervals_from_proba(self, proba, repetition_counts):
+        """Переводит вероятность правильного ответа в интервалы (в минутах)."""
+        base = np.array(DEFAULT_INTERVALS, dtype=np.float64)[
+            np.minimum(np.asarray(repetition_counts, dtype=np.int64), len(DEFAULT_INTERVALS) - 1)
+        ]
+        if proba is None:
+            return base
+
+        return np.select(
+            [proba > 0.9, proba > 0.7, proba > 0.5],  # Очень легко / легко / нормально
+            [base * 2, base * 1.5, base],
+            default=np.maximum(30, base * 0.7)  # Сложно, но не меньше 30 минут
+        )
+
+    def _predict_proba(self, model, X):
+        if model is None or not len(X):
+            return None
+        try:
+            return model.predict_proba(X)[:, 1]
+        except Exception:
+            return None
+
+    def predict_next_intervals(self, user, words, repetition_counts, now=None):
+        """
+        Интервалы до следующего повторения для многих слов сразу.
+
+        Признаки строятся одним запросом, модель вызывается один раз.
+        Возвращает numpy-массив интервалов в минутах в порядке words.
+        """
+        words = list(words)
+        model = self.get_model(user)
+        if model is None:
+            return self._intervals_from_proba(None, repetition_counts)
+
+        X, _ = self._word_features(user, words, now=now)
+        return self._intervals_from_proba(self._predict_proba(model, X), repetition_counts)
+
+    def reschedule(self, user, repetitions, now=None):
+        """
+        Пересчитывает next_review для повторений пользователя от времени последнего ответа.
+
+        Повторения без попыток ответа не меняются. Возвращает список измененных повторений
+        (сохранять их вызывающий код должен сам, например через bulk_update).
+        """
+        repetitions = list(repetitions)
+        model = self.get_model(user)
+        if model is None or not repetitions:
+            return []
+
+        X, last_attempt_us = self._word_features(user, [r.word for r in repetitions], now=now)
+        intervals = self._intervals_from_proba(
+            self._predict_proba(model, X),
+            [r.repetition_count for r in repetitions]
+        )
+
+        changed = []
+        for repetition, last_us, interval in zip(repetitions, last_attempt_us, intervals):
+            if not last_us:
+                continue
+            next_review = from_microseconds(last_us) + timedelta(minutes=float(interval))
+            if next_review != repetition.next_review:
+                repetition.next_review = next_review
+                changed.append(repetition)
+        return changed
+
+    def predict_next_interval(self, user, word, current_repetition, stats=None):
         base_interval = DEFAULT_INTERVALS[min(current_repetition, len(DEFAULT_INTERVALS)-1)]
-        
-        if not self.is_trained:
+
+        model = self.get_model(user)
+        if model is None:
             return base_interval
-        
+
         try:
-            features = self._get_features(user, word)
-            proba = self.model.predict_proba([list(features.values())])[0][1]
-            
+            features = self._get_features(user, word, stats=stats)
+            proba = model.predict_proba([list(features.values())])[0][1]
+
             if proba > 0.9:  # Очень легко
                 return base_interval * 2
             elif proba > 0.7:
@@ -82,4 +412,4 @@ class RepetitionMLService:
             return base_interval
 
 
-ml_service = RepetitionMLService()
\ No newline at end of file
+ml_service = RepetitionMLService()
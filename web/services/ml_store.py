@@ -0,0 +1,128 @@
+import os
+import tempfile
+import time
+
+import joblib
+from django.conf import settings
+
+
+FORMAT_VERSION = 1  # Увеличивать при несовместимом изменении формата или признаков
+CURRENT_FILE = 'CURRENT'
+MODEL_SUFFIX = '.joblib'
+DEFAULT_KEEP_VERSIONS = 3
+
+
+class ModelStore:
+    """
+    Версионированное хранилище моделей на диске.
+
+    Каждая версия - отдельный несжатый joblib-файл <root>/<key>/<version>.joblib,
+    который загружается через mmap, поэтому процессы на одной машине делят
+    страницы памяти. Текущая версия указывается в файле CURRENT, который
+    заменяется атомарно (os.replace), так что читатели всегда видят либо
+    старую, либо новую версию целиком.
+    """
+    def __init__(self, root=None, features=None):
+        self._root = root
+        self.features = tuple(features) if features else None
+
+    @property
+    def root(self):
+        if self._root is not None:
+            return self._root
+        return getattr(settings, 'ML_MODELS_DIR', os.path.join(settings.BASE_DIR, 'ml_models'))
+
+    def _key_dir(self, key):
+        return os.path.join(self.root, str(key))
+
+    def _write_atomic(self, path, write):
+        directory = os.path.dirname(path)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.tmp-')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                write(f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def current_version(self, key):
+        """Имя текущей версии модели или None, если модели нет."""
+        try:
+            with open(os.path.join(self._key_dir(key), CURRENT_FILE)) as f:
+                return f.read().strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, key, model, **meta):
+        """Сохраняет новую версию модели и делает ее текущей. Возвращает имя версии."""
+        key_dir = self._key_dir(key)
+        os.makedirs(key_dir, exist_ok=True)
+
+        version = f'{time.time_ns()}-{os.getpid()}'
+        payload = {
+            'format': FORMAT_VERSION,
+            'features': self.features,
+            'created_at': time.time(),
+            'meta': meta,
+            'model': model,
+        }
+        self._write_atomic(
+            os.path.join(key_dir, version + MODEL_SUFFIX),
+            lambda f: joblib.dump(payload, f)
+        )
+        self._write_atomic(
+            os.path.join(key_dir, CURRENT_FILE),
+            lambda f: f.write(version.encode())
+        )
+        self._prune(key_dir, version)
+        return version
+
+    def load(self, key, version=None, mmap=True):
+        """
+        Загружает модель (текущую или указанную версию) или возвращает None.
+
+        Массивы модели, загруженной через mmap, доступны только для чтения;
+        для дообучения нужно грузить с mmap=False.
+        """
+        version = version or self.current_version(key)
+        if version is None:
+            return None
+
+        try:
+            payload = joblib.load(
+                os.path.join(self._key_dir(key), version + MODEL_SUFFIX),
+                mmap_mode='r' if mmap else None
+            )
+        except FileNotFoundError:
+            return None
+
+        if payload.get('format') != FORMAT_VERSION or payload.get('features') != self.features:
+            return None
+        return payload['model']
+
+    def delete(self, key):
+        key_dir = self._key_dir(key)
+        if not os.path.isdir(key_dir):
+            return
+        for name in os.listdir(key_dir):
+            os.remove(os.path.join(key_dir, name))
+        os.rmdir(key_dir)
+
+    def _prune(self, key_dir, current):
+        """Удаляет старые версии, оставляя несколько последних."""
+        keep = getattr(settings, 'ML_MODELS_KEEP_VERSIONS', DEFAULT_KEEP_VERSIONS)
+        versions = sorted(
+            (name for name in os.listdir(key_dir) if name.endswith(MODEL_SUFFIX)),
+            key=lambda name: int(name.split('-')[0]),
+            reverse=True
+        )
+        for name in versions[max(1, keep):]:
+            if name != current + MODEL_SUFFIX:
+                try:
+                    os.remove(os.path.join(key_dir, name))
+                except FileNotFoundError:
+                    pass
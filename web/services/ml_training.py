@@ -0,0 +1,159 @@
+import logging
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import Count, Min
+from django.utils import timezone
+
+from web.models import Training_Job
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DEBOUNCE = 60  # Секунды, в течение которых ответы копятся в одну задачу
+DEFAULT_BACKOFF = 60  # Базовая задержка перед повтором упавшей задачи
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_STALE_AFTER = 3600  # Через сколько секунд задача в RUNNING считается брошенной
+DEFAULT_KEEP_FINISHED = 86400  # Сколько секунд хранить завершенные задачи для метрик
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def enqueue_training(user, now=None):
+    """
+    Ставит обучение модели пользователя в очередь.
+
+    Если у пользователя уже есть ожидающая задача, новая не создается:
+    все ответы за время ML_TRAIN_DEBOUNCE попадут в одно обучение.
+    """
+    now = now or timezone.now()
+    if Training_Job.objects.filter(user=user, state=Training_Job.State.PENDING).exists():
+        return False
+
+    try:
+        with transaction.atomic():
+            Training_Job.objects.create(
+                user=user,
+                run_after=now + timedelta(seconds=_setting('ML_TRAIN_DEBOUNCE', DEFAULT_DEBOUNCE))
+            )
+    except IntegrityError:
+        # Задачу успел поставить параллельный запрос
+        return False
+    return True
+
+
+def claim_next_job(now=None):
+    """Забирает следующую готовую к запуску задачу или возвращает None."""
+    now = now or timezone.now()
+    with transaction.atomic():
+        job = (Training_Job.objects
+               .select_for_update(skip_locked=True)
+               .filter(state=Training_Job.State.PENDING, run_after__lte=now)
+               .order_by('run_after')
+               .first())
+        if job is None:
+            return None
+
+        job.state = Training_Job.State.RUNNING
+        job.started_at = now
+        job.attempts += 1
+        job.save(update_fields=['state', 'started_at', 'attempts'])
+    return job
+
+
+def run_job(job, service):
+    """Выполняет задачу обучения, при ошибке откладывает повтор с экспоненциальной задержкой."""
+    start = time.perf_counter()
+    try:
+        service.train_for_user(job.user)
+    except Exception as e:
+        logger.exception("Training job %s for user %s failed", job.id, job.user_id)
+        _fail_job(job, str(e))
+        return False
+
+    job.state = Training_Job.State.DONE
+    job.finished_at = timezone.now()
+    job.fit_seconds = time.perf_counter() - start
+    job.save(update_fields=['state', 'finished_at', 'fit_seconds'])
+    logger.info("Trained model for user %s in %.3fs", job.user_id, job.fit_seconds)
+    return True
+
+
+def _fail_job(job, error):
+    job.error = error
+    job.finished_at = timezone.now()
+
+    if job.attempts < _setting('ML_TRAIN_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS):
+        backoff = _setting('ML_TRAIN_BACKOFF', DEFAULT_BACKOFF) * 2 ** (job.attempts - 1)
+        job.state = Training_Job.State.PENDING
+        job.run_after = job.finished_at + timedelta(seconds=backoff)
+        try:
+            with transaction.atomic():
+                job.save(update_fields=['state', 'error', 'finished_at', 'run_after'])
+            return
+        except IntegrityError:
+            # Пока задача выполнялась, для пользователя уже поставили новую
+            pass
+
+    job.state = Training_Job.State.FAILED
+    job.save(update_fields=['state', 'error', 'finished_at'])
+
+
+def requeue_stale_jobs(now=None):
+    """Возвращает в очередь задачи, брошенные упавшим воркером."""
+    now = now or timezone.now()
+    stale = Training_Job.objects.filter(
+        state=Training_Job.State.RUNNING,
+        started_at__lt=now - timedelta(seconds=_setting('ML_TRAIN_STALE_AFTER', DEFAULT_STALE_AFTER))
+    )
+    requeued = 0
+    for job in stale:
+        _fail_job(job, 'Worker did not finish the job')
+        requeued += 1
+    return requeued
+
+
+def cleanup_finished_jobs(now=None):
+    now = now or timezone.now()
+    deleted, _ = Training_Job.objects.filter(
+        state__in=[Training_Job.State.DONE, Training_Job.State.FAILED],
+        finished_at__lt=now - timedelta(seconds=_setting('ML_TRAIN_KEEP_FINISHED', DEFAULT_KEEP_FINISHED))
+    ).delete()
+    return deleted
+
+
+def queue_stats(now=None):
+    """Метрики очереди: глубина по состояниям, возраст старейшей задачи и время обучения."""
+    now = now or timezone.now()
+    by_state = dict(
+        Training_Job.objects.values_list('state').annotate(count=Count('id')).order_by()
+    )
+    oldest = Training_Job.objects.filter(
+        state=Training_Job.State.PENDING
+    ).aggregate(oldest=Min('created_at'))['oldest']
+
+    fit_times = sorted(
+        Training_Job.objects
+        .filter(state=Training_Job.State.DONE, fit_seconds__isnull=False)
+        .order_by('-finished_at')
+        .values_list('fit_seconds', flat=True)[:1000]
+    )
+
+    def percentile(p):
+        if not fit_times:
+            return None
+        return fit_times[min(len(fit_times) - 1, int(p * len(fit_times)))]
+
+    return {
+        'pending': by_state.get(Training_Job.State.PENDING, 0),
+        'running': by_state.get(Training_Job.State.RUNNING, 0),
+        'done': by_state.get(Training_Job.State.DONE, 0),
+        'failed': by_state.get(Training_Job.State.FAILED, 0),
+        'oldest_pending_seconds': (now - oldest).total_seconds() if oldest else 0,
+        'fit_seconds_p50': percentile(0.5),
+        'fit_seconds_p95': percentile(0.95),
+    }
@@ -0,0 +1,259 @@
+import copy
+import logging
+import math
+from functools import lru_cache
+
+from django.conf import settings
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_INTERVALS = [30, 120, 360, 1440, 4320]  # 30мин, 2ч, 6ч, 1д, 3д
+MIN_INTERVAL = DEFAULT_INTERVALS[0]
+MINUTES_PER_DAY = 1440
+# Слово выучено после верного ответа на этом счетчике повторений (ML-движок)
+MAX_REPETITION_COUNT = 5
+
+
+class Scheduler:
+    """
+    Движок расписания повторений.
+
+    next_interval вызывается после ответа, когда repetition_count уже обновлен,
+    может менять поля состояния движка в repetition и возвращает интервал до
+    следующего повторения в минутах. Поля interval и last_review (назначенный
+    интервал и время ответа) выставляет и сохраняет вызывающий код.
+    """
+    name = None
+    uses_ml = False
+
+    def initial_interval(self):
+        return DEFAULT_INTERVALS[0]
+
+    def is_graduated(self, repetition):
+        """
+        Выучено ли слово, если на этот раз ответ верный.
+
+        Вызывается до обновления repetition_count и состояния движка:
+        выученное слово переносится в Learned_Word без нового интервала.
+        """
+        return repetition.repetition_count >= MAX_REPETITION_COUNT
+
+    def next_interval(self, user, word, repetition, is_correct, now, stats=None):
+        raise NotImplementedError
+
+    def after_answer(self, user):
+        """Вызывается после каждого ответа (например, чтобы поставить обучение в очередь)."""
+
+    @property
+    def reschedules(self):
+        """Может ли движок пересчитать расписание без новых ответов (manage.py reschedule_reviews)."""
+        return False
+
+    def reschedule(self, user, repetitions, now):
+        """Пересчитывает next_review повторений, возвращает измененные (сохраняет вызывающий код)."""
+        return []
+
+
+class MLScheduler(Scheduler):
+    """Интервалы по DEFAULT_INTERVALS с поправкой от модели RepetitionMLService."""
+    name = 'ml'
+    uses_ml = True
+
+    @property
+    def service(self):
+        # sklearn грузится только если ML-движок действительно используется
+        from web.services.ml_repetition import ml_service
+        return ml_service
+
+    def next_interval(self, user, word, repetition, is_correct, now, stats=None):
+        return self.service.predict_next_interval(user, word, repetition.repetition_count, stats=stats)
+
+    def after_answer(self, user):
+        self.service.train_for_user_async(user)
+
+    @property
+    def reschedules(self):
+        return True
+
+    def reschedule(self, user, repetitions, now):
+        # Модель переобучается без ответов по слову, интервалы от последнего ответа меняются
+        return self.service.reschedule(user, repetitions, now=now)
+
+
+class SM2Scheduler(Scheduler):
+    """
+    SM-2 (SuperMemo 2) с бинарной оценкой ответа.
+
+    Состояние: ease_factor и sm2_interval в Word_Repetition (interval назначает
+    основной движок, а SM-2 может работать теневым). Первые повторения идут
+    по DEFAULT_INTERVALS, дальше интервал умножается на ease_factor; слово
+    выучено, когда интервал дорос до GRADUATION_INTERVAL.
+    """
+    name = 'sm2'
+    QUALITY_CORRECT = 4
+    QUALITY_WRONG = 1
+    MIN_EASE = 1.3
+    GRADUATION_INTERVAL = 21 * MINUTES_PER_DAY
+
+    def is_graduated(self, repetition):
+        return repetition.sm2_interval >= self.GRADUATION_INTERVAL
+
+    def next_interval(self, user, word, repetition, is_correct, now, stats=None):
+        quality = self.QUALITY_CORRECT if is_correct else self.QUALITY_WRONG
+        ease = repetition.ease_factor + 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+        repetition.ease_factor = max(self.MIN_EASE, ease)
+
+        if not is_correct:
+            interval = MIN_INTERVAL
+        elif repetition.repetition_count < len(DEFAULT_INTERVALS) or not repetition.sm2_interval:
+            interval = max(
+                DEFAULT_INTERVALS[min(repetition.repetition_count, len(DEFAULT_INTERVALS) - 1)],
+                repetition.sm2_interval
+            )
+        else:
+            interval = repetition.sm2_interval * repetition.ease_factor
+
+        repetition.sm2_interval = interval
+        return interval
+
+
+class FSRSScheduler(Scheduler):
+    """
+    Упрощенный FSRS (v4.5) с оценками Again/Good.
+
+    Состояние: stability (дни, при которых вероятность вспомнить падает до 90%)
+    и difficulty (1..10) в Word_Repetition. Следующий интервал подбирается так,
+    чтобы вероятность вспомнить к нему была DESIRED_RETENTION; слово выучено,
+    когда stability дорастает до GRADUATION_STABILITY дней.
+    """
+    name = 'fsrs'
+    WEIGHTS = (
+        0.4872, 1.4003, 3.7145, 13.8206, 5.1618, 1.2298, 0.8975, 0.031, 1.6474,
+        0.1367, 1.0461, 2.1072, 0.0793, 0.3246, 1.587, 0.2272, 2.8755,
+    )
+    DECAY = -0.5
+    FACTOR = 19 / 81
+    AGAIN, GOOD = 1, 3
+    DESIRED_RETENTION = 0.9
+    GRADUATION_STABILITY = 21
+
+    def is_graduated(self, repetition):
+        return repetition.stability >= self.GRADUATION_STABILITY
+
+    def _initial_difficulty(self, grade):
+        w = self.WEIGHTS
+        return w[4] - math.exp(w[5] * (grade - 1)) + 1
+
+    def retrievability(self, elapsed_days, stability):
+        return (1 + self.FACTOR * elapsed_days / stability) ** self.DECAY
+
+    def next_interval(self, user, word, repetition, is_correct, now, stats=None):
+        w = self.WEIGHTS
+        grade = self.GOOD if is_correct else self.AGAIN
+
+        if not repetition.stability:
+            stability = w[grade - 1]
+            difficulty = self._initial_difficulty(grade)
+        else:
+            elapsed = (now - repetition.last_review).total_seconds() / 86400 if repetition.last_review else 0
+            r = self.retrievability(max(0, elapsed), repetition.stability)
+            d, s = repetition.difficulty, repetition.stability
+
+            if is_correct:
+                stability = s * (1 + math.exp(w[8]) * (11 - d) * s ** -w[9] * (math.exp(w[10] * (1 - r)) - 1))
+            else:
+                stability = min(s, w[11] * d ** -w[12] * ((s + 1) ** w[13] - 1) * math.exp(w[14] * (1 - r)))
+
+            difficulty = d - w[6] * (grade - 3)
+            difficulty = w[7] * self._initial_difficulty(4) + (1 - w[7]) * difficulty
+
+        repetition.stability = stability
+        repetition.difficulty = min(10, max(1, difficulty))
+
+        days = stability / self.FACTOR * (self.DESIRED_RETENTION ** (1 / self.DECAY) - 1)
+        return max(MIN_INTERVAL, days * MINUTES_PER_DAY)
+
+
+class ShadowScheduler(Scheduler):
+    """
+    Основной движок плюс теневой для сравнения.
+
+    Расписание задает только основной движок; теневой считает свой интервал
+    (и обновляет свои поля состояния), результат пишется в лог.
+    """
+    def __init__(self, primary, shadow):
+        self.primary = primary
+        self.shadow = shadow
+        self.name = primary.name
+        self.uses_ml = primary.uses_ml or shadow.uses_ml
+
+    def initial_interval(self):
+        return self.primary.initial_interval()
+
+    def is_graduated(self, repetition):
+        return self.primary.is_graduated(repetition)
+
+    def next_interval(self, user, word, repetition, is_correct, now, stats=None):
+        interval = self.primary.next_interval(user, word, repetition, is_correct, now, stats=stats)
+        try:
+            # Копируем обратно только собственные поля теневого движка
+            shadow_repetition = copy.copy(repetition)
+            shadow_interval = self.shadow.next_interval(
+                user, word, shadow_repetition, is_correct, now, stats=stats
+            )
+            for field in SCHEDULER_STATE_FIELDS.get(self.shadow.name, ()):
+                setattr(repetition, field, getattr(shadow_repetition, field))
+            logger.info(
+                "scheduler shadow user=%s word=%s correct=%s %s=%.1f %s=%.1f",
+                user.id, word.id, is_correct, self.primary.name, interval, self.shadow.name, shadow_interval
+            )
+        except Exception:
+            logger.exception("Shadow scheduler %s failed", self.shadow.name)
+        return interval
+
+    def after_answer(self, user):
+        self.primary.after_answer(user)
+        self.shadow.after_answer(user)
+
+    @property
+    def reschedules(self):
+        return self.primary.reschedules
+
+    def reschedule(self, user, repetitions, now):
+        # Расписание принадлежит основному движку
+        return self.primary.reschedule(user, repetitions, now)
+
+
+SCHEDULERS = {
+    MLScheduler.name: MLScheduler,
+    SM2Scheduler.name: SM2Scheduler,
+    FSRSScheduler.name: FSRSScheduler,
+}
+
+# Поля Word_Repetition, которые движок хранит только для себя
+SCHEDULER_STATE_FIELDS = {
+    SM2Scheduler.name: ('ease_factor', 'sm2_interval'),
+    FSRSScheduler.name: ('stability', 'difficulty'),
+}
+
+
+@lru_cache(maxsize=None)
+def _build_scheduler(name, shadow_name):
+    if name not in SCHEDULERS:
+        raise ValueError(f"Unknown REPETITION_SCHEDULER: {name}")
+    scheduler = SCHEDULERS[name]()
+
+    if shadow_name and shadow_name != name:
+        if shadow_name not in SCHEDULERS:
+            raise ValueError(f"Unknown REPETITION_SCHEDULER_SHADOW: {shadow_name}")
+        scheduler = ShadowScheduler(scheduler, SCHEDULERS[shadow_name]())
+    return scheduler
+
+
+def get_scheduler():
+    """Движок, выбранный в настройках REPETITION_SCHEDULER / REPETITION_SCHEDULER_SHADOW."""
+    return _build_scheduler(
+        getattr(settings, 'REPETITION_SCHEDULER', MLScheduler.name),
+        getattr(settings, 'REPETITION_SCHEDULER_SHADOW', None),
+    )
@@ -0,0 +1,229 @@
+import re
+
+import heapq
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Case, Count, F, FloatField, Q, Value, When, Window
+from django.db.models.functions import Greatest, Length, Upper
+
+from web.models import Catalog_Version, Word
+from web.services.search_index import public_index
+
+
+SIMILARITY_THRESHOLD = 0.3  # Порог pg_trgm.similarity_threshold по-умолчанию
+FALLBACK_MAX_CANDIDATES = 2000  # Сколько кандидатов проверять в Python без pg_trgm
+
+# Ранг совпадения: точное > префикс > подстрока > только похожее (опечатка)
+RANK_EXACT = 3.0
+RANK_PREFIX = 2.0
+RANK_CONTAINS = 1.0
+
+RESULT_FIELDS = ('word', 'translation', 'transcription', 'category_name', 'category_id', 'category_owner_id')
+# Порядок выдачи на всех путях поиска: внутри ранга короче слово, затем id слова и категории.
+# _order_key - то же для поиска в Python, иначе страницы зависят от базы и индекса
+ORDER_BY = ('-rank', Length('word'), 'id', 'category_id')
+
+
+def _order_key(rank, word, word_id, category_id):
+    return -rank, len(word), word_id, category_id
+
+
+def uses_trigram_index():
+    """pg_trgm и GIN-индексы из миграции 0010 есть только на PostgreSQL."""
+    return connection.vendor == 'postgresql'
+
+
+def trigrams(text):
+    """Триграммы строки так же, как их считает pg_trgm."""
+    result = set()
+    for token in re.findall(r'\w+', text.lower()):
+        padded = f'  {token} '
+        result.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return result
+
+
+def similarity(a, b):
+    """Аналог similarity() из pg_trgm: доля общих триграмм."""
+    a, b = trigrams(a), trigrams(b)
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def _accessible_words(user):
+    """Пары (слово, категория), доступные пользователю: один join через таблицу связи."""
+    return Word.objects.filter(
+        Q(category__owner__isnull=True) | Q(category__owner=user.id if user.is_authenticated else None),
+        category__isnull=False
+    ).annotate(
+        category_name=F('category__name'),
+        category_id=F('category__id'),
+        category_owner_id=F('category__owner_id'),
+    )
+
+
+def _match_rank(query):
+    return Case(
+        When(Q(word__iexact=query) | Q(translation__iexact=query), then=Value(RANK_EXACT)),
+        When(Q(word__istartswith=query) | Q(translation__istartswith=query), then=Value(RANK_PREFIX)),
+        When(Q(word__icontains=query) | Q(translation__icontains=query), then=Value(RANK_CONTAINS)),
+        default=Value(0.0),
+        output_field=FloatField()
+    )
+
+
+def _uses_index(fuzzy):
+    return not fuzzy and getattr(settings, 'SEARCH_INDEX_ENABLED', True)
+
+
+def search_etag(user, fuzzy=False):
+    """
+    ETag выдачи: версия общего каталога и, для вошедшего пользователя, его личных категорий.
+
+    Считается одним запросом к Catalog_Version, индекс в памяти при этом не
+    строится: ответ 304 его не требует. Если загруженный индекс старше
+    прочитанной версии, он перестроится при поиске, и выдача будет не старше ETag.
+    """
+    owner = Q(owner__isnull=True)
+    if user.is_authenticated:
+        owner |= Q(owner_id=user.id)
+    versions = dict(Catalog_Version.objects.filter(owner).values_list('owner_id', 'version'))
+    public = versions.get(None, 0)
+    if _uses_index(fuzzy):
+        public_index.expect_version(public)
+    if not user.is_authenticated:
+        return f'"{public}"'
+    return f'"{public}-{user.id}-{versions.get(user.id, 0)}"'
+
+
+def search_words(query, user, limit, page=1, fuzzy=False):
+    """
+    Поиск слов по слову и переводу.
+
+    Возвращает (общее количество, строки страницы). Строка - пара слово и
+    доступная пользователю категория. Сначала точные совпадения, затем по
+    префиксу, затем по подстроке; внутри групп - по триграммной похожести.
+    В режиме fuzzy находятся и слова с опечатками. Обычный поиск по
+    публичным словам идет по индексу в памяти (SEARCH_INDEX_ENABLED).
+    """
+    if _uses_index(fuzzy):
+        return _search_index(query, user, limit, page)
+    if uses_trigram_index():
+        return _search_trigram(query, user, limit, page, fuzzy)
+    return _search_fallback(query, user, limit, page, fuzzy)
+
+
+def _match_tier(query, texts):
+    """Ранг совпадения для уже приведенных к нижнему регистру строк."""
+    if query in texts:
+        return RANK_EXACT
+    if any(text.startswith(query) for text in texts):
+        return RANK_PREFIX
+    if any(query in text for text in texts):
+        return RANK_CONTAINS
+    return 0.0
+
+
+def _search_index(query, user, limit, page):
+    """
+    Публичные слова из индекса в памяти, слова личных категорий - одним запросом.
+
+    Порядок внутри ранга - ORDER_BY, как на остальных путях.
+    """
+    lowered = query.lower()
+    candidates = []
+    for word in public_index.lookup(lowered):
+        tier = _match_tier(lowered, word['texts'])
+        for category_id, category_name in word['categories']:
+            candidates.append((_order_key(tier, word['word'], word['id'], category_id), {
+                'word': word['word'],
+                'translation': word['translation'],
+                'transcription': word['transcription'],
+                'category_name': category_name,
+                'category_id': category_id,
+                'category_owner_id': None,
+            }))
+
+    if user.is_authenticated:
+        private = Word.objects.filter(
+            Q(word__icontains=query) | Q(translation__icontains=query),
+            category__owner=user
+        ).annotate(
+            category_name=F('category__name'),
+            category_id=F('category__id'),
+            category_owner_id=F('category__owner_id'),
+        ).values(*RESULT_FIELDS, 'id')
+        for row in private:
+            tier = _match_tier(lowered, (row['word'].lower(), row['translation'].lower()))
+            candidates.append((_order_key(tier, row['word'], row.pop('id'), row['category_id']), row))
+
+    top = heapq.nsmallest(page * limit, candidates, key=lambda item: item[0])
+    return len(candidates), [row for _, row in top[(page - 1) * limit:]]
+
+
+def _search_trigram(query, user, limit, page, fuzzy):
+    from django.contrib.postgres.search import TrigramSimilarity
+
+    # UPPER(...) совпадает с выражением GIN-индексов, icontains в Django
+    # на PostgreSQL строится как UPPER(поле) LIKE UPPER(...)
+    words = _accessible_words(user).alias(
+        word_upper=Upper('word'),
+        translation_upper=Upper('translation'),
+    )
+    match = Q(word__icontains=query) | Q(translation__icontains=query)
+    if fuzzy:
+        match |= Q(word_upper__trigram_similar=query.upper()) | Q(translation_upper__trigram_similar=query.upper())
+
+    words = words.filter(match)
+    rows = list(words.annotate(
+        rank=_match_rank(query) + Greatest(
+            TrigramSimilarity('word_upper', query.upper()),
+            TrigramSimilarity('translation_upper', query.upper())
+        ),
+        total=Window(Count('pk')),
+    ).order_by(*ORDER_BY).values(*RESULT_FIELDS, 'total')[(page - 1) * limit:page * limit])
+
+    # Общее количество считается оконной функцией в том же запросе,
+    # отдельный COUNT нужен только для страницы за концом выдачи
+    if rows:
+        total = rows[0]['total']
+    else:
+        total = words.count() if page > 1 else 0
+    return total, rows
+
+
+def _search_fallback(query, user, limit, page, fuzzy):
+    """Без pg_trgm: подстрока в SQL, похожесть для режима fuzzy считается в Python."""
+    if not fuzzy:
+        words = _accessible_words(user).filter(Q(word__icontains=query) | Q(translation__icontains=query))
+        rows = list(words.annotate(
+            rank=_match_rank(query),
+            total=Window(Count('pk')),
+        ).order_by(*ORDER_BY).values(*RESULT_FIELDS, 'total')[
+            (page - 1) * limit:page * limit
+        ])
+        if rows:
+            total = rows[0]['total']
+        else:
+            total = words.count() if page > 1 else 0
+        return total, rows
+
+    # Кандидаты - слова, в которых есть хотя бы одна триграмма запроса
+    match = Q(word__icontains=query) | Q(translation__icontains=query)
+    for gram in {gram.strip() for gram in trigrams(query)}:
+        if len(gram) == 3:
+            match |= Q(word__icontains=gram) | Q(translation__icontains=gram)
+    candidates = _accessible_words(user).filter(match).values(*RESULT_FIELDS, 'id')[:FALLBACK_MAX_CANDIDATES]
+
+    lowered = query.lower()
+    ranked = []
+    for row in candidates:
+        texts = (row['word'].lower(), row['translation'].lower())
+        tier = _match_tier(lowered, texts)
+        best_similarity = max(similarity(lowered, text) for text in texts)
+        if tier or best_similarity >= SIMILARITY_THRESHOLD:
+            ranked.append((_order_key(tier + best_similarity, row['word'], row['id'], row['category_id']), row))
+
+    ranked.sort(key=lambda item: item[0])
+    return len(ranked), [row for _, row in ranked[(page - 1) * limit:page * limit]]
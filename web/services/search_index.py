@@ -0,0 +1,124 @@
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right
+
+from django.conf import settings
+
+from web.models import Catalog_Version, Word
+
+
+DEFAULT_CHECK_INTERVAL = 5  # Секунды между проверками Catalog_Version
+MAX_KEY_LENGTH = 50  # Длина полей word и translation
+SEPARATOR = '\x00'
+
+
+class PublicWordIndex:
+    """
+    Индекс подстрок слов и переводов из публичных категорий в памяти процесса.
+
+    Все слова и переводы в нижнем регистре склеиваются в одну строку, по ней
+    строится суффиксный массив: поиск подстроки - два бинарных поиска.
+    Индекс строится лениво при первом поиске, сбрасывается сигналами при
+    изменении каталога в этом процессе, а изменения из других процессов
+    замечает по Catalog_Version раз в SEARCH_INDEX_CHECK_INTERVAL секунд.
+    """
+    def __init__(self, check_interval=None):
+        self._check_interval = check_interval
+        self._lock = threading.Lock()
+        self._data = None
+        self._checked_at = 0.0
+
+    @property
+    def check_interval(self):
+        if self._check_interval is not None:
+            return self._check_interval
+        return getattr(settings, 'SEARCH_INDEX_CHECK_INTERVAL', DEFAULT_CHECK_INTERVAL)
+
+    def invalidate(self):
+        self._data = None
+
+    def expect_version(self, version):
+        """Сбрасывает загруженный индекс, если он построен по версии старше version. Не строит индекс."""
+        data = self._data
+        if data is not None and data[0] < version:
+            self.invalidate()
+
+    def _build(self):
+        version = Catalog_Version.current()
+        rows = (Word.objects.filter(category__owner__isnull=True, category__isnull=False)
+                .order_by('id', 'category__id')
+                .values_list('id', 'word', 'translation', 'transcription', 'category__id', 'category__name'))
+
+        words = []
+        parts = []
+        starts = array('q')
+        position = 0
+        for word_id, word, translation, transcription, category_id, category_name in rows:
+            if words and words[-1]['id'] == word_id:
+                words[-1]['categories'].append((category_id, category_name))
+                continue
+
+            words.append({
+                'id': word_id,
+                'word': word,
+                'translation': translation,
+                'transcription': transcription,
+                'texts': (word.lower(), translation.lower()),
+                'categories': [(category_id, category_name)],
+            })
+            chunk = f'{word.lower()}{SEPARATOR}{translation.lower()}{SEPARATOR}'
+            starts.append(position)
+            parts.append(chunk)
+            position += len(chunk)
+
+        text = ''.join(parts)
+        suffixes = array('q', sorted(
+            (i for i, char in enumerate(text) if char != SEPARATOR),
+            key=lambda i: text[i:i + MAX_KEY_LENGTH]
+        ))
+        return version, text, suffixes, starts, words
+
+    def _get_data(self):
+        data = self._data
+        now = time.monotonic()
+
+        if data is not None and now - self._checked_at >= self.check_interval:
+            self._checked_at = now
+            if Catalog_Version.current() != data[0]:
+                self.invalidate()
+                data = None
+
+        if data is None:
+            with self._lock:
+                data = self._data
+                if data is None:
+                    data = self._build()
+                    self._data = data
+                    self._checked_at = time.monotonic()
+        return data
+
+    def lookup(self, query):
+        """
+        Слова, у которых слово или перевод содержат query (без учета регистра).
+
+        Порядок - как внутри ранга в поиске (search.ORDER_BY): короче слово, затем id.
+        """
+        query = query.lower()
+        _, text, suffixes, starts, words = self._get_data()
+        if not query or len(query) > MAX_KEY_LENGTH:
+            return []
+
+        length = len(query)
+        key = lambda i: text[i:i + length]
+        lo = bisect_left(suffixes, query, key=key)
+        hi = bisect_right(suffixes, query, lo=lo, key=key)
+
+        indexes = {bisect_right(starts, suffixes[k]) - 1 for k in range(lo, hi)}
+        return sorted((words[i] for i in indexes), key=lambda word: (len(word['word']), word['id']))
+
+    def __len__(self):
+        return len(self._get_data()[4])
+
+
+public_index = PublicWordIndex()
@@ -0,0 +1,255 @@
+import hashlib
+from datetime import timedelta
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from web.models import (
+    Answer_Attempt, Catalog_Version, Daily_Activity, Learned_Word, Learning_Session, Session_Hour_Stats,
+    User_Stats, Word, Word_Repetition
+)
+
+
+COUNTERS = (
+    'learned_words', 'in_progress_words', 'answers_total', 'answers_correct', 'test_sessions', 'test_seconds'
+)
+
+
+def compute_user_stats(user_id):
+    """Счетчики User_Stats, посчитанные по исходным таблицам."""
+    answers = Answer_Attempt.objects.filter(user_id=user_id).aggregate(
+        total=Count('id'),
+        correct=Count('id', filter=Q(is_correct=True))
+    )
+    tests = Learning_Session.objects.filter(
+        user_id=user_id,
+        method=Learning_Session.Method.TEST,
+        duration__gte=0
+    ).aggregate(count=Count('id'), seconds=Sum('duration'))
+
+    return {
+        'learned_words': Learned_Word.objects.filter(user_id=user_id).count(),
+        'in_progress_words': Word_Repetition.objects.filter(user_id=user_id).count(),
+        'answers_total': answers['total'],
+        'answers_correct': answers['correct'],
+        'test_sessions': tests['count'],
+        'test_seconds': tests['seconds'] or 0,
+    }
+
+
+def rebuild_user_stats(user_id):
+    stats, _ = User_Stats.objects.update_or_create(user_id=user_id, defaults=compute_user_stats(user_id))
+    return stats
+
+
+def get_user_stats(user_id):
+    """Строка статистики пользователя; если ее еще нет - строится по исходным таблицам."""
+    stats = User_Stats.objects.filter(user_id=user_id).first()
+    if stats is not None:
+        return stats
+    try:
+        with transaction.atomic():
+            # Сессии, начатые до появления строки, в тепловой карте могли не учитываться
+            rebuild_session_hours(user_id)
+            return User_Stats.objects.create(user_id=user_id, **compute_user_stats(user_id))
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        return User_Stats.objects.get(user_id=user_id)
+
+
+def apply_delta(user_id, **deltas):
+    """
+    Прибавляет изменения к счетчикам пользователя одним UPDATE.
+
+    Вызывается в той же транзакции, что и запись в исходные таблицы. Если строки
+    еще нет, ничего не делает: get_user_stats построит ее по исходным таблицам.
+    """
+    deltas = {name: value for name, value in deltas.items() if value}
+    if deltas:
+        User_Stats.objects.filter(user_id=user_id).update(
+            updated_at=timezone.now(),
+            **{name: F(name) + value for name, value in deltas.items()}
+        )
+
+
+def catalog_word_count(stats, categories):
+    """
+    Число разных слов в категориях categories для строки статистики stats.
+
+    Любое изменение слов категории повышает версию каталога ее владельца, поэтому
+    посчитанное число хранится в User_Stats вместе с ключом из id категорий и
+    версий их каталогов и пересчитывается, только когда ключ изменился. Обычно
+    это один запрос к Catalog_Version вместо COUNT DISTINCT по связям слов.
+    """
+    owner_ids = {category.owner_id for category in categories if category.owner_id is not None}
+    versions = Catalog_Version.objects.filter(
+        Q(owner__isnull=True) | Q(owner_id__in=owner_ids)
+    ).values_list('owner_id', 'version')
+    key = repr((
+        sorted(category.id for category in categories),
+        sorted(versions, key=lambda row: row[0] or 0)
+    ))
+    key = hashlib.sha1(key.encode('utf-8')).hexdigest()
+    if stats.catalog_words_key == key:
+        return stats.catalog_words
+
+    stats.catalog_words = Word.objects.filter(category__in=categories).distinct().count()
+    stats.catalog_words_key = key
+    User_Stats.objects.filter(pk=stats.pk).update(catalog_words=stats.catalog_words, catalog_words_key=key)
+    return stats.catalog_words
+
+
+def record_session_start(session):
+    """Учитывает начатую сессию в тепловой карте."""
+    start = timezone.localtime(session.start_time)
+    key = {'user_id': session.user_id, 'method': session.method, 'date': start.date(), 'hour': start.hour}
+
+    if Session_Hour_Stats.objects.filter(**key).update(sessions=F('sessions') + 1):
+        return
+    try:
+        with transaction.atomic():
+            Session_Hour_Stats.objects.create(sessions=1, **key)
+    except IntegrityError:
+        Session_Hour_Stats.objects.filter(**key).update(sessions=F('sessions') + 1)
+
+
+def record_activity(user_id, day=None, **deltas):
+    """Прибавляет изменения к активности пользователя за день (по-умолчанию за сегодня)."""
+    deltas = {name: value for name, value in deltas.items() if value}
+    if not deltas:
+        return
+
+    key = {'user_id': user_id, 'date': day or timezone.localdate()}
+    changes = {name: F(name) + value for name, value in deltas.items()}
+    if Daily_Activity.objects.filter(**key).update(**changes):
+        return
+    try:
+        with transaction.atomic():
+            Daily_Activity.objects.create(**key, **deltas)
+    except IntegrityError:
+        # Строку успел создать параллельный запрос
+        Daily_Activity.objects.filter(**key).update(**changes)
+
+
+def record_answers(user_id, answers, correct, learned_words, in_progress_words):
+    """Учитывает ответы при повторении в сводной статистике и активности за день."""
+    apply_delta(
+        user_id,
+        answers_total=answers,
+        answers_correct=correct,
+        learned_words=learned_words,
+        in_progress_words=in_progress_words
+    )
+    record_activity(user_id, answers=answers, correct=correct, words_learned=learned_words)
+
+
+def recent_activity(user_id, days):
+    """Активность за последние days дней, включая сегодня, от новых к старым; пропуски - нули."""
+    today = timezone.localdate()
+    rows = {
+        row.date: row for row in Daily_Activity.objects.filter(
+            user_id=user_id,
+            date__gt=today - timedelta(days=days),
+            date__lte=today
+        )
+    }
+    dates = [today - timedelta(days=i) for i in range(days)]
+    return [rows.get(date) or Daily_Activity(user_id=user_id, date=date) for date in dates]
+
+
+def record_session_end(session, previous_duration):
+    """Учитывает длительность завершенной сессии (сессия могла завершаться повторно)."""
+    if session.duration < 0:
+        return
+    seconds = session.duration - max(previous_duration, 0)
+    record_activity(session.user_id, timezone.localtime(session.start_time).date(), session_seconds=seconds)
+
+    if session.method != Learning_Session.Method.TEST:
+        return
+    if previous_duration < 0:
+        apply_delta(session.user_id, test_sessions=1, test_seconds=session.duration)
+    else:
+        apply_delta(session.user_id, test_seconds=session.duration - previous_duration)
+
+
+def forget_word(word_id):
+    """
+    Уменьшает счетчики состояния у всех пользователей перед удалением слова.
+
+    По одному UPDATE на счетчик, сколько бы пользователей ни учили слово:
+    у пользователя не больше одной строки на слово (unique_together).
+    """
+    now = timezone.now()
+    User_Stats.objects.filter(
+        user_id__in=Learned_Word.objects.filter(word_id=word_id).values('user_id')
+    ).update(learned_words=F('learned_words') - 1, updated_at=now)
+    User_Stats.objects.filter(
+        user_id__in=Word_Repetition.objects.filter(word_id=word_id).values('user_id')
+    ).update(in_progress_words=F('in_progress_words') - 1, updated_at=now)
+
+
+def rebuild_session_hours(user_id):
+    """Пересчитывает тепловую карту пользователя по Learning_Session."""
+    rows = (Learning_Session.objects
+            .filter(user_id=user_id)
+            .values_list('method', 'start_time'))
+
+    counts = {}
+    for method, start_time in rows:
+        start = timezone.localtime(start_time)
+        key = (method, start.date(), start.hour)
+        counts[key] = counts.get(key, 0) + 1
+
+    with transaction.atomic():
+        Session_Hour_Stats.objects.filter(user_id=user_id).delete()
+        Session_Hour_Stats.objects.bulk_create([
+            Session_Hour_Stats(user_id=user_id, method=method, date=date, hour=hour, sessions=sessions)
+            for (method, date, hour), sessions in counts.items()
+        ])
+    return len(counts)
+
+
+def rebuild_daily_activity(user_id):
+    """
+    Пересчитывает активность пользователя по дням из истории.
+
+    У Learned_Word нет даты, поэтому слово считается выученным в день последнего
+    ответа по нему; слова, отмеченные известными без ответов, не учитываются.
+    """
+    days = {}
+
+    def day(date):
+        if date not in days:
+            days[date] = Daily_Activity(user_id=user_id, date=date)
+        return days[date]
+
+    answers = (Answer_Attempt.objects
+               .filter(user_id=user_id)
+               .annotate(day=TruncDate('timestamp'))
+               .values('day')
+               .annotate(answers=Count('id'), correct=Count('id', filter=Q(is_correct=True))))
+    for row in answers:
+        day(row['day']).answers = row['answers']
+        day(row['day']).correct = row['correct']
+
+    sessions = (Learning_Session.objects
+                .filter(user_id=user_id, duration__gte=0)
+                .annotate(day=TruncDate('start_time'))
+                .values('day')
+                .annotate(seconds=Sum('duration')))
+    for row in sessions:
+        day(row['day']).session_seconds = row['seconds']
+
+    learned = (Answer_Attempt.objects
+               .filter(user_id=user_id, word_id__in=Learned_Word.objects.filter(user_id=user_id).values('word_id'))
+               .values('word_id')
+               .annotate(last=Max('timestamp')))
+    for row in learned:
+        day(timezone.localtime(row['last']).date()).words_learned += 1
+
+    with transaction.atomic():
+        Daily_Activity.objects.filter(user_id=user_id).delete()
+        Daily_Activity.objects.bulk_create(days.values())
+    return len(days)
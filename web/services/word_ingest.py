@@ -0,0 +1,185 @@
+from collections import namedtuple
+
+from django.db import transaction
+
+from web.models import Catalog_Version, Word, Wordlist_Line
+from web.services.wordlist_reader import DEFAULT_BATCH_SIZE, WordlistReader, fingerprint, open_wordlist
+
+
+CHUNK_SIZE = 1000  # Ключей в одном запросе на чтение и строк в одном INSERT
+
+IngestResult = namedtuple('IngestResult', ['rows', 'added', 'linked', 'errors'])
+SyncResult = namedtuple('SyncResult', ['added', 'linked', 'unlinked', 'modified'])
+
+
+def chunks(items, size=CHUNK_SIZE):
+    items = list(items)
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def existing_word_ids(keys):
+    """{ключ: id} для уже существующих слов, по одному запросу на CHUNK_SIZE ключей."""
+    ids = {}
+    for chunk in chunks(keys):
+        wanted = set(chunk)
+        rows = Word.objects.filter(word__in={key[0] for key in chunk}).values_list(
+            'id', 'word', 'translation', 'transcription'
+        )
+        for word_id, *key in rows:
+            if tuple(key) in wanted:
+                ids[tuple(key)] = word_id
+    return ids
+
+
+def ingest_words(category, keys, bump_version=True):
+    """
+    Добавляет слова в категорию пачками. Возвращает (новых слов, новых связей с категорией).
+
+    keys - ключи (word, translation, transcription), повторы убираются. Существующие
+    слова находятся запросами по CHUNK_SIZE ключей, недостающие вставляются через
+    bulk_create, связи с категорией - прямой вставкой в таблицу связи. Массовые
+    операции не вызывают сигналы, поэтому версия каталога поднимается один раз в конце
+    (bump_version=False - если вызывающий код поднимет ее сам после нескольких пачек).
+    """
+    keys = list(dict.fromkeys(keys))
+    if not keys:
+        return 0, 0
+
+    through = Word.category.through
+    with transaction.atomic():
+        ids = existing_word_ids(keys)
+        missing = [key for key in keys if key not in ids]
+        # ignore_conflicts: слово могла успеть вставить параллельная загрузка
+        Word.objects.bulk_create(
+            [Word(word=word, translation=translation, transcription=transcription)
+             for word, translation, transcription in missing],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True
+        )
+        if missing:
+            ids.update(existing_word_ids(missing))
+
+        linked_ids = set()
+        for chunk in chunks(ids.values()):
+            linked_ids.update(through.objects.filter(category=category, word_id__in=chunk)
+                              .values_list('word_id', flat=True))
+        new_links = [word_id for word_id in ids.values() if word_id not in linked_ids]
+        through.objects.bulk_create(
+            [through(word_id=word_id, category=category) for word_id in new_links],
+            batch_size=CHUNK_SIZE,
+            ignore_conflicts=True
+        )
+
+        if bump_version and (new_links or missing):
+            Catalog_Version.bump(category.owner_id)
+
+    return len(missing), len(new_links)
+
+
+def ingest_batches(category, batches):
+    """
+    Загружает пачки строк в категорию в одной транзакции: (новых слов, новых связей).
+
+    Версия каталога поднимается один раз в конце, а не после каждой пачки.
+    """
+    added = linked = 0
+    with transaction.atomic():
+        for batch in batches:
+            batch_added, batch_linked = ingest_words(category, batch, bump_version=False)
+            added += batch_added
+            linked += batch_linked
+
+        if added or linked:
+            Catalog_Version.bump(category.owner_id)
+    return added, linked
+
+
+def ingest_file(path, category, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Потоково загружает файл словаря в категорию пачками по batch_size строк.
+
+    Память не зависит от размера файла. Возвращает IngestResult: прочитано
+    строк, новых слов, новых связей, ошибки разбора строк.
+    """
+    with open_wordlist(path) as f:
+        reader = WordlistReader(f)
+        added, linked = ingest_batches(category, reader.batches(batch_size))
+    return IngestResult(reader.rows, added, linked, reader.errors)
+
+
+def sync_batches(category, batches, source, relink=False):
+    """
+    Приводит слова категории к новому содержимому файла source, зная прошлую загрузку.
+
+    Отпечатки строк прошлых загрузок хранятся в Wordlist_Line и сравниваются
+    пачками: известные строки лишь помечаются номером текущей загрузки, новые
+    загружаются через ingest_words. Строки, не помеченные к концу загрузки,
+    из файла исчезли - их слова отвязываются от категории, а оставшиеся без
+    категорий удаляются, как при удалении из категории. Память не зависит от
+    размера файла, работа с словами пропорциональна размеру изменений.
+    relink=True загружает заново и известные строки - восстанавливает связи,
+    удаленные вручную.
+
+    Возвращает SyncResult: новых слов, новых связей, удаленных связей и
+    измененных слов (то же слово с другим переводом или транскрипцией).
+    """
+    generation = source.generation + 1
+    added = linked = unlinked = 0
+    fresh_words = set()
+    through = Word.category.through
+
+    with transaction.atomic():
+        for batch in batches:
+            rows = {}
+            for row in batch:
+                rows.setdefault(fingerprint(row), row)
+
+            lines = Wordlist_Line.objects.filter(source=source, fingerprint__in=rows)
+            known = set(lines.values_list('fingerprint', flat=True))
+            if known:
+                lines.update(generation=generation)
+            fresh = {line: row for line, row in rows.items() if relink or line not in known}
+            if not fresh:
+                continue
+
+            batch_added, batch_linked = ingest_words(category, fresh.values(), bump_version=False)
+            added += batch_added
+            linked += batch_linked
+            new = {line: row for line, row in fresh.items() if line not in known}
+            ids = existing_word_ids(new.values())
+            Wordlist_Line.objects.bulk_create([
+                Wordlist_Line(source=source, fingerprint=line, word_id=ids[row], generation=generation)
+                for line, row in new.items()
+            ], batch_size=CHUNK_SIZE)
+            fresh_words.update(row[0] for row in new.values())
+
+        removed_words = set()
+        stale = Wordlist_Line.objects.filter(source=source, generation__lt=generation)
+        while chunk := list(stale.values_list('id', 'word_id')[:CHUNK_SIZE]):
+            line_ids, word_ids = zip(*chunk)
+            removed_words.update(Word.objects.filter(id__in=word_ids).values_list('word', flat=True))
+            Wordlist_Line.objects.filter(id__in=line_ids).delete()
+            unlinked += through.objects.filter(category=category, word_id__in=word_ids).delete()[0]
+            # Обычное удаление, а не raw: нужны сигналы (статистика пользователей, версии каталогов)
+            Word.objects.filter(id__in=word_ids, category__isnull=True).delete()
+
+        source.generation = generation
+        source.save(update_fields=['generation'])
+
+        if added or linked or unlinked:
+            Catalog_Version.bump(category.owner_id)
+
+    return SyncResult(added, linked, unlinked, len(removed_words & fresh_words))
+
+
+def sync_file(path, category, source, relink=False, batch_size=DEFAULT_BATCH_SIZE):
+    """
+    Потоково применяет к категории изменения файла (см. sync_batches).
+
+    Возвращает (прочитано строк, SyncResult, ошибки разбора строк).
+    """
+    with open_wordlist(path) as f:
+        reader = WordlistReader(f)
+        result = sync_batches(category, reader.batches(batch_size), source, relink=relink)
+    return reader.rows, result, reader.errors
@@ -0,0 +1,133 @@
+import csv
+import hashlib
+from collections import namedtuple
+from itertools import islice
+
+
+DELIMITER = ';'
+QUOTECHAR = '"'
+DEFAULT_BATCH_SIZE = 1000
+MAX_ERROR_TEXT = 100  # Сколько символов плохой строки сохранять в ошибке
+HASH_BLOCK_SIZE = 1 << 20
+
+MalformedLine = namedtuple('MalformedLine', ['line_number', 'text', 'reason'])
+
+
+def open_wordlist(path):
+    """Открывает словарь для чтения: utf-8-sig убирает BOM, newline='' оставляет CRLF разбору строк."""
+    return open(path, 'r', encoding='utf-8-sig', newline='')
+
+
+def file_hash(path):
+    """sha256 содержимого файла, читается блоками по HASH_BLOCK_SIZE байт."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def fingerprint(row):
+    """64-битный отпечаток строки словаря (знаковое целое): по нему сравниваются загрузки одного файла."""
+    digest = hashlib.blake2b('\x1f'.join(row).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'big', signed=True)
+
+
+class WordlistReader:
+    """
+    Потоковое чтение словаря формата "слово;перевод;транскрипция".
+
+    Строки читаются по одной, в памяти не больше одной пачки. Поля можно
+    заключать в кавычки ("a;b"), кавычка внутри поля удваивается, обратная
+    косая черта - обычный символ. Пустые строки пропускаются, строки
+    с неверным числом полей или незакрытой кавычкой попадают в errors
+    с номером строки.
+    """
+    def __init__(self, lines, fields=3):
+        self.lines = lines
+        self.fields = fields
+        self.rows = 0
+        self.errors = []
+
+    def _split(self, line):
+        # Быстрый путь для обычных строк без кавычек
+        if QUOTECHAR not in line:
+            return line.split(DELIMITER)
+        return next(csv.reader(
+            [line], delimiter=DELIMITER, quotechar=QUOTECHAR, strict=True
+        ))
+
+    def __iter__(self):
+        for line_number, line in enumerate(self.lines, 1):
+            if isinstance(line, bytes):
+                line = line.decode('utf-8')
+            if line_number == 1:
+                line = line.lstrip('\ufeff')
+            line = line.rstrip('\r\n')
+            if not line.strip():
+                continue
+
+            try:
+                row = [field.strip() for field in self._split(line)]
+            except csv.Error as e:
+                self.errors.append(MalformedLine(line_number, line[:MAX_ERROR_TEXT], str(e)))
+                continue
+
+            if len(row) != self.fields:
+                self.errors.append(MalformedLine(
+                    line_number, line[:MAX_ERROR_TEXT], f'expected {self.fields} fields, got {len(row)}'
+                ))
+                continue
+            if not all(row):
+                self.errors.append(MalformedLine(line_number, line[:MAX_ERROR_TEXT], 'empty field'))
+                continue
+
+            self.rows += 1
+            yield tuple(row)
+
+    def batches(self, size=DEFAULT_BATCH_SIZE):
+        """Строки словаря списками по size штук."""
+        rows = iter(self)
+        while True:
+            batch = list(islice(rows, size))
+            if not batch:
+                return
+            yield batch
+
+
+def read_words(lines):
+    """
+    Слова по одному на строку (вход translate): строка не разбирается на поля,
+    разделитель и кавычки остаются частью слова. Убираются BOM, перевод строки
+    и пробелы по краям, пустые строки пропускаются.
+    """
+    for line_number, line in enumerate(lines, 1):
+        if line_number == 1:
+            line = line.lstrip('\ufeff')
+        word = line.strip()
+        if word:
+            yield word
+
+
+def parse_file(path):
+    """
+    Читает словарь целиком: (строки без повторов, число строк, ошибки).
+
+    Для разбора в отдельном процессе (load_words --jobs): модуль не зависит
+    от Django, а результат передается писателю одним сообщением.
+    """
+    with open_wordlist(path) as f:
+        reader = WordlistReader(f)
+        rows = list(dict.fromkeys(reader))
+    return rows, reader.rows, reader.errors
+
+
+def format_row(row):
+    """Строка словаря для записи: поля с разделителем или кавычками берутся в кавычки."""
+    fields = []
+    for field in row:
+        field = str(field)
+        if any(char in field for char in (DELIMITER, QUOTECHAR, '\n', '\r')):
+            field = QUOTECHAR + field.replace(QUOTECHAR, QUOTECHAR * 2) + QUOTECHAR
+        fields.append(field)
+    return DELIMITER.join(fields) + '\n'
@@ -0,0 +1,100 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db.models import IntegerField, Value
+
+from web.models import Catalog_Version, Learned_Word, Word, Word_Repetition
+
+
+DEFAULT_PAGE_SIZE = 500  # Слов на странице списка категории
+DEFAULT_CACHE_TIMEOUT = 24 * 60 * 60  # Секунды; устаревшие версии вытесняются и так
+
+BASE_FIELDS = ('id', 'word', 'translation', 'transcription')
+STATUSES = ('new', 'in_progress', 'learned')  # Значения фильтра ?status= на странице категории
+
+
+def page_size():
+    return getattr(settings, 'WORDLIST_PAGE_SIZE', DEFAULT_PAGE_SIZE)
+
+
+def base_wordlist(category):
+    """
+    Слова категории без данных пользователя: кортежи (id, word, translation, transcription).
+
+    Список одинаков для всех пользователей и хранится в кеше Django под ключом
+    с версией каталога владельца категории (Catalog_Version), поэтому изменения
+    слов и категорий сразу дают новый ключ без явного сброса кеша.
+    """
+    version = Catalog_Version.current(category.owner_id)
+    key = f'wordlist:{category.id}:{version}'
+    rows = cache.get(key)
+    if rows is None:
+        rows = list(Word.objects.filter(category=category).order_by('id').values_list(*BASE_FIELDS))
+        cache.set(key, rows, getattr(settings, 'WORDLIST_CACHE_TIMEOUT', DEFAULT_CACHE_TIMEOUT))
+    return rows
+
+
+def _statuses(user, **word_filter):
+    learned = Learned_Word.objects.filter(user=user, **word_filter).values_list(
+        'word_id', Value('learned'), Value(0, output_field=IntegerField())
+    )
+    in_progress = Word_Repetition.objects.filter(user=user, **word_filter).values_list(
+        'word_id', Value('in_progress'), 'repetition_count'
+    )
+
+    statuses = {}
+    for word_id, status, repetition_count in learned.union(in_progress, all=True):
+        # Выученное слово важнее незавершенного повторения
+        if status == 'learned' or word_id not in statuses:
+            statuses[word_id] = (status, repetition_count if status == 'in_progress' else 0)
+    return statuses
+
+
+def status_map(user, word_ids):
+    """{word_id: (status, repetition_count)} для слов со статусом, одним запросом."""
+    return _statuses(user, word_id__in=word_ids)
+
+
+def category_status_map(user, category):
+    """То же для всех слов категории - нужно, чтобы отфильтровать список по статусу."""
+    return _statuses(user, word__category=category)
+
+
+def highlight_page(rows, highlight):
+    """Номер страницы с первым словом, совпадающим с highlight (для ссылок из поиска)."""
+    highlight = highlight.lower()
+    for index, row in enumerate(rows):
+        if row[1].lower() == highlight:
+            return index // page_size() + 1
+    return 1
+
+
+def category_wordlist(category, user, page_number=None, highlight='', status=None):
+    """
+    Страница списка слов категории со статусами пользователя.
+
+    status (одно из STATUSES) оставляет только слова с этим статусом, фильтр
+    применяется до разбиения на страницы. Возвращает (страница Paginator,
+    слова страницы). Слова - несохраняемые экземпляры Word с полями status,
+    repetition_count и repetition_progress.
+    """
+    rows = base_wordlist(category)
+    statuses = None
+    if status in STATUSES:
+        statuses = category_status_map(user, category) if user else {}
+        rows = [row for row in rows if statuses.get(row[0], ('new', 0))[0] == status]
+
+    if page_number is None and highlight:
+        page_number = highlight_page(rows, highlight)
+    page = Paginator(rows, page_size()).get_page(page_number)
+
+    if statuses is None:
+        statuses = status_map(user, [row[0] for row in page]) if user else {}
+
+    words = []
+    for row in page:
+        word = Word(**dict(zip(BASE_FIELDS, row)))
+        word.status, word.repetition_count = statuses.get(word.id, ('new', 0))
+        word.repetition_progress = min(100, word.repetition_count * 20)
+        words.append(word)
+    return page, words
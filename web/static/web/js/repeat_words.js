@@ -9,47 +9,190 @@ const noWordMessage = document.getElementById('noWordsMessage');
 const btnShowTranslation = document.getElementById('btnShowTranslation');
 
 const csrftoken = getCookie('csrftoken');
+const BATCH_SIZE = 10;
+const REFILL_THRESHOLD = 3;
+const FLUSH_INTERVAL = 3000;
+const FLUSH_SIZE = 10;
+// Сколько раз пробовать отправить ответ, прежде чем отказаться от него
+const MAX_SEND_ATTEMPTS = 5;
+// Как часто проверять, не подошли ли новые слова, пока повторять нечего
+const DUE_POLL_INTERVAL = 60000;
+
 let currentWordId = null;
+// Очередь карточек с сервера, неотправленные ответы и слова, ответ на которые еще не сохранен
+let queue = [];
+let answers = [];
+const pendingIds = new Set();
+let refillRequest = null;
+let queueExhausted = false;
 
-async function loadWordForRepeat() {
+function refillQueue() {
+    if (refillRequest || queueExhausted) {
+        return refillRequest;
+    }
+
+    const exclude = [...queue.map(card => card.id), ...pendingIds];
+    if (currentWordId !== null) {
+        exclude.push(currentWordId);
+    }
+    const params = new URLSearchParams({count: BATCH_SIZE, exclude: exclude.join(',')});
+
+    refillRequest = fetch(`/learning/get_words_repeat/?${params}`)
+        .then(response => response.json())
+        .then(data => {
+            if (data['status'] == 'success') {
+                const queued = new Set(queue.map(card => card.id));
+                queue.push(...data['words'].filter(card => !queued.has(card.id) && card.id !== currentWordId));
+            } else if (pendingIds.size == 0) {
+                // Пока ответы отправляются, слово еще может числиться к повторению
+                queueExhausted = true;
+            }
+        })
+        .catch(error => console.error('Ошибка загрузки карточек:', error))
+        .finally(() => {
+            refillRequest = null;
+        });
+    return refillRequest;
+}
+
+function showNoWords() {
+    flashcard.style.display = 'none';
+    controls.style.display = 'none';
+    btnShowTranslation.style.display = 'none';
+    noWordMessage.style.display = 'block';
+    setTimeout(pollDueCount, DUE_POLL_INTERVAL);
+}
+
+function showCards() {
+    flashcard.style.display = '';
+    controls.style.display = '';
+    btnShowTranslation.style.display = '';
+    noWordMessage.style.display = 'none';
+}
+
+async function pollDueCount() {
     try {
-        const response = await fetch('/learning/get_word_repeat/');
+        const response = await fetch('/learning/due_count/');
         const data = await response.json();
 
-        if (data['status'] == 'success') {
-            currentWordId = data['id'];
-            word.textContent = data['word'];
-            translation.textContent = data['translation'];
-            transcription.textContent = `[${data['transcription']}]`;
-        } else {
-            flashcard.style.display = 'none';
-            controls.style.display = 'none';
-            btnShowTranslation.style.display = 'none';
-            noWordMessage.style.display = 'block';
+        if (data['status'] == 'success' && data['due_count'] > 0) {
+            showCards();
+            await loadWordForRepeat();
+            return;
+        }
+        if (data['next_review']) {
+            // Проверяем к ближайшему повторению, но не реже чем раз в DUE_POLL_INTERVAL
+            const delay = Math.min(Math.max(new Date(data['next_review']) - new Date(), 1000), DUE_POLL_INTERVAL);
+            setTimeout(pollDueCount, delay);
+            return;
         }
     } catch (error) {
-        console.error('Ошибка загрузки карточки:', error);       
-    }    
+        console.error('Ошибка проверки слов для повторения:', error);
+    }
+    setTimeout(pollDueCount, DUE_POLL_INTERVAL);
+}
+
+async function loadWordForRepeat() {
+    if (queue.length == 0) {
+        queueExhausted = false;
+        await refillQueue();
+    }
+
+    const card = queue.shift();
+    if (!card) {
+        currentWordId = null;
+        showNoWords();
+        return;
+    }
+
+    currentWordId = card.id;
+    word.textContent = card.word;
+    translation.textContent = card.translation;
+    transcription.textContent = `[${card.transcription}]`;
+
+    if (queue.length < REFILL_THRESHOLD) {
+        refillQueue();
+    }
 }
 
 loadWordForRepeat();
 
-async function sendRepeatResult(remembered) {
-    const response = await fetch('/learning/send_repeat_result/', {
-        method: 'POST',
-        headers: {
-            'Content-Type': 'application/json',
-            'X-CSRFToken': csrftoken
-        },
-        credentials: 'include',
-        body: JSON.stringify({
-          word_id: currentWordId,
-          is_known: remembered, 
-          session_id: window.session_id
+function sendRepeatResult(remembered) {
+    pendingIds.add(currentWordId);
+    answers.push({word_id: currentWordId, is_known: remembered, session_id: window.session_id, attempts: 0});
+    if (answers.length >= FLUSH_SIZE) {
+        flushAnswers();
+    }
+}
+
+function flushAnswers() {
+    if (answers.length == 0) {
+        return;
+    }
+    const batch = answers;
+    answers = [];
+
+    // Ответы из разных сессий отправляются отдельными запросами
+    // Первый ответ мог прийти раньше, чем сервер вернул id новой сессии
+    const bySession = new Map();
+    batch.forEach(answer => {
+        answer.session_id = answer.session_id ?? window.session_id;
+        answer.attempts += 1;
+        if (!bySession.has(answer.session_id)) {
+            bySession.set(answer.session_id, []);
+        }
+        bySession.get(answer.session_id).push(answer);
+    });
+
+    bySession.forEach((sessionAnswers, sessionId) => {
+        const results = sessionAnswers.map(answer => ({word_id: answer.word_id, is_known: answer.is_known}));
+        fetch('/learning/results/batch', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-CSRFToken': csrftoken
+            },
+            credentials: 'include',
+            // Запрос должен дойти, даже если страницу закрывают
+            keepalive: true,
+            body: JSON.stringify({session_id: sessionId, results: results})
         })
+            .then(response => response.ok ? response.json() : Promise.reject(new Error(`HTTP ${response.status}`)))
+            .then(data => {
+                // Результаты приходят в том же порядке, что и ответы
+                const failed = sessionAnswers.filter((answer, index) => data.results[index].status !== 'success');
+                sessionAnswers.filter(answer => !failed.includes(answer))
+                    .forEach(answer => pendingIds.delete(answer.word_id));
+                requeueAnswers(failed, data.results.filter(result => result.status !== 'success'));
+            })
+            .catch(error => requeueAnswers(sessionAnswers, error));
     });
 }
 
+function requeueAnswers(failed, error) {
+    // Неотправленные ответы возвращаются в очередь и уйдут со следующей отправкой
+    if (failed.length == 0) {
+        return;
+    }
+    const retry = failed.filter(answer => answer.attempts < MAX_SEND_ATTEMPTS);
+    const dropped = failed.filter(answer => answer.attempts >= MAX_SEND_ATTEMPTS);
+    answers.unshift(...retry);
+    dropped.forEach(answer => pendingIds.delete(answer.word_id));
+    if (dropped.length > 0) {
+        console.error('Не удалось отправить ответы:', dropped, error);
+    } else {
+        console.warn('Ответы будут отправлены повторно:', error);
+    }
+}
+
+setInterval(flushAnswers, FLUSH_INTERVAL);
+window.addEventListener('pagehide', flushAnswers);
+document.addEventListener('visibilitychange', () => {
+    if (document.visibilityState === 'hidden') {
+        flushAnswers();
+    }
+});
+
 btnKnow.addEventListener('click', function() {
     sendRepeatResult(true);
     translation.style.display = 'none';
@@ -75,4 +218,4 @@ btnDontKnow.addEventListener('click', function() {
 btnShowTranslation.addEventListener('click', function() {
     translation.style.display = 'block';
     transcription.style.display = 'block';
-});
\ No newline at end of file
+});
@@ -1,3 +1,48 @@
+const SEARCH_LIMIT = 20;
+const SEARCH_DEBOUNCE_MS = 200;
+const SEARCH_CACHE_SIZE = 50;
+const SEARCH_CACHE_TTL_MS = 60000;
+
+// Последние ответы по запросу: Map хранит порядок вставки, старые записи удаляются первыми
+const searchCache = new Map();
+
+function cacheGet(key) {
+    if (!searchCache.has(key)) {
+        return undefined;
+    }
+    const entry = searchCache.get(key);
+    searchCache.delete(key);
+    if (Date.now() - entry.time > SEARCH_CACHE_TTL_MS) {
+        return undefined;
+    }
+    searchCache.set(key, entry);
+    return entry.value;
+}
+
+function cacheSet(key, value) {
+    searchCache.delete(key);
+    searchCache.set(key, { value, time: Date.now() });
+    if (searchCache.size > SEARCH_CACHE_SIZE) {
+        searchCache.delete(searchCache.keys().next().value);
+    }
+}
+
+async function fetchSearch(query, fuzzy, signal) {
+    const url = `/search_words/?q=${encodeURIComponent(query)}&limit=${SEARCH_LIMIT}${fuzzy ? '&fuzzy=1' : ''}`;
+    const cached = cacheGet(url);
+    if (cached) {
+        return cached;
+    }
+
+    // Браузер сам перепроверит ответ по ETag и получит 304, если каталог не менялся
+    const response = await fetch(url, { signal });
+    const data = await response.json();
+    if (response.ok) {
+        cacheSet(url, data);
+    }
+    return data;
+}
+
 document.addEventListener('DOMContentLoaded', function() {
     const searchInput = document.getElementById('searchInput');
     const searchResults = document.getElementById('searchResults');
@@ -11,18 +56,28 @@ document.addEventListener('DOMContentLoaded', function() {
         });
     }
 
-    searchInput.addEventListener('input', async function(e) {
-        const query = e.target.value.trim().toLowerCase();
+    let debounceTimer = null;
+    let controller = null;
 
-    if (query.length < 2) {
-        searchResults.innerHTML = '';
-        searchResults.style.display = 'none';
-        return;
-    }
+    async function runSearch(query) {
+        // Ответ на устаревший запрос не должен затереть свежую выдачу
+        if (controller) {
+            controller.abort();
+        }
+        controller = new AbortController();
+        const signal = controller.signal;
 
         try {
-            const response = await fetch(`/search_words/?q=${encodeURIComponent(query)}`);
-            const data = await response.json();
+            let data = await fetchSearch(query, false, signal);
+
+            if (data.results && data.results.length == 0) {
+                // Ничего не нашлось - возможно опечатка, ищем похожие слова
+                data = await fetchSearch(query, true, signal);
+            }
+
+            if (signal.aborted) {
+                return;
+            }
 
             if (data.results && data.results.length > 0) {
                 searchResults.innerHTML = '';
@@ -45,10 +100,30 @@ document.addEventListener('DOMContentLoaded', function() {
                 searchResults.style.display = 'block';
             }
         } catch (error) {
+            if (error.name === 'AbortError') {
+                return;
+            }
             console.error('Ошибка поиска:', error);
             searchResults.innerHTML = '<div class="error">Ошибка при поиске</div>';
             searchResults.style.display = 'block';
         }
+    }
+
+    searchInput.addEventListener('input', function(e) {
+        const query = e.target.value.trim().toLowerCase();
+        clearTimeout(debounceTimer);
+
+        if (query.length < 2) {
+            if (controller) {
+                controller.abort();
+                controller = null;
+            }
+            searchResults.innerHTML = '';
+            searchResults.style.display = 'none';
+            return;
+        }
+
+        debounceTimer = setTimeout(() => runSearch(query), SEARCH_DEBOUNCE_MS);
     });
 
     document.addEventListener('click', function(e) {
@@ -0,0 +1,39 @@
+const UPLOAD_POLL_INTERVAL = 2000;
+
+
+function uploadMessage(job) {
+    if (job.state === 'failed') {
+        return `Не удалось загрузить слова в категорию «${job.category_name}». Проверьте формат файла.`;
+    }
+    if (!job.finished) {
+        return `Загрузка слов в категорию «${job.category_name}»…`;
+    }
+    let message = `Категория «${job.category_name}»: добавлено слов - ${job.words_linked}`;
+    if (job.lines_skipped) {
+        message += `, пропущено строк - ${job.lines_skipped}`;
+    }
+    return message;
+}
+
+
+async function pollUpload(element) {
+    try {
+        const response = await fetch(element.dataset.statusUrl, {credentials: 'include'});
+        if (!response.ok) {
+            return;
+        }
+
+        const job = await response.json();
+        element.textContent = uploadMessage(job);
+        element.classList.toggle('failed', job.state === 'failed');
+        if (job.finished) {
+            return;
+        }
+    } catch (error) {
+        // Сеть могла пропасть ненадолго, пробуем снова
+    }
+    setTimeout(() => pollUpload(element), UPLOAD_POLL_INTERVAL);
+}
+
+
+document.querySelectorAll('.upload-status').forEach(element => pollUpload(element));
@@ -9,26 +9,17 @@ document.addEventListener('DOMContentLoaded', function() {
 
 
 function onFilterChange() {
-    const filterValue = this.value;
-    const wordRows = Array.from(document.querySelectorAll('.word-row'));
-
-    wordRows.forEach(row => {
-        row.style.display = 'flex';
+    // Фильтр применяется на сервере ко всему списку, а не только к текущей странице
+    const params = new URLSearchParams(window.location.search);
+    if (this.value) {
+        params.set('status', this.value);
+    } else {
+        params.delete('status');
+    }
+    ['page', 'highlight', 'exact'].forEach(name => params.delete(name));
 
-        switch(filterValue) {
-            case 'status_learned':
-                if (!row.classList.contains('status-learned')) row.style.display = 'none';
-                break;
-            case 'status_in_progress':
-                if (!row.classList.contains('status-in_progress')) row.style.display = 'none';
-                break;
-            case 'status_new':
-                if (!row.classList.contains('status-new')) row.style.display = 'none';
-                break;
-            case 'default':
-                break;
-        }
-    });
+    const query = params.toString();
+    window.location.search = query ? `?${query}` : '';
 }
 
 function highlightWord() {
@@ -0,0 +1,240 @@
+import itertools
+import os
+import shutil
+import tempfile
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from web.models import Catalog_Version, Category, Word, Wordlist_Line, Wordlist_Source
+from web.services.word_ingest import sync_file
+from web.services.wordlist_reader import WordlistReader, format_row, read_words
+
+User = get_user_model()
+
+
+class WordlistReaderTests(TestCase):
+    def test_formats(self):
+        """BOM, CRLF, кавычки; обратная косая черта - обычный символ"""
+        lines = [
+            '\ufeffapple;яблоко;ˈæp.əl\r\n',
+            '"salt; pepper";соль и перец;sɔːlt\n',
+            'a\\b;а;б\n',
+            format_row(('say "hi"', 'привет;', 'haɪ')),
+        ]
+        self.assertEqual(list(WordlistReader(lines)), [
+            ('apple', 'яблоко', 'ˈæp.əl'),
+            ('salt; pepper', 'соль и перец', 'sɔːlt'),
+            ('a\\b', 'а', 'б'),
+            ('say "hi"', 'привет;', 'haɪ'),
+        ])
+
+    def test_format_row_round_trip(self):
+        """Записанная через format_row строка читается обратно без изменений"""
+        rows = [
+            ('a\\b', 'x', 'y'),
+            ('"quoted"', 'a;b', 'c\\;d'),
+            ('trailing\\', '\\"', 'z'),
+        ]
+        self.assertEqual(list(WordlistReader([format_row(row) for row in rows])), rows)
+
+    def test_read_words(self):
+        """Вход translate: строка - слово целиком, ";" и кавычки не разбираются"""
+        lines = ['\ufeffsalt; pepper\r\n', '\n', '"quoted"\r\n', '  rock\'n\'roll  \n', 'say "hi"']
+        words = list(read_words(lines))
+        self.assertEqual(words, ['salt; pepper', '"quoted"', "rock'n'roll", 'say "hi"'])
+        # Записанное translate читается load_words как одно поле
+        rows = [(word, 'перевод', 'tr') for word in words]
+        self.assertEqual(list(WordlistReader([format_row(row) for row in rows])), rows)
+
+    def test_malformed_lines(self):
+        """Плохие строки не теряются молча, а попадают в errors с номерами"""
+        reader = WordlistReader(['ok;ок;ok\n', '\n', 'only;two\n', '"open;a;b\n', 'a;;b\n'])
+        self.assertEqual(list(reader), [('ok', 'ок', 'ok')])
+        self.assertEqual([error.line_number for error in reader.errors], [3, 4, 5])
+
+    def test_batches_are_lazy(self):
+        """Пачки читаются по мере надобности, файл целиком в память не загружается"""
+        lines = (f'w{i};п{i};t{i}\n' for i in itertools.count())
+        batches = WordlistReader(lines).batches(100)
+        self.assertEqual(len(next(batches)), 100)
+        self.assertEqual(next(batches)[0], ('w100', 'п100', 't100'))
+
+
+class LoadWordsTests(TestCase):
+    def setUp(self):
+        self.dir_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir_path)
+        self.user = User.objects.create_user(username='user', password='pass')
+
+    def _write(self, name, lines):
+        with open(os.path.join(self.dir_path, name), 'w', encoding='utf-8') as f:
+            f.write('\n'.join(lines))
+
+    def _load(self, **options):
+        """Запускает load_words, возвращает stdout; stderr (плохие строки) - в self.errors, а не в вывод тестов."""
+        out = StringIO()
+        options.setdefault('stderr', StringIO())
+        call_command('load_words', dir_path=self.dir_path, stdout=out, **options)
+        self.errors = options['stderr'].getvalue()
+        return out.getvalue()
+
+    def test_counts_and_dedupe(self):
+        """Повторы в файле и уже существующие слова не добавляются, связи считаются отдельно"""
+        Word.objects.create(word='apple', translation='яблоко', transcription='ˈæp.əl')
+        self._write('fruits.txt', [
+            'apple;яблоко;ˈæp.əl',
+            'banana;банан;bəˈnɑːnə',
+            'banana;банан;bəˈnɑːnə',
+            'broken line',
+            '',
+        ])
+
+        output = self._load()
+        self.assertIn('Added 1 words total, linked 2 words', output)
+        self.assertEqual(self.errors, 'fruits.txt:4: expected 3 fields, got 1: broken line\n')
+        category = Category.objects.get(name='fruits', owner=None)
+        self.assertEqual(set(category.words.values_list('word', flat=True)), {'apple', 'banana'})
+
+        output = self._load()
+        self.assertIn('Added 0 words total, linked 0 words', output)
+
+    def test_query_count_does_not_grow_with_file(self):
+        """Количество запросов не зависит от числа слов в файле"""
+        Catalog_Version.bump()
+        self._write('small.txt', [f'w{i};п{i};t{i}' for i in range(5)])
+        with CaptureQueriesContext(connection) as small:
+            self._load()
+
+        os.remove(os.path.join(self.dir_path, 'small.txt'))
+        # 200 строк - одна пачка INSERT и в SQLite (не больше 999 параметров в запросе)
+        self._write('large.txt', [f'x{i};п{i};t{i}' for i in range(200)])
+        with CaptureQueriesContext(connection) as large:
+            self._load()
+
+        self.assertEqual(Word.objects.count(), 205)
+        self.assertEqual(len(small), len(large))
+
+    def test_catalog_version_bumped_once(self):
+        """Массовая вставка обходит сигналы, поэтому каталог отмечается измененным явно"""
+        self.client.get(reverse('search_words'), {'q': 'cherry'})
+        version = Catalog_Version.current()
+        self._write('fruits.txt', ['cherry;вишня;ˈtʃer.i', 'plum;слива;plʌm'])
+        self._load()
+
+        self.assertEqual(Catalog_Version.current(), version + 1)
+        self.assertEqual(self.client.get(reverse('search_words'), {'q': 'cherry'}).json()['count'], 1)
+
+    def test_malformed_lines_reported(self):
+        """Команда сообщает номера плохих строк и загружает остальные"""
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl', 'broken line', 'plum;слива;plʌm'])
+        err = StringIO()
+        call_command('load_words', dir_path=self.dir_path, stdout=StringIO(), stderr=err)
+
+        self.assertIn('fruits.txt:2: expected 3 fields, got 1', err.getvalue())
+        self.assertEqual(Category.objects.get(name='fruits').words.count(), 2)
+
+    def test_failed_file_does_not_roll_back_others(self):
+        """Файлы загружаются в отдельных транзакциях, сбой одного попадает в отчет"""
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl'])
+        with open(os.path.join(self.dir_path, 'broken.txt'), 'wb') as f:
+            f.write(b'\xff\xfe\xfa;bad;bytes')
+        err = StringIO()
+        output = StringIO()
+        call_command('load_words', dir_path=self.dir_path, stdout=output, stderr=err)
+
+        self.assertIn('broken.txt: failed', err.getvalue())
+        self.assertIn('Processed 1 files', output.getvalue())
+        self.assertIn('Failed 1 files', output.getvalue())
+        self.assertIn('words/sec', output.getvalue())
+        self.assertFalse(Category.objects.filter(name='broken').exists())
+        self.assertEqual(Category.objects.get(name='fruits').words.count(), 1)
+
+    def test_parallel_jobs(self):
+        """--jobs разбирает файлы в процессах, результат как при последовательной загрузке"""
+        for n in range(3):
+            self._write(f'set{n}.txt', [f'w{i};п{i};t{i}' for i in range(n, n + 50)] + ['broken'])
+        err = StringIO()
+        output = self._load(jobs=2, stderr=err)
+
+        self.assertIn('Processed 3 files', output)
+        self.assertIn('Added 52 words total, linked 150 words', output)
+        # Под параллельным тест-раннером команда сама переходит на --jobs 1
+        self.assertEqual(err.getvalue().count(': expected 3 fields'), 3)
+
+    def test_unchanged_file_skipped(self):
+        """Неизмененный файл не разбирается: ни запросов к словам, ни новой версии каталога"""
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl', 'plum;слива;plʌm'])
+        self._load()
+        version = Catalog_Version.current()
+
+        with CaptureQueriesContext(connection) as queries:
+            output = self._load()
+        self.assertIn('Processed 0 files, 1 unchanged', output)
+        self.assertFalse([q for q in queries if '"web_word"' in q['sql']])
+
+        # Время изменения другое, содержимое то же - файл сверяется по хешу
+        path = os.path.join(self.dir_path, 'fruits.txt')
+        os.utime(path, ns=(0, 0))
+        self.assertIn('1 unchanged', self._load())
+        self.assertEqual(Wordlist_Source.objects.get().mtime_ns, 0)
+        self.assertEqual(Catalog_Version.current(), version)
+
+    def test_changed_file_applies_diff(self):
+        """Из измененного файла добавляются новые строки, слова удаленных строк отвязываются"""
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl', 'plum;слива;plʌm', 'kiwi;киви;ˈkiː.wiː'])
+        self._load()
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl', 'plum;слива;plʌːm', 'pear;груша;peə'])
+
+        output = self._load(verbosity=2)
+        self.assertIn('fruits.txt: added 2 words, linked 2, unlinked 2 (1 modified)', output)
+        category = Category.objects.get(name='fruits')
+        self.assertEqual(
+            set(category.words.values_list('word', 'transcription')),
+            {('apple', 'ˈæp.əl'), ('plum', 'plʌːm'), ('pear', 'peə')}
+        )
+        # Слова без категорий удаляются, как при удалении из категории вручную
+        self.assertFalse(Word.objects.filter(word__in=['kiwi', 'plum'], transcription__in=['ˈkiː.wiː', 'plʌm']).exists())
+        self.assertEqual(
+            set(Wordlist_Line.objects.filter(source__category=category).values_list('word__word', flat=True)),
+            {'apple', 'plum', 'pear'}
+        )
+
+    def test_sync_in_small_batches(self):
+        """Отпечатки сравниваются пачками: повторы строк в разных пачках и удаления между пачками"""
+        category = Category.objects.create(name='fruits')
+        source = Wordlist_Source.objects.create(category=category, file_name='fruits.txt', size=0, mtime_ns=0, content_hash='')
+        self._write('fruits.txt', ['apple;яблоко;a', 'plum;слива;p', 'kiwi;киви;k', 'apple;яблоко;a'])
+        path = os.path.join(self.dir_path, 'fruits.txt')
+        sync_file(path, category, source, batch_size=1)
+        self.assertEqual(source.lines.count(), 3)
+
+        self._write('fruits.txt', ['kiwi;киви;k', 'pear;груша;p', 'apple;яблоко;a'])
+        rows, result, errors = sync_file(path, category, source, batch_size=2)
+        self.assertEqual((rows, result.added, result.unlinked), (3, 1, 1))
+        self.assertEqual(set(category.words.values_list('word', flat=True)), {'kiwi', 'pear', 'apple'})
+        self.assertEqual(set(source.lines.values_list('word__word', flat=True)), {'kiwi', 'pear', 'apple'})
+
+    def test_force_relinks_known_lines(self):
+        """--force загружает и неизмененный файл, восстанавливая отвязанные вручную слова"""
+        self._write('fruits.txt', ['apple;яблоко;ˈæp.əl', 'plum;слива;plʌm'])
+        self._load()
+        category = Category.objects.get(name='fruits')
+        Word.category.through.objects.filter(category=category, word__word='plum').delete()
+
+        self.assertIn('linked 0 words', self._load())
+        self.assertIn('linked 1 words', self._load(force=True))
+        self.assertEqual(category.words.count(), 2)
+
+    def test_private_category(self):
+        """Слова из файла пользователя попадают в его личную категорию"""
+        self._write('mine.txt', ['cat;кот;kæt'])
+        self._load(user_name='user')
+
+        self.assertEqual(Category.objects.get(name='mine').owner, self.user)
+        self.assertEqual(Catalog_Version.current(self.user.id), 1)
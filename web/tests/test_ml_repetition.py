@@ -0,0 +1,465 @@
+import json
+import tempfile
+from datetime import timedelta
+from unittest.mock import MagicMock, call, patch
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from django.contrib.auth import get_user_model
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import (
+    Answer_Attempt, Category, Learning_Session, Training_Job, Word, Word_Repetition, Word_Stats
+)
+from web.services.feature_store import rebuild_word_stats, record_attempt
+from web.services.ml_online import OnlineRepetitionModel
+from web.services.ml_registry import POPULATION_KEY, ModelRegistry
+from web.services.ml_store import ModelStore
+from web.services.ml_training import claim_next_job, enqueue_training, queue_stats, run_job
+from web.services.ml_repetition import (
+    DEFAULT_INTERVALS, FEATURE_NAMES, MIN_TRAINING_ATTEMPTS, RepetitionMLService
+)
+
+User = get_user_model()
+
+
+class BuildTrainingSetTests(TestCase):
+    def setUp(self):
+        self.service = RepetitionMLService()
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.user2 = User.objects.create_user(username='user2', password='pass2')
+        self.category = Category.objects.create(name='Category')
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+        self.session2 = Learning_Session.objects.create(user=self.user2, method='repeat')
+
+        self.words = []
+        for i, text in enumerate(['a', 'word', 'longer_word']):
+            word = Word.objects.create(word=text, translation=f't{i}', transcription=f'tr{i}')
+            word.category.add(self.category)
+            self.words.append(word)
+
+        now = timezone.now()
+        pattern = [True, False, True, True, False, False, True, True]
+        attempts = []
+        for i, word in enumerate(self.words):
+            for j, is_correct in enumerate(pattern[:3 + 2 * i]):
+                attempts.append(Answer_Attempt(
+                    user=self.user, word=word, session=self.session, is_correct=is_correct
+                ))
+        attempts.append(Answer_Attempt(user=self.user2, word=self.words[0], session=self.session2, is_correct=True))
+        attempts = Answer_Attempt.objects.bulk_create(attempts)
+
+        for i, attempt in enumerate(attempts):
+            attempt.timestamp = now - timedelta(minutes=i * 7, microseconds=i * 13)
+        Answer_Attempt.objects.bulk_update(attempts, ['timestamp'])
+
+        rebuild_word_stats()
+
+    def test_store_matches_attempt_history(self):
+        """Признаки из Word_Stats совпадают с расчетом по истории ответов"""
+        now = timezone.now()
+        ids, X, y = self.service._attempt_features(Answer_Attempt.objects.filter(user=self.user), now=now)
+
+        attempts = Answer_Attempt.objects.in_bulk(list(ids))
+        expected = [list(self.service._get_features(self.user, attempts[i].word, now=now).values()) for i in ids]
+
+        self.assertEqual(X.shape, (len(attempts), len(FEATURE_NAMES)))
+        np.testing.assert_allclose(X, np.array(expected, dtype=np.float64))
+        self.assertEqual(list(y), [int(attempts[i].is_correct) for i in ids])
+
+    def test_record_attempt_matches_rebuild(self):
+        """Инкрементальное обновление дает те же признаки, что и пересчет"""
+        Word_Stats.objects.all().delete()
+        for attempt in Answer_Attempt.objects.order_by('timestamp', 'id'):
+            record_attempt(attempt)
+        recorded = {
+            (s.user_id, s.word_id): s for s in Word_Stats.objects.all()
+        }
+
+        rebuild_word_stats()
+        for stats in Word_Stats.objects.all():
+            other = recorded[(stats.user_id, stats.word_id)]
+            self.assertEqual(stats.attempts_total, other.attempts_total)
+            self.assertEqual(stats.correct_total, other.correct_total)
+            self.assertEqual(stats.last_correct, other.last_correct)
+            self.assertEqual(stats.last_attempt_at, other.last_attempt_at)
+            self.assertAlmostEqual(stats.success_ema, other.success_ema)
+        self.assertEqual(len(recorded), Word_Stats.objects.count())
+
+    def test_training_set_weights(self):
+        """Каждое слово дает взвешенные строки верных и неверных ответов"""
+        X, y, weights = self.service._build_training_set(self.user)
+
+        attempts = Answer_Attempt.objects.filter(user=self.user)
+        self.assertEqual(weights.sum(), attempts.count())
+        self.assertEqual(weights[y == 1].sum(), attempts.filter(is_correct=True).count())
+        self.assertEqual(X.shape, (len(y), len(FEATURE_NAMES)))
+
+    def test_one_query(self):
+        """Выборка строится одним запросом"""
+        with self.assertNumQueries(1):
+            self.service._build_training_set(self.user)
+
+    def test_empty_history(self):
+        """Пустая история дает пустую выборку"""
+        user = User.objects.create_user(username='empty', password='pass')
+        X, y, weights = self.service._build_training_set(user)
+
+        self.assertEqual(X.shape, (0, len(FEATURE_NAMES)))
+        self.assertEqual(len(y), 0)
+
+
+class ModelRegistryTests(TestCase):
+    def test_lru_eviction(self):
+        """При переполнении вытесняется давно не использованная модель"""
+        registry = ModelRegistry(max_size=2)
+        registry.put(1, 'model1')
+        registry.put(2, 'model2')
+        registry.get(1)
+        registry.put(3, 'model3')
+
+        self.assertIn(1, registry)
+        self.assertNotIn(2, registry)
+        self.assertIn(3, registry)
+
+    def test_population_fallback(self):
+        """Без своей модели пользователь получает общую"""
+        registry = ModelRegistry()
+        registry.put(POPULATION_KEY, 'population')
+        registry.put(1, 'model1')
+
+        self.assertEqual(registry.get_for_user(1), 'model1')
+        self.assertEqual(registry.get_for_user(2), 'population')
+
+    def test_lazy_loading(self):
+        """Модель подгружается при первом обращении и дальше берется из кэша"""
+        source = MagicMock()
+        source.current_version.side_effect = lambda key: 'v1' if key == 1 else None
+        source.load.side_effect = lambda key, version: f'loaded_{key}'
+        registry = ModelRegistry(source=source)
+
+        self.assertEqual(registry.get_for_user(1), 'loaded_1')
+        self.assertEqual(registry.get_for_user(1), 'loaded_1')
+        self.assertIsNone(registry.get_for_user(2))
+        self.assertIsNone(registry.get_for_user(2))
+
+        source.current_version.assert_has_calls([call(1), call(2), call(POPULATION_KEY)])
+        self.assertEqual(source.current_version.call_count, 3)
+        source.load.assert_called_once_with(1, 'v1')
+
+    def test_refresh_picks_up_new_version(self):
+        """После интервала проверки подхватывается новая версия из хранилища"""
+        source = MagicMock()
+        source.current_version.return_value = 'v1'
+        source.load.side_effect = lambda key, version: f'model_{version}'
+        registry = ModelRegistry(source=source, refresh_interval=0)
+
+        self.assertEqual(registry.get(1), 'model_v1')
+        self.assertEqual(registry.get(1), 'model_v1')
+        source.load.assert_called_once()
+
+        source.current_version.return_value = 'v2'
+        self.assertEqual(registry.get(1), 'model_v2')
+
+
+class ModelStoreTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.store = ModelStore(root=self.tmp_dir.name, features=FEATURE_NAMES)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_save_and_load(self):
+        """Сохраненная модель загружается через mmap"""
+        model = RandomForestClassifier(n_estimators=3).fit(np.random.rand(20, 5), [0, 1] * 10)
+        version = self.store.save(1, model, n_samples=20)
+
+        self.assertEqual(self.store.current_version(1), version)
+        loaded = self.store.load(1)
+        np.testing.assert_array_equal(
+            loaded.predict_proba(np.ones((1, 5))),
+            model.predict_proba(np.ones((1, 5)))
+        )
+
+    def test_missing_model(self):
+        """Для ключа без модели возвращается None"""
+        self.assertIsNone(self.store.current_version(1))
+        self.assertIsNone(self.store.load(1))
+
+    def test_new_version_replaces_current(self):
+        """Новая версия становится текущей, старые версии удаляются"""
+        versions = [self.store.save(1, {'n': i}) for i in range(5)]
+
+        self.assertEqual(self.store.current_version(1), versions[-1])
+        self.assertEqual(self.store.load(1), {'n': 4})
+        self.assertIsNone(self.store.load(1, versions[0]))
+        self.assertEqual(self.store.load(1, versions[-2]), {'n': 3})
+
+    def test_incompatible_features_ignored(self):
+        """Модель с другим набором признаков не загружается"""
+        self.store.save(1, {'n': 1})
+        other_store = ModelStore(root=self.tmp_dir.name, features=('other',))
+
+        self.assertIsNone(other_store.load(1))
+
+
+class RepetitionMLServiceTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.service = RepetitionMLService(store=ModelStore(root=self.tmp_dir.name, features=FEATURE_NAMES))
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.user2 = User.objects.create_user(username='user2', password='pass2')
+        self.category = Category.objects.create(name='Category')
+        self.word = Word.objects.create(word='word', translation='t', transcription='tr')
+        self.word.category.add(self.category)
+
+        session = Learning_Session.objects.create(user=self.user, method='repeat')
+        Answer_Attempt.objects.bulk_create(
+            Answer_Attempt(user=self.user, word=self.word, session=session, is_correct=i % 3 != 0)
+            for i in range(MIN_TRAINING_ATTEMPTS)
+        )
+        rebuild_word_stats()
+
+    def test_untrained_returns_default_interval(self):
+        """Без обученных моделей возвращается стандартный интервал"""
+        self.assertFalse(self.service.is_trained(self.user))
+        self.assertEqual(self.service.predict_next_interval(self.user, self.word, 2), DEFAULT_INTERVALS[2])
+
+    def test_models_are_per_user(self):
+        """Обучение одного пользователя не меняет модель другого"""
+        self.assertTrue(self.service.train_for_user(self.user))
+        self.assertFalse(self.service.train_for_user(self.user2))
+
+        self.assertTrue(self.service.is_trained(self.user))
+        self.assertFalse(self.service.is_trained(self.user2))
+
+    def test_population_model_used_as_fallback(self):
+        """Пользователь без своей модели получает общую"""
+        self.assertTrue(self.service.train_population())
+
+        self.assertTrue(self.service.is_trained(self.user2))
+        self.assertIs(self.service.get_model(self.user2), self.service.registry.get(POPULATION_KEY))
+
+    def test_bulk_prediction_untrained(self):
+        """Без моделей пакетный прогноз дает стандартные интервалы"""
+        intervals = self.service.predict_next_intervals(self.user, [self.word, self.word], [0, 9])
+        self.assertEqual(list(intervals), [DEFAULT_INTERVALS[0], DEFAULT_INTERVALS[-1]])
+
+    def test_bulk_prediction_matches_single(self):
+        """Пакетный прогноз совпадает с поштучным и делает один запрос"""
+        self.service.train_for_user(self.user)
+        new_word = Word.objects.create(word='new', translation='n', transcription='n')
+        words = [self.word, new_word, self.word]
+        counts = [1, 0, 4]
+        now = timezone.now()
+
+        with patch('web.services.ml_repetition.timezone.now', return_value=now):
+            expected = [self.service.predict_next_interval(self.user, w, c) for w, c in zip(words, counts)]
+            with self.assertNumQueries(1):
+                intervals = self.service.predict_next_intervals(self.user, words, counts)
+
+        self.assertEqual(list(intervals), expected)
+
+    def test_reschedule(self):
+        """Пересчет next_review идет от времени последнего ответа"""
+        self.service.train_for_user(self.user)
+        repetition = Word_Repetition.objects.create(
+            user=self.user, word=self.word, next_review=timezone.now() + timedelta(days=30), repetition_count=2
+        )
+        untouched = Word_Repetition.objects.create(
+            user=self.user, word=Word.objects.create(word='new', translation='n', transcription='n')
+        )
+
+        changed = self.service.reschedule(self.user, [repetition, untouched])
+
+        self.assertEqual(changed, [repetition])
+        last_attempt = Answer_Attempt.objects.filter(user=self.user).latest('timestamp').timestamp
+        interval = self.service.predict_next_intervals(self.user, [self.word], [2])[0]
+        self.assertAlmostEqual(
+            repetition.next_review,
+            last_attempt + timedelta(minutes=interval),
+            delta=timedelta(seconds=1)
+        )
+
+    def test_models_survive_restart(self):
+        """Новый процесс подхватывает обученные модели с диска"""
+        self.service.train_for_user(self.user)
+
+        restarted = RepetitionMLService(store=ModelStore(root=self.tmp_dir.name, features=FEATURE_NAMES))
+        self.assertTrue(restarted.is_trained(self.user))
+        self.assertFalse(restarted.is_trained(self.user2))
+
+
+class TrainingQueueTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.service = MagicMock()
+
+    def test_enqueue_deduplicates(self):
+        """На пользователя ставится только одна ожидающая задача"""
+        self.assertTrue(enqueue_training(self.user))
+        self.assertFalse(enqueue_training(self.user))
+
+        self.assertEqual(Training_Job.objects.filter(user=self.user).count(), 1)
+
+    @override_settings(ML_TRAIN_DEBOUNCE=60)
+    def test_debounce(self):
+        """Задача не запускается раньше окончания окна накопления"""
+        now = timezone.now()
+        enqueue_training(self.user, now=now)
+
+        self.assertIsNone(claim_next_job(now=now))
+        job = claim_next_job(now=now + timedelta(seconds=61))
+        self.assertEqual(job.state, Training_Job.State.RUNNING)
+        self.assertEqual(job.attempts, 1)
+
+    def test_run_job_success(self):
+        """Успешное обучение сохраняет время обучения"""
+        enqueue_training(self.user, now=timezone.now() - timedelta(hours=1))
+        job = claim_next_job()
+
+        self.assertTrue(run_job(job, self.service))
+        self.service.train_for_user.assert_called_once_with(self.user)
+        job.refresh_from_db()
+        self.assertEqual(job.state, Training_Job.State.DONE)
+        self.assertIsNotNone(job.fit_seconds)
+
+        # После завершения можно ставить новую задачу
+        self.assertTrue(enqueue_training(self.user))
+
+    @override_settings(ML_TRAIN_BACKOFF=10, ML_TRAIN_MAX_ATTEMPTS=2)
+    def test_backoff_on_failure(self):
+        """Упавшая задача повторяется с экспоненциальной задержкой, затем помечается FAILED"""
+        self.service.train_for_user.side_effect = ValueError('boom')
+        enqueue_training(self.user, now=timezone.now() - timedelta(hours=1))
+
+        job = claim_next_job()
+        with self.assertLogs('web.services.ml_training', level='ERROR'):
+            self.assertFalse(run_job(job, self.service))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Training_Job.State.PENDING)
+        self.assertAlmostEqual(job.run_after, job.finished_at + timedelta(seconds=10), delta=timedelta(seconds=1))
+
+        job = claim_next_job(now=timezone.now() + timedelta(seconds=11))
+        with self.assertLogs('web.services.ml_training', level='ERROR'):
+            self.assertFalse(run_job(job, self.service))
+        job.refresh_from_db()
+        self.assertEqual(job.state, Training_Job.State.FAILED)
+        self.assertEqual(job.error, 'boom')
+
+    def test_queue_stats(self):
+        """Метрики очереди"""
+        enqueue_training(self.user)
+        stats = queue_stats()
+
+        self.assertEqual(stats['pending'], 1)
+        self.assertEqual(stats['running'], 0)
+        self.assertIsNone(stats['fit_seconds_p50'])
+
+    def test_send_repeat_result_only_enqueues(self):
+        """Ответ на повторение ставит задачу в очередь, а не обучает модель"""
+        category = Category.objects.create(name='Category')
+        word = Word.objects.create(word='word', translation='t', transcription='tr')
+        word.category.add(category)
+        session = Learning_Session.objects.create(user=self.user, method='repeat')
+        Word_Repetition.objects.create(user=self.user, word=word, next_review=timezone.now() - timedelta(hours=1))
+
+        self.client.login(username='user', password='pass')
+        with patch.object(RepetitionMLService, 'train_for_user') as mocked_train:
+            response = self.client.post(
+                reverse('send_repeat_result'),
+                data=json.dumps({'word_id': word.id, 'is_known': True, 'session_id': session.id}),
+                content_type='application/json'
+            )
+
+        self.assertEqual(response.status_code, 200)
+        mocked_train.assert_not_called()
+        self.assertTrue(Training_Job.objects.filter(user=self.user, state=Training_Job.State.PENDING).exists())
+
+
+@override_settings(ML_MODEL_KIND='online', ML_ONLINE_REFIT_EVERY=10)
+class OnlineLearnerTests(TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.store = ModelStore(root=self.tmp_dir.name, features=FEATURE_NAMES)
+        self.service = RepetitionMLService(store=self.store)
+
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+        self.words = []
+        for i in range(4):
+            word = Word.objects.create(word='w' * (i + 1), translation=f't{i}', transcription=f'tr{i}')
+            self.words.append(word)
+        self.answer(MIN_TRAINING_ATTEMPTS)
+
+    def answer(self, count):
+        attempts = Answer_Attempt.objects.bulk_create(
+            Answer_Attempt(user=self.user, word=self.words[i % 4], session=self.session, is_correct=i % 3 != 0)
+            for i in range(count)
+        )
+        for attempt in attempts:
+            record_attempt(attempt)
+        return attempts
+
+    def test_first_training_is_full_fit(self):
+        """Первое обучение - полное, модель запоминает последнюю учтенную попытку"""
+        self.assertTrue(self.service.train_for_user(self.user))
+
+        model = self.store.load(self.user.id)
+        self.assertIsInstance(model, OnlineRepetitionModel)
+        self.assertEqual(model.updates_since_refit, 0)
+        self.assertEqual(model.last_attempt_id, Answer_Attempt.objects.latest('id').id)
+
+    def test_incremental_update(self):
+        """Новые попытки дообучают модель без полного переобучения"""
+        self.service.train_for_user(self.user)
+        refitted_at = self.store.load(self.user.id).refitted_at
+        new_attempts = self.answer(3)
+
+        with patch.object(OnlineRepetitionModel, 'fit') as mocked_fit:
+            self.assertTrue(self.service.train_for_user(self.user))
+        mocked_fit.assert_not_called()
+
+        model = self.store.load(self.user.id)
+        self.assertEqual(model.updates_since_refit, 3)
+        self.assertEqual(model.refitted_at, refitted_at)
+        self.assertEqual(model.last_attempt_id, new_attempts[-1].id)
+
+    def test_incremental_set_matches_full_set(self):
+        """Признаки новых попыток совпадают с полной выборкой"""
+        last_id = Answer_Attempt.objects.latest('id').id
+        self.answer(5)
+        now = timezone.now()
+
+        ids, X, y = self.service._build_incremental_set(self.user, last_id, now=now)
+        all_ids, all_X, all_y = self.service._attempt_features(Answer_Attempt.objects.filter(user=self.user), now=now)
+
+        mask = all_ids > last_id
+        self.assertEqual(sorted(ids), sorted(all_ids[mask]))
+        order = np.argsort(ids)
+        np.testing.assert_allclose(X[order], all_X[mask][np.argsort(all_ids[mask])])
+
+    def test_periodic_refit(self):
+        """После ML_ONLINE_REFIT_EVERY обновлений модель переобучается целиком"""
+        self.service.train_for_user(self.user)
+        self.answer(10)
+        self.service.train_for_user(self.user)
+        self.assertEqual(self.store.load(self.user.id).updates_since_refit, 10)
+
+        self.answer(1)
+        self.service.train_for_user(self.user)
+        self.assertEqual(self.store.load(self.user.id).updates_since_refit, 0)
+
+    def test_predict_next_interval(self):
+        """Онлайн-модель работает через тот же predict_next_interval"""
+        self.service.train_for_user(self.user)
+        restarted = RepetitionMLService(store=self.store)
+        self.assertEqual(restarted.get_model(self.user).predict_proba(np.ones((1, 5))).shape, (1, 2))
+
+        interval = self.service.predict_next_interval(self.user, self.words[0], 2)
+        self.assertIn(interval, [DEFAULT_INTERVALS[2] * k for k in (2, 1.5, 1)] + [max(30, DEFAULT_INTERVALS[2] * 0.7)])
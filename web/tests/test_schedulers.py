@@ -0,0 +1,236 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import Category, Learned_Word, Learning_Session, Word, Word_Repetition
+from web.services.schedulers import (
+    DEFAULT_INTERVALS, FSRSScheduler, MLScheduler, SM2Scheduler, ShadowScheduler, get_scheduler
+)
+
+User = get_user_model()
+
+
+class SchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.word = Word.objects.create(word='word', translation='слово', transcription='wɜːd')
+        self.now = timezone.now()
+
+    def _repetition(self, **fields):
+        return Word_Repetition(user=self.user, word=self.word, **fields)
+
+    def _answer(self, scheduler, repetition, is_correct, now):
+        """Повторяет то, что делает send_repeat_result."""
+        if is_correct:
+            repetition.repetition_count += 1
+        else:
+            repetition.repetition_count = max(0, repetition.repetition_count - 1)
+        interval = scheduler.next_interval(self.user, self.word, repetition, is_correct, now)
+        repetition.interval = interval
+        repetition.last_review = now
+        return interval
+
+    def test_sm2_grows_interval_with_ease(self):
+        """SM-2 идет по DEFAULT_INTERVALS, затем умножает интервал на ease_factor."""
+        scheduler = SM2Scheduler()
+        repetition = self._repetition()
+        now = self.now
+        intervals = []
+        for _ in range(7):
+            intervals.append(self._answer(scheduler, repetition, True, now))
+            now += timedelta(minutes=intervals[-1])
+
+        self.assertEqual(intervals[:4], DEFAULT_INTERVALS[1:])
+        self.assertEqual(repetition.ease_factor, 2.5)
+        self.assertEqual(intervals[4:], [4320 * 2.5, 4320 * 2.5 ** 2, 4320 * 2.5 ** 3])
+
+    def test_sm2_wrong_answer_resets_interval(self):
+        """Ошибка сбрасывает интервал и снижает ease_factor, но не ниже 1.3."""
+        scheduler = SM2Scheduler()
+        repetition = self._repetition(repetition_count=5, sm2_interval=10000, ease_factor=1.35)
+
+        interval = self._answer(scheduler, repetition, False, self.now)
+
+        self.assertEqual(interval, DEFAULT_INTERVALS[0])
+        self.assertEqual(repetition.ease_factor, 1.3)
+
+    def test_graduation_is_decided_by_scheduler(self):
+        """ML выпускает слово по счетчику повторений, SM-2 - по своему интервалу, FSRS - по stability."""
+        repetition = self._repetition(repetition_count=5, sm2_interval=4320, stability=5)
+        self.assertTrue(MLScheduler().is_graduated(repetition))
+        self.assertFalse(SM2Scheduler().is_graduated(repetition))
+        self.assertFalse(FSRSScheduler().is_graduated(repetition))
+
+        repetition = self._repetition(repetition_count=1, sm2_interval=SM2Scheduler.GRADUATION_INTERVAL, stability=30)
+        self.assertFalse(MLScheduler().is_graduated(repetition))
+        self.assertTrue(SM2Scheduler().is_graduated(repetition))
+        self.assertTrue(FSRSScheduler().is_graduated(repetition))
+        self.assertTrue(ShadowScheduler(SM2Scheduler(), MLScheduler()).is_graduated(repetition))
+
+    def test_fsrs_stability(self):
+        """FSRS: успех наращивает stability, ошибка уменьшает, difficulty в пределах 1..10."""
+        scheduler = FSRSScheduler()
+        repetition = self._repetition()
+
+        first = self._answer(scheduler, repetition, True, self.now)
+        self.assertAlmostEqual(repetition.stability, FSRSScheduler.WEIGHTS[2])
+
+        later = self.now + timedelta(minutes=first)
+        second = self._answer(scheduler, repetition, True, later)
+        self.assertGreater(second, first)
+        stability = repetition.stability
+
+        self._answer(scheduler, repetition, False, later + timedelta(minutes=second))
+        self.assertLess(repetition.stability, stability)
+        self.assertTrue(1 <= repetition.difficulty <= 10)
+
+    def test_fsrs_retrievability_at_stability(self):
+        """Через stability дней вероятность вспомнить равна 90%."""
+        self.assertAlmostEqual(FSRSScheduler().retrievability(12, 12), 0.9)
+
+    def test_shadow_keeps_primary_interval(self):
+        """Теневой движок обновляет свое состояние, но расписание задает основной."""
+        scheduler = ShadowScheduler(SM2Scheduler(), FSRSScheduler())
+        repetition = self._repetition()
+
+        with self.assertLogs('web.services.schedulers', level='INFO'):
+            interval = self._answer(scheduler, repetition, True, self.now)
+
+        self.assertEqual(interval, DEFAULT_INTERVALS[1])
+        self.assertGreater(repetition.stability, 0)
+
+    def test_shadow_sm2_keeps_own_interval(self):
+        """Теневой SM-2 считает от своего интервала, а не от назначенного основным движком."""
+        scheduler = ShadowScheduler(FSRSScheduler(), SM2Scheduler())
+        repetition = self._repetition()
+        now = self.now
+        with self.assertLogs('web.services.schedulers', level='INFO'):
+            for _ in range(3):
+                now += timedelta(minutes=self._answer(scheduler, repetition, True, now))
+
+        self.assertEqual(repetition.sm2_interval, DEFAULT_INTERVALS[3])
+        self.assertNotEqual(repetition.interval, repetition.sm2_interval)
+
+    @override_settings(REPETITION_SCHEDULER='fsrs', REPETITION_SCHEDULER_SHADOW='sm2')
+    def test_get_scheduler_from_settings(self):
+        scheduler = get_scheduler()
+
+        self.assertIsInstance(scheduler, ShadowScheduler)
+        self.assertIsInstance(scheduler.primary, FSRSScheduler)
+        self.assertIsInstance(scheduler.shadow, SM2Scheduler)
+        self.assertIs(get_scheduler(), scheduler)
+
+    def test_default_scheduler_is_ml(self):
+        self.assertIsInstance(get_scheduler(), MLScheduler)
+
+    @override_settings(REPETITION_SCHEDULER='unknown')
+    def test_unknown_scheduler(self):
+        with self.assertRaises(ValueError):
+            get_scheduler()
+
+
+class SendRepeatResultSchedulerTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.force_login(self.user)
+        category = Category.objects.create(name='Category', owner=self.user)
+        self.word = Word.objects.create(word='word', translation='слово', transcription='wɜːd')
+        self.word.category.add(category)
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+        self.repetition = Word_Repetition.objects.create(
+            user=self.user, word=self.word,
+            next_review=timezone.now() - timedelta(hours=1), repetition_count=1
+        )
+
+    def _send(self, is_known):
+        return self.client.post(
+            reverse('send_repeat_result'),
+            data=json.dumps({'word_id': self.word.id, 'is_known': is_known, 'session_id': self.session.id}),
+            content_type='application/json'
+        )
+
+    @override_settings(REPETITION_SCHEDULER='sm2')
+    @patch('web.services.ml_repetition.RepetitionMLService.train_for_user_async')
+    @patch('web.services.ml_repetition.RepetitionMLService.predict_next_interval')
+    def test_sm2_does_not_use_ml(self, mock_predict, mock_train):
+        """С движком SM-2 ML-модель не вызывается, состояние сохраняется в Word_Repetition."""
+        response = self._send(True)
+
+        self.assertEqual(response.status_code, 200)
+        mock_predict.assert_not_called()
+        mock_train.assert_not_called()
+
+        self.repetition.refresh_from_db()
+        self.assertEqual(self.repetition.interval, DEFAULT_INTERVALS[2])
+        self.assertIsNotNone(self.repetition.last_review)
+        self.assertAlmostEqual(
+            (self.repetition.next_review - self.repetition.last_review).total_seconds(),
+            DEFAULT_INTERVALS[2] * 60
+        )
+
+
+    @override_settings(REPETITION_SCHEDULER='sm2')
+    def test_sm2_multiplies_by_ease_after_fifth_answer(self):
+        """С SM-2 слово не выпускается на пятом повторении: интервалы растут по ease_factor до выпуска."""
+        self.repetition.repetition_count = 5
+        self.repetition.sm2_interval = DEFAULT_INTERVALS[-1]
+        self.repetition.ease_factor = 2.7
+        self.repetition.save()
+
+        intervals = []
+        for _ in range(10):
+            self.assertEqual(self._send(True).status_code, 200)
+            if Learned_Word.objects.filter(user=self.user, word=self.word).exists():
+                break
+            self.repetition.refresh_from_db()
+            intervals.append(self.repetition.sm2_interval)
+            Word_Repetition.objects.filter(pk=self.repetition.pk).update(next_review=timezone.now())
+
+        # Верный ответ (оценка 4) не меняет ease_factor
+        self.assertEqual(intervals, [DEFAULT_INTERVALS[-1] * 2.7, DEFAULT_INTERVALS[-1] * 2.7 ** 2])
+        self.assertGreaterEqual(intervals[-1], SM2Scheduler.GRADUATION_INTERVAL)
+
+    @override_settings(REPETITION_SCHEDULER='sm2', REPETITION_SCHEDULER_SHADOW='ml')
+    @patch('web.services.ml_repetition.RepetitionMLService.reschedule')
+    def test_reschedule_reviews_keeps_sm2_schedule(self, mock_reschedule):
+        """Ночной пересчет не перезаписывает расписание движка, который не использует ML."""
+        next_review = self.repetition.next_review
+        out = StringIO()
+        call_command('reschedule_reviews', stdout=out)
+
+        self.assertIn('does not reschedule', out.getvalue())
+        mock_reschedule.assert_not_called()
+        self.repetition.refresh_from_db()
+        self.assertEqual(self.repetition.next_review, next_review)
+
+    @patch('web.services.ml_repetition.RepetitionMLService.reschedule')
+    def test_reschedule_reviews_with_ml(self, mock_reschedule):
+        """С ML-движком пересчет идет через модель и сохраняет измененные повторения."""
+        self.repetition.next_review = timezone.now() + timedelta(days=2)
+        mock_reschedule.return_value = [self.repetition]
+        call_command('reschedule_reviews', stdout=StringIO())
+
+        mock_reschedule.assert_called_once()
+        self.repetition.refresh_from_db()
+        self.assertGreater(self.repetition.next_review, timezone.now() + timedelta(days=1))
+
+
+class SimulateReviewsTests(TestCase):
+    def test_simulation_is_rolled_back(self):
+        """Симуляция проходит через настоящие view и ничего не оставляет в базе."""
+        out = StringIO()
+        call_command('simulate_reviews', users=2, words=5, days=2, scheduler='sm2', stdout=out)
+
+        output = out.getvalue()
+        self.assertIn('Scheduler: sm2', output)
+        self.assertIn('queries/request', output)
+        self.assertIn('Expected retention', output)
+        self.assertFalse(User.objects.exists())
+        self.assertFalse(Word_Repetition.objects.exists())
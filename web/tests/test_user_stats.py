@@ -0,0 +1,207 @@
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from web.models import (
+    Answer_Attempt, Category, Daily_Activity, Learned_Word, Learning_Category, Learning_Session,
+    Session_Hour_Stats, User_Stats, Word, Word_Repetition
+)
+from web.services.user_stats import compute_user_stats, forget_word, get_user_stats
+
+User = get_user_model()
+
+
+@patch('web.services.ml_repetition.RepetitionMLService.train_for_user_async')
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+        self.category = Category.objects.create(name='Public', owner=None)
+        self.words = Word.objects.bulk_create(
+            Word(word=f'word_{i}', translation=f'слово_{i}', transcription=f'tr_{i}') for i in range(6)
+        )
+        self.category.words.add(*self.words)
+        Learning_Category.objects.create(user=self.user, category=self.category)
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+
+    def _post(self, name, data=None, **kwargs):
+        return self.client.post(reverse(name, kwargs=kwargs), data=json.dumps(data or {}),
+                                content_type='application/json')
+
+    def _assert_matches_history(self):
+        stats = User_Stats.objects.get(user=self.user)
+        self.assertEqual({name: getattr(stats, name) for name in compute_user_stats(self.user.id)},
+                         compute_user_stats(self.user.id))
+
+    def test_counters_follow_write_paths(self, mock_train):
+        """Счетчики, обновляемые при записи, совпадают с пересчетом по истории"""
+        get_user_stats(self.user.id)
+        w = self.words
+
+        self._post('new_word_send_result', {'word_id': w[0].id, 'is_known': True})
+        self._post('new_word_send_result', {'word_id': w[1].id, 'is_known': False})
+        self._post('new_word_send_result', {'word_id': w[1].id, 'is_known': False})
+        self._post('word_start_learning', word_id=w[2].id)
+        self._post('word_mark_known', word_id=w[2].id)
+
+        Word_Repetition.objects.update(next_review=timezone.now())
+        self._post('send_repeat_result', {'word_id': w[1].id, 'session_id': self.session.id, 'is_known': True})
+        self._post('send_repeat_result', {'word_id': w[3].id, 'session_id': self.session.id, 'is_known': False})
+        Word_Repetition.objects.filter(word=w[1]).update(repetition_count=5, next_review=timezone.now())
+        self._post('send_results_batch', {'session_id': self.session.id, 'results': [
+            {'word_id': w[1].id, 'is_known': True},
+            {'word_id': w[4].id, 'is_known': True, 'type': 'new'},
+            {'word_id': w[5].id, 'is_known': False},
+        ]})
+        self._assert_matches_history()
+        self.assertEqual(User_Stats.objects.get(user=self.user).answers_total, 4)
+
+        self._post('word_reset_progress', word_id=w[0].id)
+        self._assert_matches_history()
+        self.client.get(reverse('reset_category_progress', args=[self.category.id]))
+        self._assert_matches_history()
+        self.assertEqual(User_Stats.objects.get(user=self.user).learned_words, 0)
+
+    def test_word_delete(self, mock_train):
+        """Удаление слова уменьшает счетчики всех пользователей, у которых оно было"""
+        Learned_Word.objects.create(user=self.user, word=self.words[0])
+        Word_Repetition.objects.create(user=self.user, word=self.words[1])
+        self.assertEqual(get_user_stats(self.user.id).learned_words, 1)
+
+        self.words[0].delete()
+        self.words[1].delete()
+        self._assert_matches_history()
+
+    def test_word_delete_query_count(self, mock_train):
+        """Счетчики при удалении слова уменьшаются одним UPDATE на счетчик, а не на пользователя"""
+        users = [self.user] + [User.objects.create_user(username=f'user_{i}', password='pass') for i in range(3)]
+        for user in users:
+            Learned_Word.objects.create(user=user, word=self.words[0])
+            Word_Repetition.objects.create(user=user, word=self.words[1])
+            get_user_stats(user.id)
+
+        with self.assertNumQueries(2):
+            forget_word(self.words[0].id)
+        with self.assertNumQueries(2):
+            forget_word(self.words[1].id)
+        self.assertEqual(set(User_Stats.objects.values_list('learned_words', 'in_progress_words')), {(0, 0)})
+
+    def test_sessions(self, mock_train):
+        """Сессии попадают в тепловую карту, средняя длительность считается по завершенным тестам"""
+        get_user_stats(self.user.id)
+        url = reverse('track_session')
+        for duration in (30, 60):
+            response = self.client.post(url, json.dumps({
+                'type': 'session_start',
+                'page_url': 'http://testserver/learning/test',
+                'session_start': '2024-01-01T10:00:00Z',
+            }), content_type='application/json')
+            self.client.post(url, json.dumps({
+                'type': 'session_end',
+                'session_id': response.json()['session_id'],
+                'session_end': '2024-01-01T10:05:00Z',
+                'duration': duration,
+            }), content_type='application/json')
+
+        stats = User_Stats.objects.get(user=self.user)
+        self.assertEqual((stats.test_sessions, stats.test_seconds), (2, 90))
+        self.assertEqual(sum(Session_Hour_Stats.objects.filter(user=self.user, method='test')
+                             .values_list('sessions', flat=True)), 2)
+
+    def test_stats_view(self, mock_train):
+        """Страница статистики читает строку статистики, а не историю ответов"""
+        Learned_Word.objects.create(user=self.user, word=self.words[0])
+        Answer_Attempt.objects.create(user=self.user, word=self.words[1], session=self.session)
+        Learning_Session.objects.create(user=self.user, method='new_words')
+
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(response.context['stats']['total_words'], 1)
+        self.assertEqual(response.context['stats']['total_quizzes'], 1)
+        self.assertEqual(json.loads(response.context['pie_data'])[0]['values'], [1, 0, 5])
+        self.assertEqual(json.loads(response.context['heat_data'])[0]['z'], [1])
+
+        # Сессия, пользователь, статистика, категории, версии каталогов, тепловая карта, последние дни:
+        # число слов в категориях посчитано при прошлом запросе и не пересчитывается
+        with self.assertNumQueries(7):
+            self.client.get(reverse('stats'))
+
+        # Новое слово в категории повышает версию каталога, и число пересчитывается
+        self.category.words.add(Word.objects.create(word='new', translation='новое', transcription='nju'))
+        response = self.client.get(reverse('stats'))
+        self.assertEqual(json.loads(response.context['pie_data'])[0]['values'], [1, 0, 6])
+
+    def test_rebuild_command(self, mock_train):
+        """Команда пересчитывает статистику по истории"""
+        get_user_stats(self.user.id)
+        User_Stats.objects.update(learned_words=100, answers_total=100)
+        Learned_Word.objects.create(user=self.user, word=self.words[0])
+
+        out = StringIO()
+        call_command('rebuild_user_stats', stdout=out)
+        self.assertIn('1 users', out.getvalue())
+        self._assert_matches_history()
+
+
+@patch('web.services.ml_repetition.RepetitionMLService.train_for_user_async')
+class DailyActivityTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.client.login(username='user', password='pass')
+        category = Category.objects.create(name='Public', owner=None)
+        self.words = Word.objects.bulk_create(
+            Word(word=f'word_{i}', translation=f'слово_{i}', transcription=f'tr_{i}') for i in range(3)
+        )
+        category.words.add(*self.words)
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+
+    def test_write_paths(self, mock_train):
+        """Ответы, выученные слова и время сессий попадают в строку за сегодня"""
+        Word_Repetition.objects.create(user=self.user, word=self.words[0], repetition_count=5,
+                                       next_review=timezone.now())
+        self.client.post(reverse('send_repeat_result'), json.dumps({
+            'word_id': self.words[0].id, 'session_id': self.session.id, 'is_known': True
+        }), content_type='application/json')
+        self.client.post(reverse('send_results_batch'), json.dumps({
+            'session_id': self.session.id,
+            'results': [{'word_id': self.words[1].id, 'is_known': False}],
+        }), content_type='application/json')
+        self.client.post(reverse('word_mark_known', args=[self.words[2].id]))
+        self.client.post(reverse('track_session'), json.dumps({
+            'type': 'session_end', 'session_id': self.session.id,
+            'session_end': '2024-01-01T10:05:00Z', 'duration': 45,
+        }), content_type='application/json')
+
+        day = Daily_Activity.objects.get(user=self.user, date=timezone.localdate())
+        self.assertEqual((day.words_learned, day.answers, day.correct, day.session_seconds), (2, 2, 1, 45))
+
+    def test_week_progress(self, mock_train):
+        """Таблица последних дней строится из дневных строк, пропущенные дни - нули"""
+        today = timezone.localdate()
+        Daily_Activity.objects.create(user=self.user, date=today, words_learned=3, answers=10)
+        Daily_Activity.objects.create(user=self.user, date=today - timedelta(days=2), words_learned=1, answers=4)
+        Daily_Activity.objects.create(user=self.user, date=today - timedelta(days=30), answers=99)
+
+        week = self.client.get(reverse('stats')).context['week_progress']
+        self.assertEqual(len(week), 7)
+        self.assertEqual(week[0], {'date': today.strftime('%d.%m'), 'words': 3, 'quizzes': 10})
+        self.assertEqual([day['quizzes'] for day in week], [10, 0, 4, 0, 0, 0, 0])
+
+    def test_backfill_command(self, mock_train):
+        """Команда заполняет дни по истории ответов и сессий"""
+        Answer_Attempt.objects.create(user=self.user, word=self.words[0], session=self.session, is_correct=True)
+        Answer_Attempt.objects.create(user=self.user, word=self.words[1], session=self.session)
+        Learned_Word.objects.create(user=self.user, word=self.words[0])
+        Learning_Session.objects.filter(id=self.session.id).update(duration=120)
+
+        out = StringIO()
+        call_command('backfill_daily_activity', stdout=out)
+        self.assertIn('1 days of activity for 1 users', out.getvalue())
+        day = Daily_Activity.objects.get(user=self.user)
+        self.assertEqual((day.words_learned, day.answers, day.correct, day.session_seconds), (1, 2, 1, 120))
@@ -2,9 +2,14 @@ import json
 import os
 from datetime import timedelta
 import shutil
+from collections import Counter
+from io import StringIO
 from unittest.mock import MagicMock, patch
 
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase, Client, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.contrib.auth import get_user_model
 from django.core.files.uploadedfile import SimpleUploadedFile
@@ -15,16 +20,20 @@ from django.conf import settings
 from django.utils import timezone
 from django.core.files.storage import default_storage
 from django.core.files.base import ContentFile
+from django.core.management import call_command
 
 from web.models import (
-    Answer_Attempt, Category, Feedback, Learned_Word,
-    Learning_Category, Learning_Session, Word, Word_Repetition
+    Answer_Attempt, Catalog_Version, Category, Daily_Activity, Feedback, Ingestion_Job, Learned_Word,
+    Learning_Category, Learning_Session, Word, Word_Repetition, Word_Stats
 )
 from web.forms import (
     AddCategoryForm, AddWordForm, EditCategoryForm,
     EditWordForm, FeedbackForm, RegistrationForm
 )
+from web.services.ingestion_jobs import enqueue_upload
 from web.services.ml_repetition import DEFAULT_INTERVALS
+from web.services.search_index import public_index
+from web.views import pick_random_word
 
 User = get_user_model()
 
@@ -597,6 +606,8 @@ class CategoryTestViewTests(TestCase):
 
 class CategoriesWordlistViewTests(TestCase):
     def setUp(self):
+        # Общие списки слов кешируются между запросами, тесты не должны видеть чужие
+        cache.clear()
         self.client = Client()
         self.user = User.objects.create_user(
             username='testuser',
@@ -730,6 +741,70 @@ class CategoriesWordlistViewTests(TestCase):
         self.assertEqual(response.context['wordlist'][0].word, 'apple')
 
 
+    def test_base_wordlist_cached(self):
+        """Общий список слов берется из кеша, от пользователя зависит один запрос статусов"""
+        Learned_Word.objects.create(user=self.user, word=self.word2)
+        self.client.login(username='testuser', password='123')
+        url = reverse('categories_wordlist', args=[self.public_category.id])
+        self.client.get(url)
+
+        # Сессия, пользователь, категория, версия каталога, статусы
+        with self.assertNumQueries(5):
+            response = self.client.get(url)
+        self.assertEqual(response.context['wordlist'][0].status, 'learned')
+
+    def test_wordlist_cache_invalidation(self):
+        """Изменения слов категории видны сразу"""
+        url = reverse('categories_wordlist', args=[self.public_category.id])
+        self.client.get(url)
+
+        self.word1.category.add(self.public_category)
+        self.assertEqual(len(self.client.get(url).context['wordlist']), 2)
+
+        self.word2.word = 'notebook'
+        self.word2.save()
+        self.assertIn('notebook', [w.word for w in self.client.get(url).context['wordlist']])
+
+    @override_settings(WORDLIST_PAGE_SIZE=1)
+    def test_pagination(self):
+        """Список делится на страницы, ссылка из поиска открывает страницу с нужным словом"""
+        url = reverse('categories_wordlist', args=[self.category.id])
+        self.client.login(username='testuser', password='123')
+
+        response = self.client.get(url, {'page': 2})
+        self.assertEqual([w.word for w in response.context['wordlist']], ['book'])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+
+        response = self.client.get(url, {'highlight': 'Book', 'exact': 'true'})
+        self.assertEqual([w.word for w in response.context['wordlist']], ['book'])
+
+    @override_settings(WORDLIST_PAGE_SIZE=1)
+    def test_status_filter_before_pagination(self):
+        """Фильтр по статусу применяется ко всему списку, ссылки страниц его сохраняют"""
+        word3 = Word.objects.create(word='cat', translation='кот', transcription='kæt')
+        word3.category.add(self.category)
+        Learned_Word.objects.create(user=self.user, word=self.word2)
+        Word_Repetition.objects.create(user=self.user, word=word3, repetition_count=2)
+        url = reverse('categories_wordlist', args=[self.category.id])
+        self.client.login(username='testuser', password='123')
+
+        response = self.client.get(url, {'status': 'learned'})
+        self.assertEqual([w.word for w in response.context['wordlist']], ['book'])
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 1)
+
+        response = self.client.get(url, {'status': 'in_progress'})
+        self.assertEqual([(w.word, w.repetition_count) for w in response.context['wordlist']], [('cat', 2)])
+
+        Learned_Word.objects.create(user=self.user, word=word3)
+        response = self.client.get(url, {'status': 'new'})
+        self.assertEqual([w.word for w in response.context['wordlist']], ['apple'])
+
+        Learned_Word.objects.filter(word=self.word2).delete()
+        response = self.client.get(url, {'status': 'new'})
+        self.assertEqual(response.context['page_obj'].paginator.num_pages, 2)
+        self.assertContains(response, 'href="?status=new&amp;page=2"')
+
+
 class FeedbackViewTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -2708,6 +2783,73 @@ class AddCategoryViewTests(TestCase):
         category = Category.objects.filter(name='Test Category', owner=self.user).first()
         self.assertIsNotNone(category)
 
+    @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
+    def test_add_category_loads_only_uploaded_file(self):
+        """Слова загружаются из загруженного файла, прошлые загрузки пользователя не перечитываются"""
+        self.client.login(username='testuser', password='123')
+        self.client.post(self.url, {'name': 'First', 'word_file': self.valid_file})
+        second_file = SimpleUploadedFile('second.txt', '\ufeffcat;кот;kæt\r\nbroken\r\n'.encode('utf-8'))
+        self.client.post(self.url, {'name': 'Second', 'word_file': second_file})
+        call_command('ingest_worker', '--once', stdout=StringIO(), stderr=StringIO())
+
+        first = Category.objects.get(name='First', owner=self.user)
+        second = Category.objects.get(name='Second', owner=self.user)
+        self.assertEqual(set(first.words.values_list('word', flat=True)), {'apple', 'banana'})
+        self.assertEqual(list(second.words.values_list('word', flat=True)), ['cat'])
+
+    @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
+    def test_add_category_queues_upload(self):
+        """Запрос только ставит загрузку в очередь, слова появляются после воркера"""
+        self.client.login(username='testuser', password='123')
+        self.client.post(self.url, {'name': 'Queued', 'word_file': self.valid_file})
+
+        job = Ingestion_Job.objects.get(user=self.user)
+        self.assertEqual(job.state, Ingestion_Job.State.PENDING)
+        self.assertEqual(job.category.words.count(), 0)
+        self.assertTrue(default_storage.exists(job.file_name))
+        response = self.client.get(reverse('categories'))
+        self.assertContains(response, reverse('upload_status', args=[job.id]))
+
+        call_command('ingest_worker', '--once', stdout=StringIO(), stderr=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.state, Ingestion_Job.State.DONE)
+        self.assertEqual((job.rows, job.words_added, job.words_linked), (2, 2, 2))
+        self.assertFalse(default_storage.exists(job.file_name))
+
+        data = self.client.get(reverse('upload_status', args=[job.id])).json()
+        self.assertTrue(data['finished'])
+        self.assertEqual(data['state'], 'done')
+        self.assertEqual(data['words_linked'], 2)
+        self.assertNotContains(self.client.get(reverse('categories')), 'upload-status')
+
+    @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
+    def test_failed_upload(self):
+        """Файл в неверной кодировке: задача падает, файл удаляется"""
+        self.client.login(username='testuser', password='123')
+        bad_file = SimpleUploadedFile('bad.txt', b'\xff\xfeapple;\xe0\n')
+        self.client.post(self.url, {'name': 'Broken', 'word_file': bad_file})
+        with self.assertLogs('web.services.ingestion_jobs', level='ERROR'):
+            call_command('ingest_worker', '--once', stdout=StringIO(), stderr=StringIO())
+
+        job = Ingestion_Job.objects.get(user=self.user)
+        self.assertEqual(job.state, Ingestion_Job.State.FAILED)
+        self.assertFalse(default_storage.exists(job.file_name))
+        data = self.client.get(reverse('upload_status', args=[job.id])).json()
+        self.assertEqual(data['state'], 'failed')
+        self.assertNotIn('error', data)
+
+    @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
+    def test_upload_status_of_other_user(self):
+        """Статус чужой загрузки недоступен"""
+        self.client.login(username='testuser', password='123')
+        self.client.post(self.url, {'name': 'Mine', 'word_file': self.valid_file})
+        job = Ingestion_Job.objects.get(user=self.user)
+
+        self.client.login(username='otheruser', password='123')
+        response = self.client.get(reverse('upload_status', args=[job.id]))
+        self.assertEqual(response.status_code, 404)
+
     @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
     def test_duplicate_category_name(self):
         """Дублирование имени категории"""
@@ -2828,6 +2970,18 @@ class RemoveCategoryViewTests(TestCase):
         self.assertFalse(Category.objects.filter(id=self.category.id).exists())
         self.assertFalse(default_storage.exists(self.upload_path))
 
+    @override_settings(MEDIA_ROOT=os.path.join(settings.BASE_DIR, 'web', 'tests', 'test_media'))
+    def test_remove_category_with_pending_upload(self):
+        """Файл ожидающей загрузки удаляется, даже если сохранен под другим именем"""
+        job = enqueue_upload(self.user, self.category, ContentFile('cat;кот;kæt'.encode('utf-8'), name='words.txt'))
+        self.assertNotEqual(job.file_name, self.upload_path)
+        self.assertTrue(default_storage.exists(job.file_name))
+
+        self.client.post(reverse('remove_category', args=[self.category.id]))
+
+        self.assertFalse(Ingestion_Job.objects.exists())
+        self.assertFalse(default_storage.exists(job.file_name))
+
     def test_remove_category_without_file(self):
         """Удаление категории без файла"""
         default_storage.delete(self.upload_path)
@@ -3572,6 +3726,24 @@ class GetNewWordTests(TestCase):
         # Проверяем, что есть хотя бы 2 разных слова
         self.assertGreater(len(set(returned_ids)), 1)
 
+    def test_random_word_in_narrow_id_range(self):
+        """Случайная точка берется из диапазона id кандидатов, а не всей таблицы"""
+        def create_words(prefix, count):
+            return Word.objects.bulk_create([
+                Word(word=f'{prefix}{i}', translation=f'п{i}', transcription=f't{i}') for i in range(count)
+            ])
+
+        create_words('before', 200)
+        narrow = Category.objects.create(name='Narrow', owner=self.user)
+        for word in create_words('narrow', 10):
+            word.category.add(narrow)
+        create_words('after', 200)
+
+        candidates = Word.objects.filter(category=narrow)
+        picked = Counter(pick_random_word(candidates).id for _ in range(200))
+        self.assertEqual(len(picked), 10)
+        self.assertLess(max(picked.values()), 60)
+
     def test_server_error_handling(self):
         """Обработка исключений сервера"""
         original_filter = Word.objects.filter
@@ -3601,6 +3773,36 @@ class GetNewWordTests(TestCase):
             self.assertTrue(data['translation'])
             self.assertTrue(data['transcription'])
 
+    def test_excludes_learned_and_repeating_words(self):
+        """Выученные и изучаемые слова не выдаются, слово из двух категорий выдается"""
+        Learned_Word.objects.create(user=self.user, word=self.user_word)
+        self.common_word.category.add(self.user_category)
+        self.client.login(username='user', password='pass')
+
+        returned_ids = {self.client.get(self.url).json()['id'] for _ in range(10)}
+        self.assertEqual(returned_ids, {self.common_word.id})
+
+        Word_Repetition.objects.create(user=self.user, word=self.common_word)
+        response = self.client.get(self.url)
+        self.assertEqual(response.json()['message'], 'No new words to learn')
+
+    def test_query_count_does_not_grow_with_vocabulary(self):
+        """Количество запросов не зависит от числа слов"""
+        words = Word.objects.bulk_create(
+            Word(word=f'bulk_{i}', translation=f't_{i}', transcription=f'tr_{i}') for i in range(300)
+        )
+        self.user_category.words.add(*words)
+        Learned_Word.objects.bulk_create(Learned_Word(user=self.user, word=word) for word in words[:150])
+        Word_Repetition.objects.bulk_create(Word_Repetition(user=self.user, word=word) for word in words[150:299])
+        self.client.login(username='user', password='pass')
+
+        # Сессия, пользователь, категории и не больше двух запросов на выбор слова
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+
+        self.assertLessEqual(len(queries), 5)
+        self.assertIn(response.json()['id'], [self.user_word.id, self.common_word.id, words[299].id])
+
 
 class GetWordRepeatTests(TestCase):
     def setUp(self):
@@ -3770,6 +3972,113 @@ class GetWordRepeatTests(TestCase):
         Word_Repetition.objects.filter = original_filter
 
 
+class GetDueCountTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('get_due_count')
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.user2 = User.objects.create_user(username='user2', password='pass2')
+        self.words = [
+            Word.objects.create(word=f'word{i}', translation=f'translation{i}', transcription=f'tr{i}')
+            for i in range(4)
+        ]
+
+    def test_due_count(self):
+        """Количество слов к повторению и время ближайшего следующего"""
+        now = timezone.now()
+        Word_Repetition.objects.create(user=self.user, word=self.words[0], next_review=now - timedelta(hours=1))
+        Word_Repetition.objects.create(user=self.user, word=self.words[1], next_review=now - timedelta(minutes=1))
+        Word_Repetition.objects.create(user=self.user, word=self.words[2], next_review=now + timedelta(days=1))
+        soonest = Word_Repetition.objects.create(
+            user=self.user, word=self.words[3], next_review=now + timedelta(hours=2)
+        )
+        Word_Repetition.objects.create(user=self.user2, word=self.words[0], next_review=now - timedelta(days=1))
+        self.client.login(username='user', password='pass')
+
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'status': 'success',
+            'due_count': 2,
+            'next_review': soonest.next_review.isoformat()
+        })
+
+    def test_nothing_scheduled(self):
+        self.client.login(username='user', password='pass')
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.json(), {'status': 'success', 'due_count': 0, 'next_review': None})
+
+    def test_unauthenticated_access(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
+class GetWordsRepeatTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('get_words_repeat')
+
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.user2 = User.objects.create_user(username='user2', password='pass2')
+        self.category = Category.objects.create(name='User Category', owner=self.user)
+
+        now = timezone.now()
+        self.words = []
+        for i in range(5):
+            word = Word.objects.create(word=f'word{i}', translation=f'translation{i}', transcription=f'tr{i}')
+            word.category.add(self.category)
+            self.words.append(word)
+            # word0 просрочено сильнее всех, word4 еще не пора повторять
+            Word_Repetition.objects.create(
+                user=self.user, word=word, next_review=now - timedelta(hours=4 - i) + timedelta(minutes=30)
+            )
+        Word_Repetition.objects.create(user=self.user2, word=self.words[0], next_review=now - timedelta(days=1))
+
+    def test_returns_due_words_by_urgency(self):
+        """Возвращаются только слова пользователя, которые пора повторять, самые просроченные первыми"""
+        self.client.login(username='user', password='pass')
+
+        with self.assertNumQueries(3):
+            response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'success')
+        self.assertEqual([w['id'] for w in data['words']], [w.id for w in self.words[:4]])
+        self.assertEqual(data['words'][0], {
+            'id': self.words[0].id,
+            'word': 'word0',
+            'translation': 'translation0',
+            'transcription': 'tr0',
+        })
+
+    def test_count_and_exclude(self):
+        """Параметры count и exclude"""
+        self.client.login(username='user', password='pass')
+        response = self.client.get(self.url, {'count': 2, 'exclude': f'{self.words[0].id},{self.words[2].id}'})
+
+        self.assertEqual([w['id'] for w in response.json()['words']], [self.words[1].id, self.words[3].id])
+
+    def test_invalid_parameters(self):
+        self.client.login(username='user', password='pass')
+        response = self.client.get(self.url, {'exclude': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_no_words_to_repeat(self):
+        self.client.login(username='user', password='pass')
+        response = self.client.get(self.url, {'exclude': ','.join(str(w.id) for w in self.words)})
+
+        self.assertEqual(response.json(), {'status': 'error', 'message': 'No words to repeat'})
+
+    def test_unauthenticated_access(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 403)
+
+
 class SendRepeatResultTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -3889,6 +4198,29 @@ class SendRepeatResultTests(TestCase):
         self.assertFalse(attempt.is_correct)
         self.mocked_train.assert_called_once()
             
+    def test_word_stats_updated(self):
+        """Ответ обновляет признаки слова"""
+        self.client.login(username='user', password='pass')
+        for is_known in (True, False):
+            Word_Repetition.objects.filter(id=self.user_repetition.id).update(
+                next_review=timezone.now() - timedelta(hours=1)
+            )
+            self.client.post(
+                self.url,
+                data=json.dumps({
+                    'word_id': self.user_word.id,
+                    'is_known': is_known,
+                    'session_id': self.user_session.id
+                }),
+                content_type='application/json'
+            )
+
+        stats = Word_Stats.objects.get(user=self.user, word=self.user_word)
+        self.assertEqual(stats.attempts_total, 2)
+        self.assertEqual(stats.correct_total, 1)
+        self.assertFalse(stats.last_correct)
+        self.assertEqual(stats.last_attempt_at, Answer_Attempt.objects.latest('id').timestamp)
+
     def test_word_learned(self):
         """Слово выучено после 5 правильных повторений"""
         self.user_repetition.repetition_count = 5
@@ -4141,6 +4473,125 @@ class SendRepeatResultTests(TestCase):
         self.assertEqual(response.json()['status'], 'error')
 
 
+@patch('web.services.ml_repetition.RepetitionMLService.train_for_user_async')
+class SendResultsBatchTests(TestCase):
+    def setUp(self):
+        self.client = Client()
+        self.url = reverse('send_results_batch')
+
+        self.user = User.objects.create_user(username='user', password='pass')
+        self.user2 = User.objects.create_user(username='user2', password='pass2')
+        self.user_category = Category.objects.create(name='User Category', owner=self.user)
+        self.user2_category = Category.objects.create(name='User2 Category', owner=self.user2)
+
+        self.words = []
+        for i in range(6):
+            word = Word.objects.create(word=f'word{i}', translation=f'translation{i}', transcription=f'tr{i}')
+            word.category.add(self.user_category)
+            self.words.append(word)
+        self.user2_word = Word.objects.create(word='user2_word', translation='t', transcription='tr')
+        self.user2_word.category.add(self.user2_category)
+
+        self.session = Learning_Session.objects.create(user=self.user, method='repeat')
+        self.user2_session = Learning_Session.objects.create(user=self.user2, method='repeat')
+
+        past = timezone.now() - timedelta(hours=1)
+        self.repetitions = [
+            Word_Repetition.objects.create(user=self.user, word=word, next_review=past, repetition_count=2)
+            for word in self.words
+        ]
+        self.client.login(username='user', password='pass')
+
+    def _send(self, results, session_id=None):
+        return self.client.post(
+            self.url,
+            data=json.dumps({'session_id': session_id or self.session.id, 'results': results}),
+            content_type='application/json'
+        )
+
+    def test_batch_outcomes(self, mock_train):
+        """Результат возвращается для каждого ответа в исходном порядке"""
+        self.repetitions[2].repetition_count = 5
+        self.repetitions[2].save()
+        self.repetitions[3].next_review = timezone.now() + timedelta(hours=1)
+        self.repetitions[3].save()
+        new_word = Word.objects.create(word='new', translation='новое', transcription='njuː')
+        new_word.category.add(self.user_category)
+
+        response = self._send([
+            {'word_id': self.words[0].id, 'is_known': True},
+            {'word_id': self.words[1].id, 'is_known': False},
+            {'word_id': self.words[2].id, 'is_known': True},
+            {'word_id': self.words[3].id, 'is_known': True},
+            {'word_id': self.user2_word.id, 'is_known': True},
+            {'word_id': 999999, 'is_known': True},
+            {'word_id': self.words[0].id, 'is_known': False},
+            {'word_id': self.words[4].id},
+            {'word_id': new_word.id, 'is_known': False, 'type': 'new'},
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual([r['code'] for r in results], [200, 200, 200, 400, 403, 404, 400, 400, 200])
+        self.assertEqual([r['message'] for r in results[:3]], [
+            'Repetition updated', 'Word difficulty increased', 'Word learned!'
+        ])
+        self.assertEqual(results[8]['message'], 'Word to learned added')
+        self.assertEqual(results[4]['word_id'], self.user2_word.id)
+
+        repetitions = {r.word_id: r for r in Word_Repetition.objects.filter(user=self.user)}
+        self.assertEqual(repetitions[self.words[0].id].repetition_count, 3)
+        self.assertGreater(repetitions[self.words[0].id].next_review, timezone.now())
+        self.assertEqual(repetitions[self.words[1].id].repetition_count, 1)
+        self.assertNotIn(self.words[2].id, repetitions)
+        self.assertTrue(Learned_Word.objects.filter(user=self.user, word=self.words[2]).exists())
+        self.assertIn(new_word.id, repetitions)
+
+        self.assertEqual(Answer_Attempt.objects.filter(user=self.user, session=self.session).count(), 3)
+        stats = Word_Stats.objects.get(user=self.user, word=self.words[1])
+        self.assertEqual((stats.attempts_total, stats.correct_total, stats.last_correct), (1, 0, False))
+        mock_train.assert_called_once_with(self.user)
+
+    def test_query_count_does_not_grow_with_batch(self, mock_train):
+        """Количество запросов не зависит от числа ответов"""
+        # Первый ответ за день создает строку активности, дальше она только обновляется
+        Daily_Activity.objects.create(user=self.user, date=timezone.localdate())
+        with CaptureQueriesContext(connection) as small:
+            self._send([{'word_id': word.id, 'is_known': True} for word in self.words[:2]])
+        with CaptureQueriesContext(connection) as large:
+            self._send([{'word_id': word.id, 'is_known': True} for word in self.words[2:]])
+
+        self.assertEqual(Answer_Attempt.objects.count(), 6)
+        self.assertEqual(len(small), len(large))
+
+    def test_session_checked_once(self, mock_train):
+        """Чужая или несуществующая сессия отклоняет весь пакет"""
+        results = [{'word_id': self.words[0].id, 'is_known': True}]
+
+        self.assertEqual(self._send(results, self.user2_session.id).status_code, 403)
+        self.assertEqual(self._send(results, 999999).status_code, 404)
+        self.assertFalse(Answer_Attempt.objects.exists())
+
+    def test_new_words_do_not_need_session(self, mock_train):
+        response = self.client.post(
+            self.url,
+            data=json.dumps({'results': [{'word_id': self.words[0].id, 'is_known': True, 'type': 'new'}]}),
+            content_type='application/json'
+        )
+
+        self.assertEqual(response.json()['results'][0]['message'], 'Known word added')
+        self.assertTrue(Learned_Word.objects.filter(user=self.user, word=self.words[0]).exists())
+        mock_train.assert_not_called()
+
+    def test_invalid_payload(self, mock_train):
+        self.assertEqual(self._send('not-a-list').status_code, 400)
+        self.assertEqual(self._send([{'word_id': 1, 'is_known': True}] * 201).status_code, 400)
+
+    def test_unauthenticated_access(self, mock_train):
+        self.client.logout()
+        self.assertEqual(self._send([]).status_code, 403)
+
+
 class GetTestQuestionsTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -4302,6 +4753,35 @@ class GetTestQuestionsTests(TestCase):
         self.assertEqual(response.status_code, 403)
 
 
+class CatalogVersionTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='owner', password='123')
+
+    def test_public_row_independent_of_owner_rows(self):
+        """Строка пользователя, созданная первой, не становится общим каталогом"""
+        Catalog_Version.bump(self.user.id)
+        Catalog_Version.bump()
+        Catalog_Version.bump(self.user.id)
+        other = User.objects.create_user(username='other', password='123')
+        Catalog_Version.bump(other.id)
+
+        self.assertEqual(Catalog_Version.current(), 1)
+        self.assertEqual(Catalog_Version.current(self.user.id), 2)
+        self.assertEqual(Catalog_Version.current(other.id), 1)
+
+    def test_user_delete_keeps_public_row(self):
+        """Удаление пользователя с личными категориями не трогает общий каталог"""
+        Catalog_Version.bump(self.user.id)
+        Catalog_Version.bump()
+        category = Category.objects.create(name='Mine', owner=self.user)
+        Word.objects.create(word='cat', translation='кот', transcription='kæt').category.add(category)
+
+        self.user.delete()
+
+        self.assertFalse(Catalog_Version.objects.filter(owner__isnull=False).exists())
+        self.assertEqual(Catalog_Version.current(), 1)
+
+
 class SearchWordsTests(TestCase):
     def setUp(self):
         self.client = Client()
@@ -4386,6 +4866,159 @@ class SearchWordsTests(TestCase):
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json()['count'], 0)
 
+    @override_settings(SEARCH_INDEX_ENABLED=False)
+    def test_single_query(self):
+        """Слова, категории и владельцы читаются одним запросом независимо от числа результатов"""
+        words = Word.objects.bulk_create(
+            Word(word=f'apple_{i}', translation=f't_{i}', transcription=f'tr_{i}') for i in range(30)
+        )
+        self.public_cat.words.add(*words)
+        self.private_cat.words.add(*words[:10])
+
+        # Версия каталога для ETag + поиск
+        with self.assertNumQueries(2):
+            response = self.client.get(self.url, {'q': 'apple', 'limit': 100})
+        self.assertEqual(response.json()['count'], 32)
+
+        self.client.login(username='user', password='pass')
+        # Сессия и пользователь + версии общего и личного каталога + поиск
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'q': 'apple'})
+        self.assertEqual(response.json()['count'], 42)
+
+    def test_pagination(self):
+        """Параметры limit и page"""
+        words = Word.objects.bulk_create(
+            Word(word=f'apple_{i}', translation=f't_{i}', transcription=f'tr_{i}') for i in range(5)
+        )
+        self.public_cat.words.add(*words)
+
+        first = self.client.get(self.url, {'q': 'apple', 'limit': 4}).json()
+        second = self.client.get(self.url, {'q': 'apple', 'limit': 4, 'page': 2}).json()
+        beyond = self.client.get(self.url, {'q': 'apple', 'limit': 4, 'page': 5}).json()
+
+        self.assertEqual((first['count'], first['has_more'], len(first['results'])), (7, True, 4))
+        self.assertEqual(first['results'][0]['word'], 'apple')
+        self.assertEqual((second['has_more'], len(second['results'])), (False, 3))
+        self.assertEqual(
+            [r['word'] for r in first['results'] + second['results']][1:],
+            [f'apple_{i}' for i in range(5)] + ['pineapple']
+        )
+        self.assertEqual((beyond['count'], beyond['results']), (7, []))
+        self.assertEqual(self.client.get(self.url, {'q': 'apple', 'page': 'x'}).status_code, 400)
+
+    def test_ranking(self):
+        """Точное совпадение, затем префикс, затем подстрока"""
+        for text in ['snapple', 'apples']:
+            Word.objects.create(word=text, translation='t', transcription='tr').category.add(self.public_cat)
+
+        response = self.client.get(self.url, {'q': 'apple'})
+
+        self.assertEqual([r['word'] for r in response.json()['results']], ['apple', 'apples', 'snapple', 'pineapple'])
+
+    def test_same_rank_order(self):
+        """Слова одного ранга идут от коротких к длинным на всех путях поиска, а не по id"""
+        for text in ['tomcat', 'kitty', 'cat']:
+            Word.objects.create(word=text, translation='кот', transcription='tr').category.add(self.public_cat)
+
+        expected = ['cat', 'kitty', 'tomcat']
+        with override_settings(SEARCH_INDEX_ENABLED=True):
+            index = self.client.get(self.url, {'q': 'кот'}).json()['results']
+        with override_settings(SEARCH_INDEX_ENABLED=False):
+            fallback = self.client.get(self.url, {'q': 'кот'}).json()['results']
+            pages = [self.client.get(self.url, {'q': 'кот', 'limit': 1, 'page': page}).json()['results'][0]
+                     for page in (1, 2, 3)]
+        fuzzy = self.client.get(self.url, {'q': 'кот', 'fuzzy': '1'}).json()['results']
+
+        for results in (index, fallback, pages, fuzzy):
+            self.assertEqual([r['word'] for r in results], expected)
+
+    def test_fuzzy_search(self):
+        """Режим fuzzy находит слова с опечатками"""
+        self.assertEqual(self.client.get(self.url, {'q': 'aple'}).json()['count'], 0)
+
+        response = self.client.get(self.url, {'q': 'aple', 'fuzzy': '1'})
+
+        self.assertEqual(response.json()['results'][0]['word'], 'apple')
+        self.assertNotIn('banana', [r['word'] for r in response.json()['results']])
+
+    def test_public_index_without_queries(self):
+        """Публичные слова ищутся по индексу в памяти: запрос только за версией каталога для ETag"""
+        self.client.get(self.url, {'q': 'apple'})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'q': 'APP'})
+        self.assertEqual([r['word'] for r in response.json()['results']], ['apple', 'pineapple'])
+
+        # Личные категории: версия для ETag и слова
+        self.client.login(username='user', password='pass')
+        with self.assertNumQueries(4):
+            response = self.client.get(self.url, {'q': 'ан'})
+        self.assertEqual([r['word'] for r in response.json()['results']], ['pineapple', 'banana'])
+
+    def test_public_index_invalidation(self):
+        """Изменения публичного каталога сразу видны в поиске"""
+        self.client.get(self.url, {'q': 'apple'})
+
+        word = Word.objects.create(word='grape', translation='виноград', transcription='tr')
+        self.assertEqual(self.client.get(self.url, {'q': 'виног'}).json()['count'], 0)
+        word.category.add(self.public_cat)
+        self.assertEqual(self.client.get(self.url, {'q': 'виног'}).json()['count'], 1)
+
+        word.translation = 'виноградина'
+        word.save()
+        self.assertEqual(self.client.get(self.url, {'q': 'градина'}).json()['count'], 1)
+
+        self.public_cat.delete()
+        self.assertEqual(self.client.get(self.url, {'q': 'виног'}).json()['count'], 0)
+
+    def test_etag(self):
+        """Повторный запрос с тем же ETag получает 304, пока каталог не изменился"""
+        response = self.client.get(self.url, {'q': 'apple'})
+        etag = response['ETag']
+        self.assertIn('no-cache', response['Cache-Control'])
+        self.assertIn('public', response['Cache-Control'])
+
+        response = self.client.get(self.url, {'q': 'apple'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.public_cat.words.add(Word.objects.create(word='apple pie', translation='пирог', transcription='tr'))
+        response = self.client.get(self.url, {'q': 'apple'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_etag_does_not_build_index(self):
+        """Ответ 304 считается по Catalog_Version без построения индекса в памяти"""
+        etag = self.client.get(self.url, {'q': 'apple'})['ETag']
+        public_index.invalidate()
+
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'q': 'apple'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertIsNone(public_index._data)
+
+    def test_etag_private_categories(self):
+        """ETag вошедшего пользователя меняется вместе с его личными категориями"""
+        self.client.login(username='user', password='pass')
+        response = self.client.get(self.url, {'q': 'apple'})
+        etag = response['ETag']
+        self.assertIn('private', response['Cache-Control'])
+
+        self.private_cat2.words.add(Word.objects.create(word='apple tree', translation='яблоня', transcription='tr'))
+        response = self.client.get(self.url, {'q': 'apple'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.private_cat.words.add(Word.objects.create(word='apple juice', translation='сок', transcription='tr'))
+        response = self.client.get(self.url, {'q': 'apple'}, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_word_without_categories(self):
+        """Слово без категорий не попадает в выдачу"""
+        Word.objects.create(word='orphan apple', translation='сирота', transcription='tr')
+        response = self.client.get(self.url, {'q': 'orphan'})
+
+        self.assertEqual(response.json()['count'], 0)
+
     def test_error_handling(self):
         """Обработка ошибок"""
         with patch('web.views.Word.objects.filter') as mock_filter:
@@ -21,6 +21,7 @@ urlpatterns = [
     path('categories', categories_view, name='categories'),
     path('categories/<int:category_id>', categories_wordlist_view, name='categories_wordlist'),
     path('category/add/', add_category_view, name='add_category'),
+    path('category/upload_status/<int:job_id>/', upload_status_view, name='upload_status'),
     path('category/remove/<int:category_id>/', remove_category_view, name='remove_category'),
     path('category/edit/<int:category_id>/', edit_category_view, name='edit_category'),
     path('feedback/', feedback_view, name='feedback'),
@@ -38,7 +39,10 @@ urlpatterns = [
     path('learning/new_word_send_result/', new_word_send_result, name = 'new_word_send_result'),
     path('learning/get_new_word/', get_new_word, name = 'get_new_word'),
     path('learning/get_word_repeat/', get_word_repeat, name = 'get_word_repeat'),
+    path('learning/get_words_repeat/', get_words_repeat, name = 'get_words_repeat'),
+    path('learning/due_count/', get_due_count, name = 'get_due_count'),
     path('learning/send_repeat_result/', send_repeat_result, name = 'send_repeat_result'),
+    path('learning/results/batch', send_results_batch, name = 'send_results_batch'),
     path('learning/get_test_questions/', get_test_questions, name = 'get_test_questions'),
     path('search_words/', search_words, name='search_words'),
     path('track_session/', track_session, name='track_session')
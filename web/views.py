@@ -9,16 +9,16 @@ from django.contrib import messages
 from django.contrib.auth import authenticate, login, logout, update_session_auth_hash
 from django.core.exceptions import PermissionDenied
 from django.core.files.storage import default_storage
-from django.core.management import call_command
 from django.db import transaction
 from django.db.models import (
-    Avg, Case, CharField, Count, Exists, OuterRef,
-    Q, Subquery, Value, When
+    Exists, Max, Min, OuterRef,
+    Q, Subquery, Value
 )
-from django.db.models.functions import Coalesce, ExtractHour, TruncDate
+from django.db.models.functions import Random
 from django.http import Http404, JsonResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404, redirect, render
 from django.utils import timezone
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.views.decorators.http import require_http_methods
 
 from psycopg2 import IntegrityError
@@ -29,9 +29,14 @@ from web.forms import (
 )
 from web.models import (
     Answer_Attempt, Category, Learned_Word, Learning_Category,
-    Learning_Session, User, Word, Word_Repetition, Feedback,
+    Learning_Session, Session_Hour_Stats, User, Word, Word_Repetition, Feedback, Ingestion_Job,
 )
-from web.services.ml_repetition import ml_service
+from web.services.feature_store import rebuild_word_stats, record_attempt, record_attempts
+from web.services import search as search_service
+from web.services.schedulers import get_scheduler
+from web.services import user_stats
+from web.services import wordlists
+from web.services.ingestion_jobs import discard_uploads, enqueue_upload, job_status
 
 
 LEARNING_METHODS = {
@@ -40,6 +45,21 @@ LEARNING_METHODS = {
     'test': 'test'
 }
 
+# Результатов поиска на странице (search_words)
+SEARCH_RESULTS_LIMIT = 20
+SEARCH_RESULTS_MAX_LIMIT = 100
+# Из скольких самых просроченных слов get_word_repeat выбирает случайное
+REPEAT_RANDOM_POOL_SIZE = 100
+# Размер пачки слов для повторения (get_words_repeat)
+REPEAT_BATCH_SIZE = 10
+REPEAT_BATCH_MAX_SIZE = 50
+# Максимум ответов в одном запросе send_results_batch
+RESULTS_BATCH_MAX_SIZE = 200
+# Через сколько секунд показать на повторение новое невыученное слово
+NEW_WORD_FIRST_REVIEW = 30
+# Сколько последних дней показывать в таблице прогресса на странице статистики
+STATS_PROGRESS_DAYS = 7
+
 ###################### Helpers ######################
 def auth_required(view_func=None, redirect_to_login=True):
     """Декоратор для проверки аутентификации пользователя."""
@@ -78,52 +98,23 @@ def check_word_permission(word, user):
     return word.category.filter(Q(owner__isnull=True) | Q(owner=user)).exists()
 
 
-def get_word_status_annotations(user):
-    """Возвращает аннотации для статуса слова."""
-    return {
-        'status': Case(
-            When(
-                Exists(Learned_Word.objects.filter(word=OuterRef('pk'), user=user)),
-                then=Value('learned')
-            ),
-            When(
-                Exists(Word_Repetition.objects.filter(word=OuterRef('pk'), user=user)),
-                then=Value('in_progress')
-            ),
-            default=Value('new'),
-            output_field=CharField()
-        ),
-        'repetition_count': Coalesce(
-            Subquery(
-                Word_Repetition.objects.filter(
-                    word=OuterRef('pk'),
-                    user=user
-                ).values('repetition_count')[:1]
-            ),
-            Value(0)
-        )
-    }
-
-
-def handle_word_file_upload(user, category, word_file):
-    """Обрабатывает загрузку файла со словами."""
-    upload_path = os.path.join('tmp', str(user.id), f'{category.name}.txt')
-    file_path = default_storage.save(upload_path, word_file)
-    absolute_file_path = default_storage.path(file_path)
-    
-    with default_storage.open(file_path, 'wb+') as destination:
-        for chunk in word_file.chunks():
-            destination.write(chunk)
-    
-    return absolute_file_path
-
+def pick_random_word(words):
+    """
+    Случайное слово из queryset одним запросом без COUNT и OFFSET.
 
-def get_word_progress_data(words, user):
-    """Добавляет данные о прогрессе изучения слов."""
-    wordlist = list(words)
-    for word in wordlist:
-        word.repetition_progress = min(100, word.repetition_count * 20)
-    return wordlist
+    Берет первое слово с id больше случайной точки из [min - 1, max) по id
+    самих кандидатов (точка считается в подзапросе один раз), если таких
+    нет - первое по id. Слова после больших пропусков в id выпадают чаще.
+    """
+    # Группировка по константе дает один агрегат по кандидатам без GROUP BY
+    pivot = (words.order_by()
+             .annotate(one=Value(1)).values('one')
+             .annotate(pivot=Min('id') - 1 + (Max('id') - Min('id') + 1) * Random())
+             .values('pivot'))
+    word = words.filter(id__gt=Subquery(pivot)).order_by('id').first()
+    if word is None:
+        word = words.order_by('id').first()
+    return word
 
 
 def generate_test_questions(words):
@@ -149,6 +140,37 @@ def generate_test_questions(words):
     return questions
 
 
+def search_cache_headers(response, user):
+    """Ответ поиска можно хранить, но перед использованием нужно сверить ETag."""
+    patch_cache_control(response, no_cache=True, **({'private': True} if user.is_authenticated else {'public': True}))
+    patch_vary_headers(response, ('Cookie',))
+    return response
+
+
+def apply_repeat_result(scheduler, user, word, repetition, is_known, now, stats=None):
+    """
+    Применяет ответ к повторению слова без сохранения.
+
+    Возвращает (сообщение, выучено ли слово). Выученное слово нужно перенести
+    из Word_Repetition в Learned_Word, иначе сохранить repetition.
+    """
+    if is_known and scheduler.is_graduated(repetition):
+        return 'Word learned!', True
+
+    if is_known:
+        repetition.repetition_count += 1
+        message = 'Repetition updated'
+    else:
+        repetition.repetition_count = max(0, repetition.repetition_count - 1)
+        message = 'Word difficulty increased'
+
+    interval = scheduler.next_interval(user, word, repetition, is_known, now, stats=stats)
+    repetition.interval = interval
+    repetition.last_review = now
+    repetition.next_review = now + timedelta(minutes=interval)
+    return message, False
+
+
 def handle_session_start(user, data):
     """Обрабатывает запрос на начало сессии обучения."""
     if 'page_url' not in data or 'session_start' not in data:
@@ -184,12 +206,14 @@ def handle_session_start(user, data):
                     'message': 'Category not found'
                 }, status=404)
     
-        session = Learning_Session.objects.create(
-            user=user,
-            start_time=data['session_start'],
-            method=method,
-            category_id=category_id
-        )
+        with transaction.atomic():
+            session = Learning_Session.objects.create(
+                user=user,
+                start_time=data['session_start'],
+                method=method,
+                category_id=category_id
+            )
+            user_stats.record_session_start(session)
         
         return JsonResponse({
             'status': 'success', 
@@ -221,9 +245,12 @@ def handle_session_end(user, data):
                 'message': 'This session does not belong to you'
             }, status=403)
 
+        previous_duration = session.duration
         session.end_time = data['session_end']
         session.duration = data['duration']
-        session.save()
+        with transaction.atomic():
+            session.save()
+            user_stats.record_session_end(session, previous_duration)
         
         return JsonResponse({
             'status': 'success', 
@@ -316,10 +343,17 @@ def learning_tests_view(request):
 def categories_view(request):
     categories = get_user_categories(request.user)
     user_selected_categories = get_user_selected_categories(request.user)
+    uploads = []
+    if request.user.is_authenticated:
+        uploads = (Ingestion_Job.objects
+                   .filter(user=request.user, state__in=[Ingestion_Job.State.PENDING, Ingestion_Job.State.RUNNING])
+                   .select_related('category')
+                   .order_by('created_at'))
 
     return render(request, "web/categories.html", {
         "categories": categories,
-        "user_selected_categories": user_selected_categories
+        "user_selected_categories": user_selected_categories,
+        "uploads": uploads
     })
 
 
@@ -347,22 +381,19 @@ def categories_wordlist_view(request, category_id):
     if category.owner not in [None, user]:
         raise PermissionDenied("Нет доступа к этой категории")
 
-    words = Word.objects.filter(category=category)
-
-    if user:
-        wordlist = words.annotate(**get_word_status_annotations(user)).distinct()
-        wordlist = get_word_progress_data(wordlist, user)
-    else:
-        wordlist = words.annotate(
-            status=Value('new', output_field=CharField()),
-            repetition_count=Value(0),
-            repetition_progress=Value(0)
-        ).distinct()
+    status = request.GET.get('status')
+    if status not in wordlists.STATUSES:
+        status = None
+    page, wordlist = wordlists.category_wordlist(
+        category, user, request.GET.get('page'), request.GET.get('highlight', ''), status
+    )
 
     return render(request, "web/category_contains.html", {
         "wordlist": wordlist,
+        "page_obj": page,
         "category": category,
         "highlight_word": request.GET.get('highlight', ''),
+        "status_filter": status,
     })
 
 
@@ -373,6 +404,7 @@ def remove_category_view(request, category_id):
     try:
         if default_storage.exists(upload_path):
             default_storage.delete(upload_path)
+        discard_uploads(category)
     except Exception:
         pass
 
@@ -451,29 +483,24 @@ def add_category_view(request):
                 'error': 'Файл со словами обязателен'
             }, status=400)
 
-        try:
-            absolute_file_path = handle_word_file_upload(request.user, category, word_file)
-            call_command(
-                'load_words',
-                dir_path=os.path.dirname(absolute_file_path),
-                user_name=request.user.username,
-                verbosity=0
-            )
-        except Exception:
-            upload_path = os.path.join('tmp', str(request.user.id), f'{category.name}.txt')
-            if default_storage.exists(upload_path):
-                default_storage.delete(upload_path)
-            return render(request, 'web/add_category.html', {
-                'form': form,
-                'error': 'Ошибка при загрузке слов. Проверьте формат файла.'
-            }, status=400)
-
+        # Слова загружает ingest_worker, страница категорий опрашивает статус задачи
+        enqueue_upload(request.user, category, word_file)
         return redirect('categories')
     
     form = AddCategoryForm()
     return render(request, 'web/add_category.html', {'form': form})
 
 
+@require_http_methods(["GET"])
+@auth_required(redirect_to_login=False)
+def upload_status_view(request, job_id):
+    """Состояние загрузки слов в категорию, страница категорий опрашивает его до завершения."""
+    job = get_object_or_404(Ingestion_Job.objects.select_related('category'), id=job_id, user=request.user)
+    response = JsonResponse({'status': 'success', **job_status(job)})
+    patch_cache_control(response, no_store=True)
+    return response
+
+
 @auth_required
 def edit_category_view(request, category_id):
     category = get_object_or_404(Category, id=category_id, owner=request.user)
@@ -496,26 +523,27 @@ def edit_category_view(request, category_id):
     })
 
 
+@auth_required
 def stats_view(request):
     user = request.user
 
-    total_learned_words = len(Learned_Word.objects.filter(user=user))
-    total_repetitions = len(Answer_Attempt.objects.filter(user=user))
-    avg_time_of_tests = Learning_Session.objects.filter(user_id=user, method='test').aggregate(Avg('duration'))
+    user_stats_row = user_stats.get_user_stats(user.id)
+    avg_testing = (user_stats_row.test_seconds / user_stats_row.test_sessions
+                   if user_stats_row.test_sessions else None)
 
     stats = {
-        'total_words': total_learned_words,
-        'total_quizzes': total_repetitions,
-        'avg_testing': 0  if avg_time_of_tests['duration__avg'] is None else str(round(avg_time_of_tests['duration__avg'], 2)),
+        'total_words': user_stats_row.learned_words,
+        'total_quizzes': user_stats_row.answers_total,
+        'avg_testing': 0 if avg_testing is None else str(round(avg_testing, 2)),
     }
 
     ### Список изучаемых категорий
-    categories = [l_cat.category for l_cat in Learning_Category.objects.filter(user=user)]
+    categories = [l_cat.category for l_cat in Learning_Category.objects.filter(user=user).select_related('category')]
 
     ### Данные для piePlot
-    learned = len(Learned_Word.objects.filter(user=user))
-    in_progress = len(Word_Repetition.objects.filter(user=user))
-    new_words = len(Word.objects.filter(category__in=categories)) - learned - in_progress
+    learned = user_stats_row.learned_words
+    in_progress = user_stats_row.in_progress_words
+    new_words = user_stats.catalog_word_count(user_stats_row, categories) - learned - in_progress
     set_data = [
         learned,
         in_progress,
@@ -529,18 +557,15 @@ def stats_view(request):
     }]
 
     ### Данные для heat plot
-    # По оси x дата, по оси у время, пересечение count(session_id)
-    session_new_words = (Learning_Session.objects
-                         .filter(user_id=user, method='new_words')
-                         .annotate(date=TruncDate('start_time'), time=ExtractHour('start_time'))
-                         .values('date', 'time')
-                         .annotate(count=Count('id'))
-                         .order_by('date')
-                         )
+    # По оси x дата, по оси у время, пересечение количество сессий
+    session_new_words = (Session_Hour_Stats.objects
+                         .filter(user=user, method=Learning_Session.Method.NEW_WORDS)
+                         .order_by('date', 'hour')
+                         .values('date', 'hour', 'sessions'))
 
     date_data = [str(dt['date']) for dt in session_new_words]
-    time_data = [dt['time'] for dt in session_new_words]
-    count_data = [dt['count'] for dt in session_new_words]
+    time_data = [dt['hour'] for dt in session_new_words]
+    count_data = [dt['sessions'] for dt in session_new_words]
     heat_data = [{
         'x': date_data,
         'y': time_data,
@@ -548,11 +573,9 @@ def stats_view(request):
         'type': 'heatmap',
     }]
 
-    # илюзорная статистика
-    week_dates = [(timezone.now() - timedelta(days=i)).strftime('%d.%m') for i in range(7)]
     week_progress = [
-        {'date': date, 'words': random.randint(1, 10), 'quizzes': random.randint(0, 3)}
-        for date in week_dates
+        {'date': day.date.strftime('%d.%m'), 'words': day.words_learned, 'quizzes': day.answers}
+        for day in user_stats.recent_activity(user.id, STATS_PROGRESS_DAYS)
     ]
 
     context = {
@@ -575,15 +598,22 @@ def reset_category_progress_view(request, category_id):
 
     words_in_category = Word.objects.filter(category=category)
 
-    Learned_Word.objects.filter(
-        user=request.user,
-        word__in=words_in_category
-    ).delete()
+    with transaction.atomic():
+        removed_learned, _ = Learned_Word.objects.filter(
+            user=request.user,
+            word__in=words_in_category
+        ).delete()
 
-    Word_Repetition.objects.filter(
-        user=request.user,
-        word__in=words_in_category
-    ).delete()
+        removed_repetitions, _ = Word_Repetition.objects.filter(
+            user=request.user,
+            word__in=words_in_category
+        ).delete()
+
+        user_stats.apply_delta(
+            request.user.id,
+            learned_words=-removed_learned,
+            in_progress_words=-removed_repetitions
+        )
 
     messages.success(request, f'Прогресс по категории "{category.name}" сброшен')
     return redirect('categories_wordlist', category_id=category.id)
@@ -656,10 +686,11 @@ def word_start_learning(request, word_id):
                 'message': 'Нет доступа к этому слову'
             }, status=403)
         
-        Word_Repetition.objects.get_or_create(
+        _, created = Word_Repetition.objects.get_or_create(
             user=request.user,
             word=word
         )
+        user_stats.apply_delta(request.user.id, in_progress_words=int(created))
         return JsonResponse({'status': 'success', 'message': 'Слово добавлено в изучаемые'}, status=200)
     except Word.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Слово не найдено'}, status=404)
@@ -678,8 +709,11 @@ def word_mark_known(request, word_id):
                 'message': 'Нет доступа к этому слову'
             }, status=403)
         
-        Word_Repetition.objects.filter(user=request.user, word=word).delete()
-        Learned_Word.objects.get_or_create(user=request.user, word=word)
+        with transaction.atomic():
+            removed, _ = Word_Repetition.objects.filter(user=request.user, word=word).delete()
+            _, created = Learned_Word.objects.get_or_create(user=request.user, word=word)
+            user_stats.apply_delta(request.user.id, in_progress_words=-removed, learned_words=int(created))
+            user_stats.record_activity(request.user.id, words_learned=int(created))
         return JsonResponse({'status': 'success', 'message': 'Слово помечено как известное'}, status=200)
     except Word.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Слово не найдено'}, status=404)
@@ -698,8 +732,14 @@ def word_reset_progress(request, word_id):
                 'message': 'Нет доступа к этому слову'
             }, status=403)
         
-        Word_Repetition.objects.filter(user=request.user, word=word).delete()
-        Learned_Word.objects.filter(user=request.user, word=word).delete()
+        with transaction.atomic():
+            removed_repetitions, _ = Word_Repetition.objects.filter(user=request.user, word=word).delete()
+            removed_learned, _ = Learned_Word.objects.filter(user=request.user, word=word).delete()
+            user_stats.apply_delta(
+                request.user.id,
+                in_progress_words=-removed_repetitions,
+                learned_words=-removed_learned
+            )
         return JsonResponse({'status': 'success', 'message': 'Прогресс по слову сброшен'})
     except Word.DoesNotExist:
         return JsonResponse({'status': 'error', 'message': 'Слово не найдено'}, status=404)
@@ -746,6 +786,7 @@ def word_edit(request, category_id, word_id):
                         Word_Repetition.objects.filter(user=user, word=word).update(word=exact_duplicate)
                         Learned_Word.objects.filter(user=user, word=word).update(word=exact_duplicate)
                         Answer_Attempt.objects.filter(user=user, word=word).update(word=exact_duplicate)
+                        rebuild_word_stats(user, word_ids=[word.id, exact_duplicate.id])
                         
                         word.category.remove(category)
                         
@@ -881,17 +922,20 @@ def new_word_send_result(request):
             }, status=403)
 
         if is_known:
-            Learned_Word.objects.get_or_create(user=user, word_id=word_id)
+            _, created = Learned_Word.objects.get_or_create(user=user, word_id=word_id)
+            user_stats.apply_delta(user.id, learned_words=int(created))
+            user_stats.record_activity(user.id, words_learned=int(created))
             return JsonResponse({
                 'status': 'success', 
                 'message': 'Known word added'
             }, status=200)
     
-        Word_Repetition.objects.update_or_create(
+        _, created = Word_Repetition.objects.update_or_create(
             user=user,
             word_id=word_id,
-            defaults={'next_review': timezone.now() + timedelta(seconds=30)}
+            defaults={'next_review': timezone.now() + timedelta(seconds=NEW_WORD_FIRST_REVIEW)}
         )
+        user_stats.apply_delta(user.id, in_progress_words=int(created))
         return JsonResponse({'status': 'success', 'message': 'Word to learned added'}, status=200)
 
     except Exception as e:
@@ -908,18 +952,17 @@ def get_new_word(request):
         if not user_categories:
             return JsonResponse({'status': 'error', 'message': 'No categories that user learns'}, status=200)
 
-        excluded_words = set(
-            Learned_Word.objects.filter(user=user).values_list('word_id', flat=True)
-        ).union(
-            Word_Repetition.objects.filter(user=user).values_list('word_id', flat=True)
+        # Анти-join вместо списков id выученных и изучаемых слов в памяти
+        new_words = Word.objects.filter(
+            Exists(Word.category.through.objects.filter(word_id=OuterRef('pk'), category_id__in=user_categories)),
+            ~Exists(Learned_Word.objects.filter(user=user, word_id=OuterRef('pk'))),
+            ~Exists(Word_Repetition.objects.filter(user=user, word_id=OuterRef('pk'))),
         )
 
-        new_words = Word.objects.filter(category__in=user_categories).exclude(id__in=excluded_words)
-
-        if not new_words.exists():
+        word_obj = pick_random_word(new_words)
+        if word_obj is None:
             return JsonResponse({'status': 'error', 'message': 'No new words to learn'}, status=200)
 
-        word_obj = random.choice(new_words)
         return JsonResponse({
             'status': 'success',
             'id': word_obj.id,
@@ -939,20 +982,19 @@ def get_word_repeat(request):
         user = request.user
         now = timezone.now()
 
-        words_to_repeat = Word_Repetition.objects.filter(
+        # Случайное слово из самых просроченных, id читаются из word_repetition_due_idx
+        words_ids = list(Word_Repetition.objects.filter(
             user=user,
             next_review__lte=now
-        )
+        ).order_by('next_review').values_list('word_id', flat=True)[:REPEAT_RANDOM_POOL_SIZE])
 
-        if not words_to_repeat.exists():
+        if not words_ids:
             return JsonResponse({
                 'status': 'error', 
                 'message': 'No words to repeat'}
                 , status=200)
-        
-        words_ids = words_to_repeat.values_list('word_id', flat=True)
-        words_to_repeat = Word.objects.filter(id__in=words_ids)
-        word_to_repeat = random.choice(words_to_repeat)
+
+        word_to_repeat = Word.objects.get(id=random.choice(words_ids))
 
         return JsonResponse({
             'status': 'success',
@@ -966,6 +1008,66 @@ def get_word_repeat(request):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
 
 
+@require_http_methods(["GET"])
+@auth_required(redirect_to_login=False)
+def get_words_repeat(request):
+    """Пачка слов для повторения: самые просроченные первыми, одним запросом."""
+    try:
+        user = request.user
+        try:
+            count = min(int(request.GET.get('count', REPEAT_BATCH_SIZE)), REPEAT_BATCH_MAX_SIZE)
+            # Слова, которые уже в очереди у клиента или ждут отправки ответа
+            exclude = [int(word_id) for word_id in request.GET.get('exclude', '').split(',') if word_id]
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid parameters'}, status=400)
+
+        repetitions = (Word_Repetition.objects
+                       .filter(user=user, next_review__lte=timezone.now())
+                       .exclude(word_id__in=exclude)
+                       .select_related('word')
+                       .order_by('next_review')[:max(count, 1)])
+
+        words = [{
+            'id': repetition.word.id,
+            'word': repetition.word.word,
+            'translation': repetition.word.translation,
+            'transcription': repetition.word.transcription,
+        } for repetition in repetitions]
+
+        if not words:
+            return JsonResponse({'status': 'error', 'message': 'No words to repeat'}, status=200)
+
+        return JsonResponse({'status': 'success', 'words': words})
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
+@require_http_methods(["GET"])
+@auth_required(redirect_to_login=False)
+def get_due_count(request):
+    """Сколько слов пора повторять и когда подойдет следующее, только по индексу."""
+    try:
+        user = request.user
+        now = timezone.now()
+        repetitions = Word_Repetition.objects.filter(user=user)
+
+        due_count = repetitions.filter(next_review__lte=now).count()
+        next_review = (repetitions.filter(next_review__gt=now)
+                       .order_by('next_review')
+                       .values_list('next_review', flat=True)
+                       .first())
+
+        return JsonResponse({
+            'status': 'success',
+            'due_count': due_count,
+            'next_review': next_review.isoformat() if next_review else None
+        })
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=500)
+
+
 @require_http_methods(["POST"])
 @auth_required(redirect_to_login=False)
 def send_repeat_result(request):
@@ -1009,6 +1111,9 @@ def send_repeat_result(request):
                 'message': 'Word not found'
             }, status=404)
 
+        scheduler = get_scheduler()
+        created = False
+
         try:
             repetition = Word_Repetition.objects.get(user=user, word_id=word_id)
             if repetition.next_review > now:
@@ -1020,35 +1125,35 @@ def send_repeat_result(request):
             repetition = Word_Repetition.objects.create(
                 user=user,
                 word_id=word_id,
-                next_review=now + timedelta(minutes=ml_service.get_initial_interval())
+                next_review=now + timedelta(minutes=scheduler.initial_interval())
             )
+            created = True
 
-        Answer_Attempt.objects.create(
-            user=user,
-            word_id=word_id,
-            session_id=session_id,
-            is_correct=is_known
-        )
+        with transaction.atomic():
+            attempt = Answer_Attempt.objects.create(
+                user=user,
+                word_id=word_id,
+                session_id=session_id,
+                is_correct=is_known
+            )
+            stats = record_attempt(attempt)
 
-        if is_known:
-            if repetition.repetition_count == 5:
+            message, learned = apply_repeat_result(scheduler, user, word, repetition, is_known, now, stats)
+            if learned:
                 repetition.delete()
                 Learned_Word.objects.create(user=user, word_id=word_id)
-                message = 'Word learned!'
             else:
-                repetition.repetition_count += 1
-                interval = ml_service.predict_next_interval(user, word, repetition.repetition_count)
-                repetition.next_review = now + timedelta(minutes=interval)
                 repetition.save()
-                message = 'Repetition updated'
-        else:
-            repetition.repetition_count = max(0, repetition.repetition_count - 1)
-            interval = ml_service.predict_next_interval(user, word, repetition.repetition_count)
-            repetition.next_review = now + timedelta(minutes=interval)
-            repetition.save()
-            message = 'Word difficulty increased'
 
-        ml_service.train_for_user_async(user)        
+            user_stats.record_answers(
+                user.id,
+                answers=1,
+                correct=int(bool(is_known)),
+                learned_words=int(learned),
+                in_progress_words=int(created) - int(learned)
+            )
+
+        scheduler.after_answer(user)
         
         return JsonResponse({'status': 'success', 'message': message}, status=200)
 
@@ -1056,6 +1161,176 @@ def send_repeat_result(request):
         return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
 
 
+def batch_result(item, message, status=200):
+    """Результат обработки одного ответа в send_results_batch."""
+    return {
+        'word_id': item.get('word_id') if isinstance(item, dict) else None,
+        'status': 'success' if status == 200 else 'error',
+        'message': message,
+        'code': status,
+    }
+
+
+@require_http_methods(["POST"])
+@auth_required(redirect_to_login=False)
+def send_results_batch(request):
+    """
+    Пакетная отправка ответов: повторение ('repeat') и новые слова ('new').
+
+    Принимает {"session_id": ..., "results": [{"word_id", "is_known", "type"}]}.
+    Сессия и права на слова проверяются один раз, попытки, повторения и
+    признаки пишутся пакетно, количество запросов не зависит от числа ответов.
+    Возвращает результат для каждого ответа в том же порядке.
+    """
+    try:
+        data = json.loads(request.body.decode('utf-8'))
+        user = request.user
+        items = data.get('results')
+        now = timezone.now()
+
+        if not isinstance(items, list):
+            return JsonResponse({'status': 'error', 'message': 'Missing required fields'}, status=400)
+        if len(items) > RESULTS_BATCH_MAX_SIZE:
+            return JsonResponse({
+                'status': 'error',
+                'message': f'Too many results, maximum is {RESULTS_BATCH_MAX_SIZE}'
+            }, status=400)
+
+        results = [None] * len(items)
+        valid = []
+        seen = set()
+        for index, item in enumerate(items):
+            if (not isinstance(item, dict) or not isinstance(item.get('word_id'), int)
+                    or not isinstance(item.get('is_known'), bool)):
+                results[index] = batch_result(item, 'Missing required fields', 400)
+            elif item.get('type', 'repeat') not in ('repeat', 'new'):
+                results[index] = batch_result(item, 'Unknown result type', 400)
+            elif item['word_id'] in seen:
+                results[index] = batch_result(item, 'Duplicate result for this word', 400)
+            else:
+                seen.add(item['word_id'])
+                valid.append((index, item))
+
+        session_id = data.get('session_id')
+        if any(item.get('type', 'repeat') == 'repeat' for _, item in valid):
+            if session_id is None:
+                return JsonResponse({'status': 'error', 'message': 'Missing required fields'}, status=400)
+            session = Learning_Session.objects.filter(id=session_id).only('user_id').first()
+            if session is None:
+                return JsonResponse({'status': 'error', 'message': 'Learning session not found'}, status=404)
+            if session.user_id != user.id:
+                return JsonResponse({
+                    'status': 'error',
+                    'message': 'This session does not belong to the current user'
+                }, status=403)
+
+        words = Word.objects.filter(id__in=seen).annotate(
+            allowed=Exists(Word.category.through.objects.filter(
+                Q(category__owner__isnull=True) | Q(category__owner=user),
+                word_id=OuterRef('pk')
+            ))
+        ).in_bulk()
+        repetitions = {
+            repetition.word_id: repetition
+            for repetition in Word_Repetition.objects.filter(user=user, word_id__in=seen)
+        }
+
+        scheduler = get_scheduler()
+        repeat_items = []
+        to_create, to_update, learned_ids = [], [], []
+        for index, item in valid:
+            word = words.get(item['word_id'])
+            if word is None:
+                results[index] = batch_result(item, 'Word not found', 404)
+                continue
+            if not word.allowed:
+                results[index] = batch_result(item, 'No permission for this word', 403)
+                continue
+
+            repetition = repetitions.get(word.id)
+            if item.get('type', 'repeat') == 'new':
+                if item['is_known']:
+                    learned_ids.append(word.id)
+                    results[index] = batch_result(item, 'Known word added')
+                else:
+                    if repetition is None:
+                        repetition = Word_Repetition(user=user, word=word)
+                        to_create.append(repetition)
+                    else:
+                        to_update.append(repetition)
+                    repetition.next_review = now + timedelta(seconds=NEW_WORD_FIRST_REVIEW)
+                    results[index] = batch_result(item, 'Word to learned added')
+                continue
+
+            if repetition is None:
+                repetition = Word_Repetition(
+                    user=user,
+                    word=word,
+                    next_review=now + timedelta(minutes=scheduler.initial_interval())
+                )
+            elif repetition.next_review > now:
+                results[index] = batch_result(
+                    item, f'Word is not ready for repetition yet. Next review at {repetition.next_review}', 400
+                )
+                continue
+            repeat_items.append((index, item, word, repetition))
+
+        with transaction.atomic():
+            attempts = Answer_Attempt.objects.bulk_create(
+                Answer_Attempt(user=user, word=word, session_id=session_id, is_correct=item['is_known'])
+                for _, item, word, _ in repeat_items
+            )
+            stats = record_attempts(attempts)
+
+            deleted_ids = []
+            for index, item, word, repetition in repeat_items:
+                message, learned = apply_repeat_result(
+                    scheduler, user, word, repetition, item['is_known'], now, stats[(user.id, word.id)]
+                )
+                if learned:
+                    learned_ids.append(word.id)
+                    if repetition.pk:
+                        deleted_ids.append(repetition.pk)
+                elif repetition.pk:
+                    to_update.append(repetition)
+                else:
+                    to_create.append(repetition)
+                results[index] = batch_result(item, message)
+
+            new_learned = 0
+            if deleted_ids:
+                Word_Repetition.objects.filter(id__in=deleted_ids).delete()
+            if learned_ids:
+                new_learned = len(learned_ids) - Learned_Word.objects.filter(
+                    user=user, word_id__in=learned_ids
+                ).count()
+                Learned_Word.objects.bulk_create(
+                    [Learned_Word(user=user, word_id=word_id) for word_id in learned_ids],
+                    ignore_conflicts=True
+                )
+            Word_Repetition.objects.bulk_create(to_create)
+            Word_Repetition.objects.bulk_update(to_update, [
+                'repetition_count', 'next_review', 'interval', 'last_review',
+                'ease_factor', 'sm2_interval', 'stability', 'difficulty'
+            ])
+
+            user_stats.record_answers(
+                user.id,
+                answers=len(attempts),
+                correct=sum(attempt.is_correct for attempt in attempts),
+                learned_words=new_learned,
+                in_progress_words=len(to_create) - len(deleted_ids)
+            )
+
+        if repeat_items:
+            scheduler.after_answer(user)
+
+        return JsonResponse({'status': 'success', 'results': results}, status=200)
+
+    except Exception as e:
+        return JsonResponse({'status': 'error', 'message': str(e)}, status=400)
+
+
 @require_http_methods(["GET"])
 @auth_required(redirect_to_login=False)
 def get_test_questions(request):
@@ -1103,41 +1378,41 @@ def search_words(request):
         if len(query) < 2:
             return JsonResponse({'status': 'success', 'count': 0, 'results': []})
 
-        words = Word.objects.filter(
-            Q(word__icontains=query) | Q(translation__icontains=query)
-        ).distinct()
-
-        exact_matches = []
-        partial_matches = []
-
-        for word in words:
-            accessible_categories = word.category.filter(
-                Q(owner__isnull=True) |  # Общие категории
-                Q(owner=request.user.id if user.is_authenticated else None)  # Категории пользователя
-            )
-
-            for category in accessible_categories:
-                item = {
-                    'word': word.word,
-                    'translation': word.translation,
-                    'transcription': word.transcription,
-                    'category_name': category.name,
-                    'category_id': category.id,
-                    'is_private': category.owner is not None
-                }
-
-                if word.word.lower() == query or word.translation.lower() == query:
-                    exact_matches.append(item)
-                else:
-                    partial_matches.append(item)
-
-        results = exact_matches + partial_matches
-
-        return JsonResponse({
+        try:
+            limit = min(max(int(request.GET.get('limit', SEARCH_RESULTS_LIMIT)), 1), SEARCH_RESULTS_MAX_LIMIT)
+            page = max(int(request.GET.get('page', 1)), 1)
+        except ValueError:
+            return JsonResponse({'status': 'error', 'message': 'Invalid parameters'}, status=400)
+
+        fuzzy = request.GET.get('fuzzy', '').lower() in ('1', 'true')
+
+        # Выдача меняется только вместе с каталогом: повторный запрос
+        # с тем же If-None-Match получает 304 без поиска
+        etag = search_service.search_etag(user, fuzzy)
+        not_modified = get_conditional_response(request, etag=etag)
+        if not_modified is not None:
+            return search_cache_headers(not_modified, user)
+
+        total, rows = search_service.search_words(query, user, limit, page, fuzzy=fuzzy)
+
+        results = [{
+            'word': row['word'],
+            'translation': row['translation'],
+            'transcription': row['transcription'],
+            'category_name': row['category_name'],
+            'category_id': row['category_id'],
+            'is_private': row['category_owner_id'] is not None
+        } for row in rows]
+
+        response = JsonResponse({
             'status': 'success',
-            'count': len(results),
+            'count': total,
+            'page': page,
+            'has_more': page * limit < total,
             'results': results
         })
+        response['ETag'] = etag
+        return search_cache_headers(response, user)
 
     except Exception as e:
         return JsonResponse({